@@ -0,0 +1,78 @@
+"""unique_restored_dashboard_names
+
+Revision ID: 007
+Revises: 3327052dcb84
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "007"
+down_revision: Union[str, None] = "3327052dcb84"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Exactly the names Restore Defaults generates ("... (Restored)" / "... (Restored N)");
+# kept in sync with app.models.dashboard, which migrations must not import.
+RESTORED_NAME_PREDICATE_POSTGRESQL = r"name ~ '^Hospital Command Center \(Restored( [0-9]+)?\)$'"
+RESTORED_NAME_PREDICATE_SQLITE = (
+  "name = 'Hospital Command Center (Restored)' OR ("
+  "name GLOB 'Hospital Command Center (Restored [0-9]*)' "
+  "AND name NOT GLOB 'Hospital Command Center (Restored *[^0-9]*)')"
+)
+
+
+def _rename_duplicate_restored_names(bind: sa.engine.Connection, predicate: str) -> None:
+  """
+  Rename all but one row of every (owner_id, name) pair the new index would reject.
+
+  Deployments that already hit the concurrent-restore race hold such duplicates, and the
+  unique index cannot be created over them. Extra copies get their id appended, which takes
+  them out of the indexed name pattern without losing any dashboard.
+
+  Args:
+      bind (Connection): The migration connection.
+      predicate (str): The dialect's restored-name predicate.
+  """
+  rows = bind.execute(
+    sa.text(f"SELECT id, owner_id, name FROM dashboards WHERE {predicate} ORDER BY owner_id, name, id")
+  ).all()
+  seen = set()
+  for dashboard_id, owner_id, name in rows:
+    if (owner_id, name) not in seen:
+      seen.add((owner_id, name))
+      continue
+    bind.execute(
+      sa.text("UPDATE dashboards SET name = :name WHERE id = :id"),
+      {"name": f"{name} [{dashboard_id}]", "id": dashboard_id},
+    )
+
+
+def upgrade() -> None:
+  """Apply migration: Enforce unique restored dashboard names per owner."""
+  bind = op.get_bind()
+  # `dashboards` is created by the application's metadata (which already declares this index),
+  # so only existing deployments need it added here.
+  if not sa.inspect(bind).has_table("dashboards"):
+    return
+  predicate = RESTORED_NAME_PREDICATE_POSTGRESQL if bind.dialect.name == "postgresql" else RESTORED_NAME_PREDICATE_SQLITE
+  _rename_duplicate_restored_names(bind, predicate)
+  op.create_index(
+    "ux_dashboards_owner_restored_name",
+    "dashboards",
+    ["owner_id", "name"],
+    unique=True,
+    postgresql_where=sa.text(RESTORED_NAME_PREDICATE_POSTGRESQL),
+    sqlite_where=sa.text(RESTORED_NAME_PREDICATE_SQLITE),
+    if_not_exists=True,
+  )
+
+
+def downgrade() -> None:
+  """Revert migration."""
+  op.drop_index("ux_dashboards_owner_restored_name", table_name="dashboards", if_exists=True)
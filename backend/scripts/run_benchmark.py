@@ -201,8 +201,15 @@ class BenchmarkRunner:
           if getattr(obj, "is_selected", None) is None:
             obj.is_selected = False
 
+    async def mock_execute(statement, rows=None):
+      """Capture bulk inserts (insert(ModelCandidate) with row dicts) as session objects."""
+      for row in rows or []:
+        _db_store.append(ModelCandidate(**row))
+      return MagicMock()
+
     mock_db.flush = AsyncMock(side_effect=mock_flush)
     mock_db.commit = AsyncMock(side_effect=mock_flush)
+    mock_db.execute = AsyncMock(side_effect=mock_execute)
 
     # Side effect for refresh: Populate ID, created_at, and relationships
     async def mock_refresh(instance):
@@ -100,13 +100,13 @@ async def execute_sql_preview(
       detail="SQL cannot be empty.",
     )
 
-  runnable_sql = sql_generator.process_global_filters(request.sql, request.global_params or {})
+  runnable_sql, filter_params = sql_generator.process_global_filters(request.sql, request.global_params or {})
 
   conn = None
   try:
     conn = duckdb_manager.get_readonly_connection()
     cursor = conn.cursor()
-    res = run_sql_widget(cursor, {"query": runnable_sql, "max_rows": request.max_rows})
+    res = run_sql_widget(cursor, {"query": runnable_sql, "params": filter_params, "max_rows": request.max_rows})
   except Exception as e:
     res = {"data": [], "columns": [], "error": str(e)}
   finally:
@@ -12,6 +12,7 @@ from uuid import UUID
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -67,6 +68,25 @@ def _validate_sql_query(query: str) -> None:
     )
 
 
+def _dashboard_name_conflict(name: str) -> HTTPException:
+  """
+  Builds the error for a dashboard name rejected by the restored-name unique index.
+
+  Only the names Restore Defaults generates are unique per owner; creating, renaming or
+  cloning into one that is already taken would otherwise surface as a 500.
+
+  Args:
+      name (str): The rejected dashboard name.
+
+  Returns:
+      HTTPException: 409 Conflict.
+  """
+  return HTTPException(
+    status_code=status.HTTP_409_CONFLICT,
+    detail=f"A dashboard named '{name}' already exists.",
+  )
+
+
 # --- Dashboards ---
 
 
@@ -91,7 +111,11 @@ async def create_dashboard(
   """Create a new empty dashboard."""
   dashboard = Dashboard(name=dashboard_in.name, owner_id=current_user.id)
   db.add(dashboard)
-  await db.commit()
+  try:
+    await db.commit()
+  except IntegrityError:
+    await db.rollback()
+    raise _dashboard_name_conflict(dashboard_in.name)
   await db.refresh(dashboard)
   return dashboard
 
@@ -129,7 +153,11 @@ async def clone_dashboard(
   new_dashboard = Dashboard(name=f"Copy of {source_dashboard.name}", owner_id=current_user.id)
   db.add(new_dashboard)
   # Flush to generate ID for widget foreign keys
-  await db.flush()
+  try:
+    await db.flush()
+  except IntegrityError:
+    await db.rollback()
+    raise _dashboard_name_conflict(new_dashboard.name)
 
   # 3. Clone Widgets (Deep Copy of Config)
   # We use copy.deepcopy on the config dictionary to ensure no shared references
@@ -201,7 +229,11 @@ async def update_dashboard(
     raise HTTPException(status_code=404, detail="Dashboard not found")
 
   dashboard.name = dashboard_update.name
-  await db.commit()
+  try:
+    await db.commit()
+  except IntegrityError:
+    await db.rollback()
+    raise _dashboard_name_conflict(dashboard_update.name)
   await db.refresh(dashboard)
   return dashboard
 
@@ -5,7 +5,6 @@ Orchestrates dashboard refreshment.
 **Update**: Handles `global_filters` query parameter to inject context.
 """
 
-import asyncio
 import logging
 from typing import Dict, Any, List, Annotated, Tuple, Optional
 from uuid import UUID
@@ -20,7 +19,7 @@ from app.database.postgres import get_db
 from app.database.duckdb import duckdb_manager
 from app.models.dashboard import Dashboard, Widget
 from app.models.user import User
-from app.services.runners.http import run_http_widget
+from app.services.runners.http import run_http_widget, run_widgets_parallel
 from app.services.runners.sql import run_sql_widget
 from app.services.cache_service import cache_service
 from app.services.sql_generator import sql_generator
@@ -71,8 +70,10 @@ async def refresh_dashboard(
 
     if widget.type == "SQL":
       raw_sql = run_config.get("query", "")
-      # Inject Globals
-      run_config["query"] = sql_generator.process_global_filters(raw_sql, global_params)
+      # Bind Globals (values travel as parameters, never as SQL text)
+      run_config["query"], filter_params = sql_generator.process_global_filters(raw_sql, global_params)
+      if filter_params:
+        run_config["params"] = filter_params
 
     # Generate Cache Key (using the *injected* query/config)
     # This ensures filtering creates unique cache entries
@@ -92,9 +93,10 @@ async def refresh_dashboard(
 
   # Execute HTTP
   if http_widgets_to_run:
-    # Extract run_config from tuple (widget, config, key)
-    tasks = [run_http_widget(w_info[1], forward_auth_token=forward_token) for w_info in http_widgets_to_run]
-    http_results_list = await asyncio.gather(*tasks)
+    # Extract run_config from tuple (widget, config, key); requests run concurrently with a bounded fan-out
+    http_results_list = await run_widgets_parallel(
+      [w_info[1] for w_info in http_widgets_to_run], forward_auth_token=forward_token
+    )
 
     for (widget, _, cache_key), res in zip(http_widgets_to_run, http_results_list):
       results_map[widget.id] = res
@@ -46,6 +46,12 @@ class Settings(BaseSettings):
   CACHE_MAX_ENTRIES: int = 1000
   CACHE_MAX_ITEM_SIZE: int = 5_000_000
 
+  # --- Optimization (MPAX / JAX) Settings ---
+  # Persistent XLA compilation cache, off unless set. Point it at a directory owned by the
+  # app (not a shared path like /tmp) so other users cannot plant compiled executables.
+  JAX_COMPILATION_CACHE_DIR: str = ""
+  JAX_CACHE_MIN_COMPILE_SECS: float = 0.5
+
   # --- LLM Configuration Fields ---
 
   # Local Custom
@@ -27,6 +27,7 @@ from app.database.postgres import engine, Base
 from app.database.duckdb_init import init_duckdb_on_startup
 from app.services.template_seeder import TemplateSeeder
 from app.services.data_ingestion import data_ingestion_service
+from app.services.runners.http import close_http_client
 
 
 @asynccontextmanager
@@ -49,6 +50,7 @@ async def lifespan(app: FastAPI):
 
   yield
 
+  await close_http_client()
   await engine.dispose()
 
 
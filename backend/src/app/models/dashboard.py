@@ -2,7 +2,7 @@
 
 import uuid
 from typing import List, Dict, Any
-from sqlalchemy import String, ForeignKey
+from sqlalchemy import Index, String, ForeignKey, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.database.postgres import Base
@@ -11,10 +11,34 @@ from app.database.postgres import Base
 # but since we import Base, we rely on SQLAlchemy registry.
 
 
+# Name of the dashboard provisioned for every user; Restore Defaults recreates it.
+DEFAULT_DASHBOARD_NAME = "Hospital Command Center"
+
+# Exactly the names restore_defaults generates: "<default> (Restored)" and "<default> (Restored N)".
+# Anchored so user-chosen names that merely contain " (Restored" (e.g. "Copy of ... (Restored)") may repeat.
+RESTORED_NAME_PREDICATE_POSTGRESQL = f"name ~ '^{DEFAULT_DASHBOARD_NAME} \\(Restored( [0-9]+)?\\)$'"
+RESTORED_NAME_PREDICATE_SQLITE = (
+  f"name = '{DEFAULT_DASHBOARD_NAME} (Restored)' OR ("
+  f"name GLOB '{DEFAULT_DASHBOARD_NAME} (Restored [0-9]*)' AND name NOT GLOB '{DEFAULT_DASHBOARD_NAME} (Restored *[^0-9]*)')"
+)
+
+
 class Dashboard(Base):
   """SQLAlchemy model representing a user dashboard."""
 
   __tablename__ = "dashboards"
+  __table_args__ = (
+    # Restored copies are unique per owner so concurrent restores cannot claim the
+    # same suffix; every other name (including clones of restored boards) may repeat.
+    Index(
+      "ux_dashboards_owner_restored_name",
+      "owner_id",
+      "name",
+      unique=True,
+      postgresql_where=text(RESTORED_NAME_PREDICATE_POSTGRESQL),
+      sqlite_where=text(RESTORED_NAME_PREDICATE_SQLITE),
+    ),
+  )
 
   id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
   name: Mapped[str] = mapped_column(String, index=True)
@@ -6,6 +6,7 @@ Separates the definition of the environment (Capacity, Constraints) from
 the data source (Demand SQL), allowing mix-and-match analysis.
 """
 
+from functools import cached_property
 from typing import Dict, List, Any, Optional
 from pydantic import BaseModel, Field
 
@@ -60,3 +61,13 @@ class ScenarioResult(BaseModel):
   assignments: List[SimulationAssignment]
   status: str
   message: Optional[str] = None
+
+  @cached_property
+  def overflow_count(self) -> float:
+    """
+    Total patients routed to the virtual "Overflow" unit.
+
+    Computed once per result and memoized, so scoring a cached result repeatedly
+    does not re-walk the assignment list. Not part of the serialized payload.
+    """
+    return sum(a.Patient_Count for a in self.assignments if a.Unit == "Overflow")
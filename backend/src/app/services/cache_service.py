@@ -61,6 +61,13 @@ class ResultCacheService:
       # Collapse multiple spaces to one
       clean_query = " ".join(query.split())
       payload_str += f":{clean_query}"
+      # Bound filter values and the result shape change the output for the same query text
+      params = config.get("params")
+      if params:
+        payload_str += f":{json.dumps(params, default=str)}"
+      shape = config.get("shape")
+      if shape:
+        payload_str += f":shape={shape}"
     else:
       # For generic/HTTP, dump the whole sorted config
       # Use default=str to handle non-serializable objects gracefully
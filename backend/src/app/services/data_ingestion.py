@@ -22,6 +22,7 @@ from builtins import open as open
 
 from app.core.config import settings
 from app.database.duckdb import duckdb_manager
+from app.services.schema import schema_service
 
 logger = logging.getLogger("data_ingestion")
 
@@ -174,6 +175,8 @@ class DataIngestionService:
           logger.error(f"       ❌ Failed to load {filename}: {e}")
 
       logger.info(f"✅ Ingestion Complete. {files_processed} files processed.")
+      # Tables were (re)created; drop the cached LLM schema context
+      schema_service.invalidate()
 
     except Exception as e:
       logger.critical(f"❌ Fatal error during ingestion: {e}")
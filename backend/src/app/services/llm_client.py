@@ -7,7 +7,7 @@ Wraps any-llm providers, executes concurrent requests, and normalizes responses.
 import logging
 import time
 import asyncio
-from typing import List, Dict, Any, NamedTuple, Optional
+from typing import AsyncIterator, List, Dict, Any, NamedTuple, Optional
 
 from any_llm import AnyLLM
 from starlette.concurrency import run_in_threadpool
@@ -16,6 +16,35 @@ from app.schemas.admin import AdminSettingsResponse
 
 logger = logging.getLogger(__name__)
 
+# Providers that only cache a prompt prefix when it is explicitly marked. OpenAI-compatible
+# providers cache identical prefixes automatically and may reject the extra block fields.
+_EXPLICIT_PROMPT_CACHE_PROVIDERS = frozenset({"anthropic"})
+
+
+def _with_cacheable_system_prompt(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+  """
+  Mark system prompts as an ephemeral cache breakpoint.
+
+  Prompt strategies keep the instructions and schema in the system message, so that prefix
+  is identical across questions and only the user message is processed as new input.
+
+  Args:
+      messages: OpenAI-format history with plain-string contents.
+
+  Returns:
+      List[Dict[str, Any]]: The same history; system messages carry a single text block with
+      `cache_control`. Non-system messages are passed through unchanged.
+  """
+  return [
+    {
+      "role": "system",
+      "content": [{"type": "text", "text": message["content"], "cache_control": {"type": "ephemeral"}}],
+    }
+    if message["role"] == "system" and isinstance(message.get("content"), str)
+    else message
+    for message in messages
+  ]
+
 
 class ArenaResponse(NamedTuple):
   """
@@ -141,11 +170,14 @@ class LLMArenaClient:
       # Offload blocking IO to threadpool to keep asyncio loop healthy
       # We pass 'model' here to satisfy OpenAI SDK requirements
       kwargs = {}
+      provider = combatant["provider"]
       if admin_settings and admin_settings.api_keys:
-        provider = combatant["provider"]
         if provider in admin_settings.api_keys:
           kwargs["api_key"] = admin_settings.api_keys[provider]
 
+      if provider in _EXPLICIT_PROMPT_CACHE_PROVIDERS:
+        messages = _with_cacheable_system_prompt(messages)
+
       response = await run_in_threadpool(
         client.completion,
         model=target_model_name,
@@ -201,22 +233,10 @@ class LLMArenaClient:
     Returns:
         List[ArenaResponse]: A list of results from every active model, including errors.
     """
-    if not self.swarm:
-      raise RuntimeError("No LLM providers are configured in the Arena.")
-
-    # Filter combatants
-    active_combatants = self.swarm
-    if target_model_ids:
-      active_combatants = [c for c in self.swarm if c["id"] in target_model_ids]
-
+    active_combatants = self._select_combatants(target_model_ids, admin_settings)
     if not active_combatants:
-      # Fallback if filters didn't match anything -> Return empty or all?
-      # Returning empty to signify strict adherence. Filters might be malformed.
       return []
 
-    if not target_model_ids and admin_settings and admin_settings.visible_models:
-      active_combatants = [c for c in active_combatants if c["id"] in admin_settings.visible_models]
-
     # Create tasks for all providers
     tasks = [
       self._generate_single(combatant, messages, temperature, max_tokens, stop, admin_settings)
@@ -233,19 +253,94 @@ class LLMArenaClient:
         final_results.append(res)
       else:
         # This catches Python crashes inside _generate_single
-        combatant = active_combatants[i]
-        final_results.append(
-          ArenaResponse(
-            provider_name=combatant["name"],
-            model_identifier=combatant["id"],
-            content="",
-            latency_ms=0,
-            error=f"Critical Client Error: {str(res)}",
-          )
-        )
+        final_results.append(self._critical_error_response(active_combatants[i], res))
 
     return final_results
 
+  async def stream_arena_competition(
+    self,
+    messages: List[Dict[str, str]],
+    temperature: float = 0.0,
+    max_tokens: int = 512,
+    stop: Optional[List[str]] = None,
+    target_model_ids: Optional[List[str]] = None,
+    admin_settings: Optional[AdminSettingsResponse] = None,
+  ) -> AsyncIterator[ArenaResponse]:
+    """
+    Streaming variant of `generate_arena_competition`.
+
+    Broadcasts the prompt to the same combatants, but yields each model's result as soon
+    as it completes (completion order, not swarm order). Callers can start downstream
+    work on fast models while slower ones are still generating.
+
+    Args:
+        messages: OpenAI-format history.
+        temperature: Determinism factor.
+        max_tokens: Length limit.
+        stop: Stop sequences.
+        target_model_ids: Optional list of specific 'id's to query.
+
+    Yields:
+        ArenaResponse: One result per active model, including errors.
+    """
+    active_combatants = self._select_combatants(target_model_ids, admin_settings)
+
+    tasks = {
+      asyncio.ensure_future(
+        self._generate_single(combatant, messages, temperature, max_tokens, stop, admin_settings)
+      ): combatant
+      for combatant in active_combatants
+    }
+
+    pending = set(tasks)
+    try:
+      while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+          exc = task.exception()
+          yield task.result() if exc is None else self._critical_error_response(tasks[task], exc)
+    finally:
+      # Consumer stopped early; don't leave provider calls running unobserved
+      for task in pending:
+        task.cancel()
+
+  def _select_combatants(
+    self, target_model_ids: Optional[List[str]], admin_settings: Optional[AdminSettingsResponse]
+  ) -> List[Dict[str, Any]]:
+    """
+    Resolve which swarm members take part in a competition.
+
+    Raises:
+        RuntimeError: If no providers are configured at all.
+    """
+    if not self.swarm:
+      raise RuntimeError("No LLM providers are configured in the Arena.")
+
+    # Filter combatants
+    active_combatants = self.swarm
+    if target_model_ids:
+      active_combatants = [c for c in self.swarm if c["id"] in target_model_ids]
+
+    if not active_combatants:
+      # Fallback if filters didn't match anything -> Return empty or all?
+      # Returning empty to signify strict adherence. Filters might be malformed.
+      return []
+
+    if not target_model_ids and admin_settings and admin_settings.visible_models:
+      active_combatants = [c for c in active_combatants if c["id"] in admin_settings.visible_models]
+
+    return active_combatants
+
+  def _critical_error_response(self, combatant: Dict[str, Any], exc: BaseException) -> ArenaResponse:
+    """Wrap an unhandled crash inside `_generate_single` as an ArenaResponse error."""
+    return ArenaResponse(
+      provider_name=combatant["name"],
+      model_identifier=combatant["id"],
+      content="",
+      latency_ms=0,
+      error=f"Critical Client Error: {str(exc)}",
+    )
+
 
 # Singleton instance
 llm_client = LLMArenaClient()
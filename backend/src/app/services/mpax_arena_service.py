@@ -3,22 +3,102 @@ Service for integrating MPAX solver with the Multi-LLM Arena.
 Implements the 5 distinct "What-If" evaluation modes.
 """
 
+import asyncio
 import json
 import uuid
 from typing import Dict, List, Any, Optional
+
+import orjson
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
 from app.models.user import User
 from app.schemas.mpax_arena import MpaxArenaRequest, MpaxArenaResponse, MpaxArenaCandidate
 from app.schemas.simulation import ScenarioRunRequest, ScenarioResult
 from app.services.simulation_service import simulation_service
+from app.services.cache_service import ResultCacheService
 from app.services.llm_client import llm_client
 from app.database.duckdb import duckdb_manager
 
 
+def _match_brace(text: str, start: int) -> int:
+  """
+  Find the `}` closing the `{` at `text[start]`, skipping braces inside JSON strings.
+
+  Args:
+      text (str): Raw model response.
+      start (int): Index of an opening brace.
+
+  Returns:
+      int: Index of the matching closing brace, or -1 if it is never closed.
+  """
+  depth = 0
+  in_string = False
+  escape = False
+
+  for i in range(start, len(text)):
+    ch = text[i]
+    if in_string:
+      if escape:
+        escape = False
+      elif ch == "\\":
+        escape = True
+      elif ch == '"':
+        in_string = False
+    elif ch == "{":
+      depth += 1
+    elif ch == "}":
+      depth -= 1
+      if depth == 0:
+        return i
+    elif ch == '"':
+      in_string = True
+  return -1
+
+
+def _extract_json_obj(text: str, last: bool = False) -> Optional[Dict[str, Any]]:
+  """
+  Extract a JSON object embedded in free-form LLM output.
+
+  Each candidate `{` is matched with a brace-balanced scan (string/escape aware) and only
+  that slice is parsed with orjson. A brace that never closes or whose span is not valid
+  JSON is treated as prose, and the search resumes from the next `{`.
+
+  Args:
+      text (str): Raw model response.
+      last (bool): Return the last valid object instead of the first.
+
+  Returns:
+      Optional[Dict[str, Any]]: The parsed object, or None if no valid object was found.
+  """
+  found = None
+  start = text.find("{")
+
+  while start != -1:
+    end = _match_brace(text, start)
+    if end != -1:
+      try:
+        parsed = orjson.loads(text[start : end + 1])
+      except orjson.JSONDecodeError:
+        parsed = None
+      if isinstance(parsed, dict):
+        if not last:
+          return parsed
+        found = parsed
+        start = text.find("{", end + 1)
+        continue
+    start = text.find("{", start + 1)
+
+  return found
+
+
 class MpaxArenaService:
   """Orchestrates MPAX and LLMs based on requested evaluation modes."""
 
+  def __init__(self) -> None:
+    """Initialize the cache of solver results shared by all modes."""
+    self._solve_cache = ResultCacheService()
+
   async def run_mpax_arena(self, request: MpaxArenaRequest, db: AsyncSession, user: User) -> MpaxArenaResponse:
     """Entry point for all MPAX Arena integrations."""
     mode = request.mode
@@ -50,16 +130,30 @@ class MpaxArenaService:
     finally:
       conn.close()
 
+  def _run_scenario_cached(self, sim_req: ScenarioRunRequest) -> ScenarioResult:
+    """
+    Run an MPAX scenario, memoizing the result by the full request payload.
+
+    Reruns of the same prompt and overlapping LLM capacity proposals reuse the
+    earlier solve. Entries expire with the standard cache TTL so refreshed demand
+    data is picked up.
+    """
+    key = self._solve_cache.generate_key("MPAX", sim_req.model_dump())
+    cached = self._solve_cache.get(key)
+    if cached is not None:
+      return cached
+
+    result = simulation_service.run_scenario(sim_req)
+    self._solve_cache.set(key, result)
+    return result
+
   async def _run_judge_mode(self, request: MpaxArenaRequest, db: AsyncSession, user: User) -> MpaxArenaResponse:
     """Mode 1: MPAX solves it, LLMs try to solve it logically."""
-    demand_data = self._get_demand_data(request.demand_sql or "")
+    demand_data = await run_in_threadpool(self._get_demand_data, request.demand_sql or "")
 
-    # 1. Run MPAX Ground Truth
     cap = request.base_capacity or {"ICU": 10, "MedSurg": 50}
     sim_req = ScenarioRunRequest(demand_source_sql=request.demand_sql or "", capacity_parameters=cap)
-    mpax_result = simulation_service.run_scenario(sim_req)
 
-    # 2. Prompt LLMs
     system_prompt = (
       "You are a hospital capacity planner. Solve this routing problem logically.\n"
       f"Demand: {json.dumps(demand_data)}\n"
@@ -69,7 +163,12 @@ class MpaxArenaService:
 
     messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": request.prompt}]
 
-    llm_responses = await llm_client.generate_arena_competition(messages)
+    # Run MPAX Ground Truth alongside the LLMs; the prompt does not depend on it.
+    # Solves are CPU-bound, so they are offloaded to keep the event loop free.
+    mpax_result, llm_responses = await asyncio.gather(
+      run_in_threadpool(self._run_scenario_cached, sim_req),
+      llm_client.generate_arena_competition(messages),
+    )
 
     return self._build_response(mode="judge", mpax_gt=mpax_result.model_dump(), llm_responses=llm_responses)
 
@@ -77,19 +176,22 @@ class MpaxArenaService:
     """Mode 2: LLMs translate MPAX output into human text."""
     cap = request.base_capacity or {"ICU": 10, "MedSurg": 50}
     sim_req = ScenarioRunRequest(demand_source_sql=request.demand_sql or "", capacity_parameters=cap)
-    mpax_result = simulation_service.run_scenario(sim_req)
+    mpax_result = await run_in_threadpool(self._run_scenario_cached, sim_req)
+
+    # Dump once; the same dict feeds both the prompt and the response payload
+    result_dict = mpax_result.model_dump()
 
     system_prompt = (
       "You are a clinical translator. Read the following mathematical optimization output "
       "from our MPAX solver and translate it into a concise, actionable summary for the shift nurse.\n"
-      f"MPAX Output: {mpax_result.model_dump_json()}"
+      f"MPAX Output: {orjson.dumps(result_dict).decode()}"
     )
 
     messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": request.prompt}]
 
     llm_responses = await llm_client.generate_arena_competition(messages)
 
-    return self._build_response(mode="translator", mpax_gt=mpax_result.model_dump(), llm_responses=llm_responses)
+    return self._build_response(mode="translator", mpax_gt=result_dict, llm_responses=llm_responses)
 
   async def _run_constraints_mode(self, request: MpaxArenaRequest, db: AsyncSession, user: User) -> MpaxArenaResponse:
     """Mode 3: LLMs generate constraints, run MPAX for each."""
@@ -99,42 +201,43 @@ class MpaxArenaService:
     )
     messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": request.prompt}]
 
-    llm_responses = await llm_client.generate_arena_competition(messages)
-
-    candidates = []
-    experiment_id = str(uuid.uuid4())
-
-    for res in llm_responses:
-      cap_map = {}
-      try:
-        # Naive json extraction
-        text = res.content
-        start = text.find("{")
-        end = text.rfind("}")
-        if start != -1 and end != -1:
-          cap_map = json.loads(text[start : end + 1])
-        else:
-          cap_map = {"ICU": 0}  # fallback
-      except:
-        cap_map = {"ICU": 0}
+    async def _evaluate(res: Any) -> MpaxArenaCandidate:
+      """Parse one model's proposed capacities and solve the scenario with them."""
+      cap_map = _extract_json_obj(res.content)
+      if cap_map is None:
+        cap_map = {"ICU": 0}  # fallback
 
       try:
         sim_req = ScenarioRunRequest(demand_source_sql=request.demand_sql or "", capacity_parameters=cap_map)
-        mpax_res = simulation_service.run_scenario(sim_req).model_dump()
+        mpax_res = (await run_in_threadpool(self._run_scenario_cached, sim_req)).model_dump()
       except Exception as e:
         mpax_res = {"status": "error", "message": str(e), "assignments": []}
 
-      candidates.append(
-        MpaxArenaCandidate(id=str(uuid.uuid4()), model_name=res.provider_name, content=res.content, mpax_result=mpax_res)
+      return MpaxArenaCandidate(
+        id=str(uuid.uuid4()), model_name=res.provider_name, content=res.content, mpax_result=mpax_res
       )
 
+    # Start each solve as soon as its model answers, overlapping LP work with slower models
+    solve_tasks: List[asyncio.Future] = []
+    try:
+      async for res in llm_client.stream_arena_competition(messages):
+        solve_tasks.append(asyncio.ensure_future(_evaluate(res)))
+    except BaseException:
+      # The stream failed partway; don't leave solves already started running unobserved
+      for task in solve_tasks:
+        task.cancel()
+      await asyncio.gather(*solve_tasks, return_exceptions=True)
+      raise
+
+    candidates = list(await asyncio.gather(*solve_tasks))
+    experiment_id = str(uuid.uuid4())
+
     return MpaxArenaResponse(experiment_id=experiment_id, mode="constraints", candidates=candidates)
 
   async def _run_sql_vs_mpax_mode(self, request: MpaxArenaRequest, db: AsyncSession, user: User) -> MpaxArenaResponse:
     """Mode 4: LLMs write SQL routing, compared to MPAX."""
     cap = request.base_capacity or {"ICU": 10, "MedSurg": 50}
     sim_req = ScenarioRunRequest(demand_source_sql=request.demand_sql or "", capacity_parameters=cap)
-    mpax_result = simulation_service.run_scenario(sim_req)
 
     system_prompt = (
       "You are a database engineer. Write a DuckDB SQL query to route patients "
@@ -145,7 +248,10 @@ class MpaxArenaService:
     )
     messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": request.prompt}]
 
-    llm_responses = await llm_client.generate_arena_competition(messages)
+    mpax_result, llm_responses = await asyncio.gather(
+      run_in_threadpool(self._run_scenario_cached, sim_req),
+      llm_client.generate_arena_competition(messages),
+    )
 
     candidates = []
     experiment_id = str(uuid.uuid4())
@@ -180,25 +286,18 @@ class MpaxArenaService:
     experiment_id = str(uuid.uuid4())
 
     for res in llm_responses:
-      cap_map = {}
-      try:
-        text = res.content
-        start = text.rfind("{")
-        end = text.rfind("}")
-        if start != -1 and end != -1:
-          cap_map = json.loads(text[start : end + 1])
-        else:
-          cap_map = request.base_capacity or {"ICU": 10}
-      except:
+      # Capacities are requested at the very end of the policy text
+      cap_map = _extract_json_obj(res.content, last=True)
+      if cap_map is None:
         cap_map = request.base_capacity or {"ICU": 10}
 
       try:
         sim_req = ScenarioRunRequest(demand_source_sql=request.demand_sql or "", capacity_parameters=cap_map)
-        mpax_res = simulation_service.run_scenario(sim_req)
+        mpax_res = await run_in_threadpool(self._run_scenario_cached, sim_req)
 
         # Calculate simple score: negative overflow
         score = 100
-        overflow = sum(a.Patient_Count for a in mpax_res.assignments if a.Unit == "Overflow")
+        overflow = mpax_res.overflow_count
         score -= int(overflow * 5)  # arbitrarily penalize 5 points per overflow
         mpax_score = max(0, score)
 
@@ -6,20 +6,93 @@ This module provides the core logic to translate high-level hospital optimizatio
 It includes robust handling for "Surge" scenarios by injecting virtual overflow capacity.
 """
 
+import functools
 import json
 import logging
 import jax
 import jax.numpy as jnp
 import numpy as np
-from typing import Dict, Any, List, Optional
+import orjson
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple, Union
 from mpax import create_lp, r2HPDHG
+from mpax.utils import TerminationStatus
 
-# Enable 64-bit precision for optimization numerical stability
-jax.config.update("jax_enable_x64", True)
+from app.core.config import settings
+
+# Persist compiled solver graphs across process restarts so the first solve
+# loads from disk instead of paying the XLA compile
+if settings.JAX_COMPILATION_CACHE_DIR:
+  jax.config.update("jax_compilation_cache_dir", settings.JAX_COMPILATION_CACHE_DIR)
+  jax.config.update("jax_persistent_cache_min_compile_time_secs", settings.JAX_CACHE_MIN_COMPILE_SECS)
 
 logger = logging.getLogger("mpax_bridge")
 
 
+class AssignmentColumns(NamedTuple):
+  """
+  Columnar solver output: row i assigns `patient_counts[i]` patients of `services[i]` to `units[i]`.
+  """
+
+  services: List[str]
+  units: List[str]
+  patient_counts: np.ndarray
+
+
+def _decode(payload: Any) -> Any:
+  """
+  Parse a JSON solver input, passing already-decoded Python objects through untouched.
+
+  Args:
+      payload (Any): A JSON string/bytes, or the equivalent dict/list.
+
+  Returns:
+      Any: The decoded value.
+  """
+  if isinstance(payload, (str, bytes)):
+    return json.loads(payload)
+  return payload
+
+
+@functools.lru_cache(maxsize=32)
+def _build_structural_matrices(
+  num_services: int, num_real_units: int, use_fp64: bool = False
+) -> Tuple[jnp.ndarray, jnp.ndarray]:
+  """
+  Build the shape-dependent constraint matrices (A, G) of the assignment LP.
+
+  Variables are laid out row-major as (Service, Unit) with the virtual Overflow unit
+  as the last column. Neither matrix depends on demand, capacity or affinity values,
+  so repeated solves over the same service/unit sets (e.g. one per LLM capacity
+  proposal in the arena) share a single build. JAX arrays are immutable, so the
+  cached instances are safe to hand out.
+
+  Equality (Ax = b): for each service i, sum(x_{i,j} for all j including Overflow) = Demand_i.
+  Inequality (Gx >= h): for each real unit j, -sum(x_{i,j} for all i) >= -Capacity_j.
+  Overflow gets no capacity row; with no real units a dummy zero row is emitted to
+  satisfy solver input requirements.
+
+  Args:
+      num_services (int): Number of Clinical Services.
+      num_real_units (int): Number of Hospital Units, excluding Overflow.
+      use_fp64 (bool): Build float64 arrays. Must be called with x64 enabled.
+
+  Returns:
+      Tuple[jnp.ndarray, jnp.ndarray]: The (A, G) matrices.
+  """
+  num_units = num_real_units + 1
+  num_vars = num_services * num_units
+
+  A = np.kron(np.eye(num_services), np.ones((1, num_units)))
+
+  if num_real_units:
+    G = -np.kron(np.ones((1, num_services)), np.eye(num_units)[:num_real_units])
+  else:
+    G = np.zeros((1, num_vars))
+
+  dtype = jnp.float64 if use_fp64 else jnp.float32
+  return jnp.asarray(A, dtype=dtype), jnp.asarray(G, dtype=dtype)
+
+
 class MpaxBridgeService:
   """
   Service responsible for orchestrating the Linear Programming optimization using MPAX.
@@ -47,6 +120,62 @@ class MpaxBridgeService:
     """
     return s_idx * num_units + u_idx
 
+  def _solve_lp(
+    self,
+    c: np.ndarray,
+    b: np.ndarray,
+    h: np.ndarray,
+    l: np.ndarray,
+    u: np.ndarray,
+    num_services: int,
+    num_real_units: int,
+    use_fp64: bool,
+  ) -> Any:
+    """
+    Create and solve the assignment LP at the requested precision.
+
+    Args:
+        c, b, h, l, u (np.ndarray): Host-side cost, demand, capacity and bound vectors.
+        num_services (int): Number of Clinical Services.
+        num_real_units (int): Number of Hospital Units, excluding Overflow.
+        use_fp64 (bool): Solve in float64 instead of float32.
+
+    Returns:
+        Any: The MPAX solver output.
+    """
+    dtype = jnp.float64 if use_fp64 else jnp.float32
+    # x64 is scoped to this solve rather than enabled process-wide
+    with jax.enable_x64(use_fp64):
+      A, G = _build_structural_matrices(num_services, num_real_units, use_fp64)
+      lp = create_lp(
+        jnp.asarray(c, dtype=dtype),
+        A,
+        jnp.asarray(b, dtype=dtype),
+        G,
+        jnp.asarray(h, dtype=dtype),
+        jnp.asarray(l, dtype=dtype),
+        jnp.asarray(u, dtype=dtype),
+        use_sparse_matrix=False,
+      )
+
+      # r2HPDHG: Reflected Restarted Halpern Primal-Dual Hybrid Gradient
+      solver = r2HPDHG(eps_abs=1e-3, eps_rel=1e-3, verbose=False, jit=True)
+      return solver.optimize(lp)
+
+  def _is_converged(self, result: Any) -> bool:
+    """
+    Check that a solve reached optimality with a finite primal solution.
+
+    Args:
+        result (Any): The MPAX solver output.
+
+    Returns:
+        bool: True if the solution can be used as-is.
+    """
+    if int(result.termination_status) != TerminationStatus.OPTIMAL:
+      return False
+    return bool(np.isfinite(np.asarray(result.primal_solution)).all())
+
   def solve_unit_assignment(
     self,
     demand_json: str,
@@ -58,18 +187,9 @@ class MpaxBridgeService:
     Execute the Service-Unit Assignment optimization.
 
     This function maps to a DuckDB User Defined Function (UDF). It acts as a
-    serialization boundary between the Database (Strings) and the Solver (Tensors).
-
-    Problem Formulation:
-        Minimize Cost c^T x
-        Subject to:
-        Ax = b  (Demand constraints: Sum of allocations for service must equal demand)
-        Gx >= h (Capacity constraints: Sum of allocations for unit must not exceed capacity)
-        l <= x <= h (Non-negativity and forced assignments)
-
-    Overflow Extension:
-        A virtual unit "Overflow" is added with cost +100.
-        It is included in Ax=b (demand satisfaction) but excluded from Gx>=h (capacity limits).
+    serialization boundary between the Database (Strings) and the Solver (Tensors);
+    in-process callers should use `solve_unit_assignment_columns` and skip the JSON
+    round trip.
 
     Args:
         demand_json (str): JSON string mapping Service Name to Patient Count.
@@ -87,138 +207,163 @@ class MpaxBridgeService:
              On error, returns a JSON object with an "error" key.
     """
     try:
-      # 1. Parse Inputs from JSON
-      demands: Dict[str, float] = json.loads(demand_json)
-      capacities: Dict[str, float] = json.loads(capacity_json)
-      affinities: Dict[str, Dict[str, float]] = json.loads(affinity_json)
-      constraints: List[Dict[str, Any]] = json.loads(constraints_json) if constraints_json else []
-
-      # 2. Extract Dimensions and Indexes
-      # Create lists ensuring deterministic ordering
-      services = sorted(list(demands.keys()))
-      real_units = sorted(list(capacities.keys()))
-
-      # **Robustness Feature**: Add Virtual Overflow Node
-      # This ensures the problem is always feasible even if Total Demand > Total Capacity
-      units = real_units + ["Overflow"]
-
-      num_services = len(services)
-      num_units = len(units)  # Includes Overflow
-      num_vars = num_services * num_units
-
-      if num_vars == 0:
-        logger.warning("Optimization input dimensions are zero.")
-        return json.dumps([])
-
-      # 3. Build Cost Vector 'c' (Minimize Cost)
-      # - Real Units: Cost = -1.0 * Affinity (Maximize Fit)
-      # - Overflow:   Cost = +100.0 (High Penalty)
-      c_list = []
-      for s in services:
-        for u in units:
-          if u == "Overflow":
-            # High positive cost encourages solver to use this LAST
-            c_list.append(100.0)
-          else:
-            # Default neutral affinity 0.5 if missing in map
-            val = affinities.get(s, {}).get(u, 0.5)
-            # Negative cost turns Minimization into Maximization
-            c_list.append(-1.0 * val)
-
-      c = jnp.array(c_list)
-
-      # 4. Equality Constraints (Ax = b) -> Meet Service Demand
-      # For each service i: sum(x_{i,j} for all j including Overflow) = Demand_i
-      A_rows = []
-      b_vals = []
-      for s_idx, service in enumerate(services):
-        row = np.zeros(num_vars)
-        for u_idx in range(num_units):
-          idx = self._get_var_index(s_idx, u_idx, num_units)
-          row[idx] = 1.0
-        A_rows.append(row)
-        b_vals.append(demands[service])
-
-      A = jnp.array(np.vstack(A_rows))
-      b = jnp.array(b_vals)
-
-      # 5. Inequality Constraints (Gx >= h) -> Enforce Unit Capacity
-      # Standard form: Gx >= h.
-      # Logic: -Sum(x_{i,j} for all i) >= -Capacity_j
-      # **Robustness**: We ONLY generate rows for Real Units. Overflow has infinite capacity.
-      G_rows = []
-      h_vals = []
-      for u_idx, unit in enumerate(units):
-        if unit == "Overflow":
-          # Skip capacity constraints for Overflow
-          continue
-
-        row = np.zeros(num_vars)
-        for s_idx in range(num_services):
-          idx = self._get_var_index(s_idx, u_idx, num_units)
-          row[idx] = -1.0
-        G_rows.append(row)
-        h_vals.append(-1.0 * capacities[unit])
-
-      if G_rows:
-        G = jnp.array(np.vstack(G_rows))
-        h = jnp.array(h_vals)
-      else:
-        # Edge case: No real units provided, only Overflow?
-        # Create a dummy constraint 0 >= -inf to satisfy solver input requirements
-        G = jnp.zeros((1, num_vars))
-        h = jnp.array([-float("inf")])
-
-      # 6. Variable Bounds (l <= x <= u) -> Non-negativity
-      l = jnp.zeros(num_vars)
-      u = jnp.full(num_vars, jnp.inf)
-
-      # 7. Apply Custom "Hard" Constraints Logic
-      for rule in constraints:
-        if rule.get("type") == "force_flow":
-          s_name = rule.get("service")
-          u_name = rule.get("unit")
-          # Only apply if both entities exist in the current matrix
-          if s_name in services and u_name in units:
-            s_idx = services.index(s_name)
-            u_idx = units.index(u_name)
-            idx = self._get_var_index(s_idx, u_idx, num_units)
-
-            if "min" in rule:
-              l = l.at[idx].set(float(rule["min"]))
-            if "max" in rule:
-              u = u.at[idx].set(float(rule["max"]))
-
-      # 8. Create and Solve LP
-      lp = create_lp(c, A, b, G, h, l, u, use_sparse_matrix=False)
+      columns = self.solve_unit_assignment_columns(demand_json, capacity_json, affinity_json, constraints_json)
+      assignments = [
+        {"Service": service, "Unit": unit, "Patient_Count": count}
+        for service, unit, count in zip(columns.services, columns.units, columns.patient_counts.tolist())
+      ]
+      return orjson.dumps(assignments).decode()
 
-      # r2HPDHG: Reflected Restarted Halpern Primal-Dual Hybrid Gradient
-      solver = r2HPDHG(eps_abs=1e-3, eps_rel=1e-3, verbose=False, jit=True)
-      result = solver.optimize(lp)
+    except Exception as e:
+      logger.error(f"Optimization Failure: {e}", exc_info=True)
+      return json.dumps({"error": str(e)})
 
-      # 9. Format Output
-      solution_flat = np.array(result.primal_solution)
-      assignments = []
+  def solve_unit_assignment_columns(
+    self,
+    demand_json: Union[str, Dict[str, float]],
+    capacity_json: Union[str, Dict[str, float]],
+    affinity_json: Union[str, Dict[str, Dict[str, float]]],
+    constraints_json: Union[str, List[Dict[str, Any]], None] = None,
+  ) -> AssignmentColumns:
+    """
+    Execute the Service-Unit Assignment optimization and return the result as columns.
 
-      for s_idx, service in enumerate(services):
-        for u_idx, unit in enumerate(units):
+    Problem Formulation:
+        Minimize Cost c^T x
+        Subject to:
+        Ax = b  (Demand constraints: Sum of allocations for service must equal demand)
+        Gx >= h (Capacity constraints: Sum of allocations for unit must not exceed capacity)
+        l <= x <= h (Non-negativity and forced assignments)
+
+    Overflow Extension:
+        A virtual unit "Overflow" is added with cost +100.
+        It is included in Ax=b (demand satisfaction) but excluded from Gx>=h (capacity limits).
+
+    Precision:
+        The LP is solved in float32: at eps_abs = eps_rel = 1e-3 PDHG does not need double
+        precision, and halving the element size halves memory traffic in its bandwidth-bound
+        matrix-vector products. If the float32 run does not terminate OPTIMAL with a finite
+        solution, the solve is repeated in float64 (x64 enabled for that call only).
+
+    Each input may be given either as JSON (as the UDF receives it) or as the
+    already-decoded dict/list, which in-process callers pass to skip an encode and decode.
+
+    Args:
+        demand_json (Union[str, Dict]): Service Name -> Patient Count.
+        capacity_json (Union[str, Dict]): Unit Name -> Bed Count.
+        affinity_json (Union[str, Dict]): Service -> Unit -> Score (0.0 to 1.0).
+        constraints_json (Union[str, List, None]): List of specific rules (e.g., forcing flow).
+
+    Returns:
+        AssignmentColumns: Assignments above the noise floor, counts rounded to 2 decimals.
+
+    Raises:
+        Exception: Any parsing or solver failure is propagated to the caller.
+    """
+    # 1. Parse Inputs (JSON strings only; dicts/lists are used as given)
+    demands: Dict[str, float] = _decode(demand_json)
+    capacities: Dict[str, float] = _decode(capacity_json)
+    affinities: Dict[str, Dict[str, float]] = _decode(affinity_json)
+    constraints: List[Dict[str, Any]] = _decode(constraints_json) if constraints_json else []
+
+    # 2. Extract Dimensions and Indexes
+    # Create lists ensuring deterministic ordering
+    services = sorted(list(demands.keys()))
+    real_units = sorted(list(capacities.keys()))
+
+    # **Robustness Feature**: Add Virtual Overflow Node
+    # This ensures the problem is always feasible even if Total Demand > Total Capacity
+    units = real_units + ["Overflow"]
+
+    num_services = len(services)
+    num_units = len(units)  # Includes Overflow
+    num_vars = num_services * num_units
+
+    if num_vars == 0:
+      logger.warning("Optimization input dimensions are zero.")
+      return AssignmentColumns([], [], np.empty(0))
+
+    service_idx = {s: i for i, s in enumerate(services)}
+    unit_idx = {u: j for j, u in enumerate(real_units)}
+    num_real_units = len(real_units)
+
+    # 3. Build Cost Vector 'c' (Minimize Cost)
+    # - Real Units: Cost = -1.0 * Affinity (Maximize Fit)
+    # - Overflow:   Cost = +100.0 (High Penalty)
+    # Default neutral affinity 0.5; only the provided overrides are visited.
+    affinity_mat = np.full((num_services, num_real_units), 0.5)
+    for s, row in affinities.items():
+      si = service_idx.get(s)
+      if si is None:
+        continue
+      for u, val in row.items():
+        ui = unit_idx.get(u)
+        if ui is not None:
+          affinity_mat[si, ui] = val
+
+    cost_mat = np.empty((num_services, num_units))
+    # Negative cost turns Minimization into Maximization
+    cost_mat[:, :num_real_units] = -affinity_mat
+    # High positive cost encourages solver to use Overflow LAST
+    cost_mat[:, num_real_units:] = 100.0
+
+    c = cost_mat.ravel()
+
+    # 4/5. Structural constraint matrices (A, G) depend only on the problem shape
+    # and are built inside `_solve_lp`.
+
+    # Ax = b -> Meet Service Demand
+    b = np.array([demands[service] for service in services], dtype=np.float64)
+
+    # Gx >= h -> Enforce Unit Capacity (Real Units only; Overflow is unbounded)
+    if num_real_units:
+      h = np.array([-1.0 * capacities[unit] for unit in real_units], dtype=np.float64)
+    else:
+      # Edge case: No real units provided, only Overflow?
+      # Pair the dummy 0 >= -inf row with an unbounded right-hand side
+      h = np.array([-np.inf])
+
+    # 6. Variable Bounds (l <= x <= u) -> Non-negativity
+    # Built as host (NumPy) arrays so rule overrides below are in-place scalar stores
+    # rather than one functional JAX copy per rule; converted once in `_solve_lp`.
+    l_np = np.zeros(num_vars)
+    u_np = np.full(num_vars, np.inf)
+
+    # 7. Apply Custom "Hard" Constraints Logic
+    for rule in constraints:
+      if rule.get("type") == "force_flow":
+        s_name = rule.get("service")
+        u_name = rule.get("unit")
+        # Only apply if both entities exist in the current matrix
+        if s_name in service_idx and (u_name in unit_idx or u_name == "Overflow"):
+          s_idx = service_idx[s_name]
+          u_idx = unit_idx.get(u_name, num_real_units)
           idx = self._get_var_index(s_idx, u_idx, num_units)
-          val = float(solution_flat[idx])
-          # Filter out numerical noise (e.g. 1e-12)
-          if val > 0.1:
-            assignments.append(
-              {
-                "Service": service,
-                "Unit": unit,
-                "Patient_Count": round(val, 2),
-              }
-            )
-
-      return json.dumps(assignments)
 
-    except Exception as e:
-      logger.error(f"Optimization Failure: {e}", exc_info=True)
-      return json.dumps({"error": str(e)})
+          if "min" in rule:
+            l_np[idx] = float(rule["min"])
+          if "max" in rule:
+            u_np[idx] = float(rule["max"])
+
+    # 8. Create and Solve LP (fp32 first, fp64 only if that fails to converge)
+    result = self._solve_lp(c, b, h, l_np, u_np, num_services, num_real_units, use_fp64=False)
+    if not self._is_converged(result):
+      logger.info("fp32 solve did not converge; retrying in fp64")
+      result = self._solve_lp(c, b, h, l_np, u_np, num_services, num_real_units, use_fp64=True)
+
+    # 9. Format Output
+    # Pull the solution to host once and view it as a (Service x Unit) matrix
+    solution = np.asarray(result.primal_solution, dtype=np.float64).reshape(num_services, num_units)
+
+    # Filter out numerical noise (e.g. 1e-12)
+    s_idxs, u_idxs = np.nonzero(solution > 0.1)
+    counts = solution[s_idxs, u_idxs].round(2)
+
+    return AssignmentColumns(
+      [services[s_idx] for s_idx in s_idxs.tolist()],
+      [units[u_idx] for u_idx in u_idxs.tolist()],
+      counts,
+    )
 
 
 # Singleton instance to be imported by DuckDB initializer or API routes
@@ -11,10 +11,13 @@ This approach leverages the model's ability to perform pattern matching and
 analogy, significantly reducing syntax errors for complex queries.
 """
 
-import json
+import functools
+import heapq
 import os
 import re
-from typing import List, Dict, Any, Set, Tuple
+from collections import defaultdict
+from typing import List, Dict, Any, DefaultDict, FrozenSet, NamedTuple, Set, Tuple
+import orjson
 from app.services.prompt_engineering.interfaces import PromptStrategy
 
 # Helper to locate the standard content pack
@@ -22,6 +25,45 @@ from app.services.prompt_engineering.interfaces import PromptStrategy
 current_dir = os.path.dirname(os.path.abspath(__file__))
 DATA_FILE_PATH = os.path.abspath(os.path.join(current_dir, "../../../../data/initial_templates.json"))
 
+# Tokenizer cleanup: drop everything except [a-zA-Z0-9] and whitespace.
+# ASCII text (the common case) is handled by a C-level translate deletion table;
+# the compiled regex covers non-ASCII input with identical semantics.
+_ASCII_PUNCT_TABLE = str.maketrans("", "", "".join(c for c in map(chr, range(128)) if not (c.isalnum() or c.isspace())))
+_NON_ALNUM_RE = re.compile(r"[^a-zA-Z0-9\s]")
+
+# Shared, read-only stop-word list removed from every token set
+_STOP_WORDS: FrozenSet[str] = frozenset({"the", "a", "an", "of", "in", "for", "to", "is", "what", "show", "me"})
+
+
+class FewShotExample(NamedTuple):
+  """
+  A retrieved template, reduced to what the prompt needs.
+
+  Attributes:
+      question (str): The template's description (or title) phrased as the example question.
+      sql (str): The template's SQL, handlebars included.
+  """
+
+  question: str
+  sql: str
+
+
+@functools.lru_cache(maxsize=1)
+def _load_template_registry() -> Tuple[Dict[str, Any], ...]:
+  """
+  Reads and parses the template registry once per process.
+
+  Returns:
+      Tuple[Dict[str, Any], ...]: The template objects, or an empty tuple on failure.
+  """
+  if not os.path.exists(DATA_FILE_PATH):
+    return ()
+  try:
+    with open(DATA_FILE_PATH, "rb") as f:
+      return tuple(orjson.loads(f.read()))
+  except Exception:
+    return ()
+
 
 class TemplateRetriever:
   """
@@ -40,22 +82,30 @@ class TemplateRetriever:
                           If None, attempts to load from disk (initial_templates.json).
     """
     self.templates = templates_source if templates_source is not None else self._load_templates_from_disk()
-    self._stop_words = {"the", "a", "an", "of", "in", "for", "to", "is", "what", "show", "me"}
+
+    # Tokenize each template "Document" (Title, Desc, Category) once, not per query
+    self._doc_tokens: List[FrozenSet[str]] = [
+      frozenset(self._tokenize(f"{t.get('title', '')} {t.get('description', '')} {t.get('category', '')}"))
+      for t in self.templates
+    ]
+
+    # Inverted index: token -> indices of templates containing it.
+    # Templates sharing no token with the query score 0 and are never visited.
+    postings: DefaultDict[str, List[int]] = defaultdict(list)
+    for idx, tokens in enumerate(self._doc_tokens):
+      for token in tokens:
+        postings[token].append(idx)
+    self._postings: Dict[str, List[int]] = dict(postings)
 
   def _load_templates_from_disk(self) -> List[Dict[str, Any]]:
     """
     Loads the template registry from the JSON file system.
+    The parsed file is cached at module scope, so only the first call touches disk.
 
     Returns:
         List[Dict[str, Any]]: The list of template objects, or empty list on failure.
     """
-    if not os.path.exists(DATA_FILE_PATH):
-      return []
-    try:
-      with open(DATA_FILE_PATH, "r", encoding="utf-8") as f:
-        return json.load(f)
-    except Exception:
-      return []
+    return list(_load_template_registry())
 
   def _tokenize(self, text: str) -> Set[str]:
     """
@@ -69,14 +119,19 @@ class TemplateRetriever:
         Set[str]: Unique, lowercase tokens.
     """
     # Remove non-alphanumeric chars (keep spaces)
-    clean = re.sub(r"[^a-zA-Z0-9\s]", "", text.lower())
+    lowered = text.lower()
+    if lowered.isascii():
+      clean = lowered.translate(_ASCII_PUNCT_TABLE)
+    else:
+      clean = _NON_ALNUM_RE.sub("", lowered)
     tokens = set(clean.split())
-    return tokens - self._stop_words
+    return tokens - _STOP_WORDS
 
   def _calculate_jaccard_similarity(self, query_tokens: Set[str], doc_tokens: Set[str]) -> float:
     """
     Computes the Jaccard Index between two sets.
-    Formula: Intersection / Union.
+    Formula: Intersection / Union, with |Union| = |A| + |B| - |Intersection|
+    so only the intersection set is materialized.
 
     Args:
         query_tokens: Tokens from user request.
@@ -85,13 +140,12 @@ class TemplateRetriever:
     Returns:
         float: Score between 0.0 (No overlap) and 1.0 (Identical).
     """
-    if not query_tokens or not doc_tokens:
+    intersection = len(query_tokens & doc_tokens)
+    if not intersection:
       return 0.0
-    intersection = len(query_tokens.intersection(doc_tokens))
-    union = len(query_tokens.union(doc_tokens))
-    return intersection / union
+    return intersection / (len(query_tokens) + len(doc_tokens) - intersection)
 
-  def find_relevant_examples(self, user_query: str, limit: int = 3) -> List[Dict[str, str]]:
+  def find_relevant_examples(self, user_query: str, limit: int = 3) -> List[FewShotExample]:
     """
     Retrieves the top N matching templates for a given question.
 
@@ -100,27 +154,43 @@ class TemplateRetriever:
         limit: Maximum matches to return.
 
     Returns:
-        List[Dict[str, str]]: A list of simplified objects containing 'question' and 'sql'.
+        List[FewShotExample]: The matches as (question, sql) pairs, best first.
     """
     query_tokens = self._tokenize(user_query)
-    scored_candidates: List[Tuple[float, Dict[str, Any]]] = []
-
-    for t in self.templates:
-      # Create a "Document" from Title, Desc, and Category for matching
-      doc_text = f"{t.get('title', '')} {t.get('description', '')} {t.get('category', '')}"
-      doc_tokens = self._tokenize(doc_text)
+    if limit <= 0:
+      return []
 
+    # Only templates sharing at least one token can score above 0.
+    # Visit them in library order so ties keep the original ranking.
+    candidates = set().union(*(self._postings.get(token, ()) for token in query_tokens))
+
+    # Running top-k as a min-heap of (score, -idx): the root is the weakest kept match,
+    # and on equal scores the later template, so earlier templates win ties.
+    heap: List[Tuple[float, int]] = []
+    query_size = len(query_tokens)
+    for idx in sorted(candidates):
+      doc_tokens = self._doc_tokens[idx]
+      if len(heap) == limit:
+        # Jaccard can never exceed min(|q|, |d|) / max(|q|, |d|); skip candidates that cannot beat the root
+        doc_size = len(doc_tokens)
+        if min(query_size, doc_size) / max(query_size, doc_size) <= heap[0][0]:
+          continue
       score = self._calculate_jaccard_similarity(query_tokens, doc_tokens)
-      if score > 0:
-        scored_candidates.append((score, t))
+      if score <= 0:
+        continue
+      if len(heap) < limit:
+        heapq.heappush(heap, (score, -idx))
+      elif score > heap[0][0]:
+        heapq.heapreplace(heap, (score, -idx))
 
-    # Sort descending by score
-    scored_candidates.sort(key=lambda x: x[0], reverse=True)
+    # Descending score, then ascending library index
+    top = sorted(heap, reverse=True)
 
     results = []
-    for _, tmpl in scored_candidates[:limit]:
+    for _, neg_idx in top:
+      tmpl = self.templates[-neg_idx]
       results.append(
-        {"question": tmpl.get("description") or tmpl.get("title", "Unknown"), "sql": tmpl.get("sql_template", "")}
+        FewShotExample(tmpl.get("description") or tmpl.get("title", "Unknown"), tmpl.get("sql_template", ""))
       )
 
     return results
@@ -133,15 +203,34 @@ class FewShotRAGStrategy(PromptStrategy):
   template library based on the specific question asked.
   """
 
+  # Standard Expert Persona
+  SYSTEM_INSTRUCTION = (
+    "You are an expert DuckDB SQL Analyst. "
+    "Use the provided similar examples to learn the correct table structures and logic patterns. "
+    "Adapt these patterns to answer the new question."
+  )
+
+  # Appended to the system prompt so the per-schema prefix is stable across questions;
+  # the retrieved examples depend on the question and stay in the user prompt
+  SCHEMA_TEMPLATE = "\n\nDatabase Schema:\n{schema}"
+
+  USER_PROMPT_TEMPLATE = (
+    "Here are valid SQL examples for similar requests:\n"
+    "{examples}\n\n"
+    "Now answer this specific Question:\n"
+    "{question}\n\n"
+    "SQL Query:"
+  )
+
   def __init__(self, retriever: TemplateRetriever | None = None) -> None:
     """
     Initialize the strategy.
 
     Args:
         retriever: Optional dependency injection for testing.
-                   If None, creates a default Internal TemplateRetriever.
+                   If None, reuses the shared default TemplateRetriever.
     """
-    self.retriever = retriever or TemplateRetriever()
+    self.retriever = retriever or _default_retriever()
 
   def get_strategy_name(self) -> str:
     """
@@ -152,12 +241,12 @@ class FewShotRAGStrategy(PromptStrategy):
     """
     return "rag-few-shot"
 
-  def _format_examples(self, examples: List[Dict[str, str]]) -> str:
+  def _format_examples(self, examples: List[FewShotExample]) -> str:
     """
     Formats the retrieved examples into a string block.
 
     Args:
-        examples: List of dictionaries with 'question' and 'sql'.
+        examples: Retrieved (question, sql) examples.
 
     Returns:
         str: Formatted string block.
@@ -165,14 +254,12 @@ class FewShotRAGStrategy(PromptStrategy):
     if not examples:
       return "No similar examples found."
 
-    blocks = []
-    for i, ex in enumerate(examples, 1):
-      # Clean up SQL (remove handlebars if we want to show pure structure,
-      # or keep them if we want the LLM to learn parameterization).
-      # We keep them here as it teaches the LLM how to write adaptable queries.
-      block = f"--- Example {i} ---\nQuestion: {ex['question']}\nSQL:\n{ex['sql']}\n"
-      blocks.append(block)
-    return "\n".join(blocks)
+    # Clean up SQL (remove handlebars if we want to show pure structure,
+    # or keep them if we want the LLM to learn parameterization).
+    # We keep them here as it teaches the LLM how to write adaptable queries.
+    return "\n".join(
+      f"--- Example {i} ---\nQuestion: {question}\nSQL:\n{sql}\n" for i, (question, sql) in enumerate(examples, 1)
+    )
 
   def build_messages(self, user_query: str, schema_context: str) -> List[Dict[str, str]]:
     """
@@ -181,7 +268,7 @@ class FewShotRAGStrategy(PromptStrategy):
     Steps:
     1. Retrieve top 3 similar templates using the Retriever.
     2. Format them as learning examples.
-    3. Inject them into the User prompt before the actual question.
+    3. Inject them into the User prompt before the actual question; the schema goes in the System prompt.
 
     Args:
         user_query: The user's question.
@@ -194,24 +281,22 @@ class FewShotRAGStrategy(PromptStrategy):
     relevant_examples = self.retriever.find_relevant_examples(user_query, limit=3)
     examples_text = self._format_examples(relevant_examples)
 
-    # 2. Build System Prompt (Standard Expert Persona)
-    system_content = (
-      "You are an expert DuckDB SQL Analyst. "
-      "Use the provided similar examples to learn the correct table structures and logic patterns. "
-      "Adapt these patterns to answer the new question."
-    )
-
-    # 3. Build User Prompt (Context + Examples + Task)
-    user_content = (
-      f"Database Schema:\n{schema_context}\n\n"
-      f"Here are valid SQL examples for similar requests:\n"
-      f"{examples_text}\n\n"
-      f"Now answer this specific Question:\n"
-      f"{user_query}\n\n"
-      f"SQL Query:"
-    )
+    # 2. Build Prompts (Persona + Schema, then Examples + Task)
+    system_content = self.SYSTEM_INSTRUCTION + self.SCHEMA_TEMPLATE.format_map({"schema": schema_context})
+    user_content = self.USER_PROMPT_TEMPLATE.format_map({"examples": examples_text, "question": user_query})
 
     return [
       {"role": "system", "content": system_content},
       {"role": "user", "content": user_content},
     ]
+
+
+@functools.lru_cache(maxsize=1)
+def _default_retriever() -> TemplateRetriever:
+  """
+  Shared retriever over the on-disk registry, so the token index is built once.
+
+  Returns:
+      TemplateRetriever: The process-wide default retriever.
+  """
+  return TemplateRetriever()
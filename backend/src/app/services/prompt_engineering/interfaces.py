@@ -37,8 +37,11 @@ class PromptStrategy(ABC):
     Constructs the full message payload for the LLM.
 
     This usually involves:
-    1. constructing a System Prompt containing role definitions and constraints.
-    2. constructing a User Message containing the specific question and schema.
+    1. constructing a System Prompt containing role definitions, constraints and the schema.
+    2. constructing a User Message containing the specific question.
+
+    Content that is the same for every question (instructions, schema) belongs in the
+    leading System Prompt, so providers with automatic prefix caching can reuse it.
 
     Args:
         user_query: The natural language question asked by the user.
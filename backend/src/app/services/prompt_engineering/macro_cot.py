@@ -44,6 +44,31 @@ class MacroCoTStrategy(PromptStrategy):
     "- GENERATE_DATES(start, end) -> TABLE: Generates a date spine for filling sparse data gaps.\n"
   )
 
+  # The system prompt is static: compose it once at class definition time.
+  # It differs from Zero-Shot by:
+  # 1. Defining the Persona as a "Clinical Data Scientist".
+  # 2. Explicitly listing the Macros.
+  # 3. Enforcing a "Reasoning First" output structure.
+  SYSTEM_INSTRUCTION = (
+    "You are a Clinical Data Scientist. Your job is to answer hospital operational questions using DuckDB SQL."
+    "\n"
+    "\nGUIDELINES:"
+    "\n1. USE MACROS: Do not write complex arithmetic manually (e.g. standard deviation, z-scores). "
+    "Use the provided Domain Macros instead."
+    "\n2. THINK STEP-BY-STEP: Before writing SQL, break down the logic: "
+    "Identify the Unit, Identify the Time Window, Choose the Statistical Test."
+    "\n3. HANDLE SPARSITY: If asking for time-series trends, always LEFT JOIN against `GENERATE_DATES` macro."
+    "\n4. OUTPUT FORMAT: Return valid SQL only."
+    "\n\n" + MACRO_LIBRARY_DOCS
+  )
+
+  # Appended to the system prompt so the per-schema prefix is stable across questions
+  SCHEMA_TEMPLATE = "\n\nSchema Context:\n{schema}"
+
+  USER_PROMPT_TEMPLATE = (
+    "User Question: {question}\n\nLet's think step by step to select the right Macros and Tables, then generate the SQL:"
+  )
+
   def get_strategy_name(self) -> str:
     """
     Returns the unique identifier for logging purposes.
@@ -53,31 +78,6 @@ class MacroCoTStrategy(PromptStrategy):
     """
     return "cot-macro"
 
-  def _compose_system_instruction(self) -> str:
-    """
-    Constructs the System Prompt.
-
-    The prompt differs from Zero-Shot by:
-    1. Defining the Persona as a "Clinical Data Scientist".
-    2. Explicitly listing the Macros.
-    3. Enforcing a "Reasoning First" output structure.
-
-    Returns:
-        str: The full system instruction block.
-    """
-    return (
-      "You are a Clinical Data Scientist. Your job is to answer hospital operational questions using DuckDB SQL."
-      "\n"
-      "\nGUIDELINES:"
-      "\n1. USE MACROS: Do not write complex arithmetic manually (e.g. standard deviation, z-scores). "
-      "Use the provided Domain Macros instead."
-      "\n2. THINK STEP-BY-STEP: Before writing SQL, break down the logic: "
-      "Identify the Unit, Identify the Time Window, Choose the Statistical Test."
-      "\n3. HANDLE SPARSITY: If asking for time-series trends, always LEFT JOIN against `GENERATE_DATES` macro."
-      "\n4. OUTPUT FORMAT: Return valid SQL only."
-      f"\n\n{self.MACRO_LIBRARY_DOCS}"
-    )
-
   def build_messages(
     self, user_query: str, schema_context: str, additional_context: Optional[str] = None
   ) -> List[Dict[str, str]]:
@@ -92,13 +92,9 @@ class MacroCoTStrategy(PromptStrategy):
     Returns:
         List[Dict[str, str]]: The formatted messages for the LLM.
     """
-    system_content = self._compose_system_instruction()
+    system_content = self.SYSTEM_INSTRUCTION + self.SCHEMA_TEMPLATE.format_map({"schema": schema_context})
 
-    user_content = (
-      f"Schema Context:\n{schema_context}\n\n"
-      f"User Question: {user_query}\n\n"
-      "Let's think step by step to select the right Macros and Tables, then generate the SQL:"
-    )
+    user_content = self.USER_PROMPT_TEMPLATE.format_map({"question": user_query})
 
     return [
       {"role": "system", "content": system_content},
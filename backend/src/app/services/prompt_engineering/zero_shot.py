@@ -21,6 +21,24 @@ class ZeroShotStrategy(PromptStrategy):
   Relying purely on the model's internal knowledge of SQL and the provided schema context.
   """
 
+  # Fixed system prompt, composed once at class definition time.
+  SYSTEM_INSTRUCTION = (
+    "You are an expert data analyst specializing in hospital analytics."
+    "\nYour goal is to convert natural language questions into executable SQL queries."
+    "\n"
+    "\nCRITICAL RULES:"
+    "\n1. Dialect: Use DuckDB SQL syntax (PostgreSQL compatible)."
+    "\n2. Scope: Use ONLY the tables and columns defined in the context."
+    "\n3. Safety: Do not write queries that modify data (INSERT/UPDATE/DROP)."
+    "\n4. Output: Return ONLY the raw SQL code. Do not wrap in markdown. Do not provide explanations."
+  )
+
+  # The schema is appended to the system prompt rather than the user prompt: it is identical
+  # for every question, so keeping it in the leading message lets provider prefix caching hit.
+  SCHEMA_TEMPLATE = "\n\nHere is the database schema:\n=====\n{schema}\n====="
+
+  USER_PROMPT_TEMPLATE = "Question: {question}\n\nSQL Query:"
+
   def get_strategy_name(self) -> str:
     """
     Return the identifier for logging.
@@ -30,24 +48,6 @@ class ZeroShotStrategy(PromptStrategy):
     """
     return "zero-shot"
 
-  def _compose_system_instruction(self) -> str:
-    """
-    Internal helper to build the System Prompt.
-
-    Returns:
-        str: The fixed system instruction block.
-    """
-    return (
-      "You are an expert data analyst specializing in hospital analytics."
-      "\nYour goal is to convert natural language questions into executable SQL queries."
-      "\n"
-      "\nCRITICAL RULES:"
-      "\n1. Dialect: Use DuckDB SQL syntax (PostgreSQL compatible)."
-      "\n2. Scope: Use ONLY the tables and columns defined in the context."
-      "\n3. Safety: Do not write queries that modify data (INSERT/UPDATE/DROP)."
-      "\n4. Output: Return ONLY the raw SQL code. Do not wrap in markdown. Do not provide explanations."
-    )
-
   def build_messages(self, user_query: str, schema_context: str) -> List[Dict[str, str]]:
     """
     Constructs the zero-shot prompt payload.
@@ -59,11 +59,9 @@ class ZeroShotStrategy(PromptStrategy):
     Returns:
         List[Dict[str, str]]: The formatted messages for the LLM API.
     """
-    system_content = self._compose_system_instruction()
+    system_content = self.SYSTEM_INSTRUCTION + self.SCHEMA_TEMPLATE.format_map({"schema": schema_context})
 
-    # We inject the schema into the User Prompt to ensure it is "attended" to
-    # most recently by the model, a common best practice for context adherence.
-    user_content = f"Here is the database schema:\n=====\n{schema_context}\n=====\n\nQuestion: {user_query}\n\nSQL Query:"
+    user_content = self.USER_PROMPT_TEMPLATE.format_map({"question": user_query})
 
     return [
       {"role": "system", "content": system_content},
@@ -10,26 +10,64 @@ It handles:
 2. Restore Defaults (Re-creating the default dashboard on demand).
 """
 
+import copy
 import uuid
 import logging
 import re
-from typing import List, Dict, Any, Optional
-from sqlalchemy import select, func
+from typing import List, Dict, Any, Optional, Pattern, Tuple
+from sqlalchemy import Row, insert, or_, select, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.dashboard import Dashboard, Widget
+from app.models.dashboard import DEFAULT_DASHBOARD_NAME, Dashboard, Widget
 from app.models.template import WidgetTemplate
 from app.models.user import User
 
 logger = logging.getLogger("provisioning")
 
+# Handlebar placeholder, e.g. {{unit}} or {{ unit }}
+_HANDLEBAR_RE = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
 
 class ProvisioningService:
   """
   Service responsible for creating default asset structures for users.
   """
 
-  DEFAULT_DASHBOARD_NAME = "Hospital Command Center"
+  # Shared with the model so the restored-name unique index matches the names generated here
+  DEFAULT_DASHBOARD_NAME = DEFAULT_DASHBOARD_NAME
+  RESTORE_NAME_ATTEMPTS = 3
+
+  # Layout Strategy: 2 Column Grid (Width 6 per widget, Height 4 per row)
+  WIDGETS_PER_ROW = 2
+  COL_WIDTH = 6
+  ROW_HEIGHT = 4
+
+  def __init__(self) -> None:
+    """
+    Initialize the service with an empty per-template preparation cache.
+    """
+    # template id -> ((title, sql_template, parameters_schema), (viz_type, processed_sql))
+    # The source fields are stored alongside the result so an edited template is
+    # detected on the next lookup, without hooking every registry mutation path.
+    self._prepared_cache: Dict[uuid.UUID, Tuple[Tuple[str, str, Any], Tuple[str, str]]] = {}
+
+  # Visualization heuristics in priority order; the highest-priority rule whose keywords
+  # appear in the title wins. Each rule is (viz_type, title keywords, requires an ungrouped query).
+  _VIZ_RULES: Tuple[Tuple[str, Tuple[str, ...], bool], ...] = (
+    # 1. Scalar / Single Number -> Metric
+    ("metric", ("probability", "rate", "growth"), True),
+    # 2. Trends / Time Series -> Chart
+    ("bar_chart", ("over time", "daily", "monthly"), False),
+    # 3. Distributions -> Pie
+    ("pie", ("breakdown", "share"), False),
+    # 4. Comparisons -> Bar Chart
+    ("bar_chart", ("compare", "versus"), False),
+  )
+  _KEYWORD_RULE: Dict[str, int] = {kw: rank for rank, (_, keywords, _) in enumerate(_VIZ_RULES) for kw in keywords}
+  # One scan finds every keyword occurrence; the zero-width lookahead also reports
+  # keywords that overlap a previous match, preserving plain substring semantics.
+  _TITLE_KEYWORDS_RE: Pattern[str] = re.compile("(?=(" + "|".join(map(re.escape, _KEYWORD_RULE)) + "))")
 
   async def provision_new_user(self, db: AsyncSession, user: User) -> None:
     """
@@ -57,12 +95,21 @@ class ProvisioningService:
     """
     logger.info(f"Restoring defaults for user: {user.id}")
 
-    # 1. Determine safe name
-    target_name = await self._get_safe_dashboard_name(db, user.id, self.DEFAULT_DASHBOARD_NAME)
-
-    # 2. Create logic
-    dashboard = await self._create_dashboard_from_templates(db, user, target_name)
-    return dashboard
+    for attempt in range(self.RESTORE_NAME_ATTEMPTS):
+      # 1. Determine safe name
+      target_name = await self._get_safe_dashboard_name(db, user.id, self.DEFAULT_DASHBOARD_NAME)
+
+      # 2. Create logic
+      # Flushed inside a savepoint: if a concurrent restore committed the same "(Restored N)"
+      # name first, the unique index rejects ours and we pick the next free suffix.
+      try:
+        async with db.begin_nested():
+          dashboard = await self._create_dashboard_from_templates(db, user, target_name)
+        return dashboard
+      except IntegrityError:
+        if attempt == self.RESTORE_NAME_ATTEMPTS - 1:
+          raise
+        logger.warning(f"Dashboard name '{target_name}' was claimed concurrently; retrying.")
 
   async def _get_safe_dashboard_name(self, db: AsyncSession, user_id: uuid.UUID, base_name: str) -> str:
     """
@@ -77,26 +124,24 @@ class ProvisioningService:
     Returns:
         str: A unique name.
     """
-    # Check exact match first
-    query = select(Dashboard).where(Dashboard.owner_id == user_id, Dashboard.name == base_name)
+    # One round-trip: the base name plus every "(Restored...)" variant owned by the user
+    restored_base = f"{base_name} (Restored)"
+    query = select(Dashboard.name).where(
+      Dashboard.owner_id == user_id,
+      or_(Dashboard.name == base_name, Dashboard.name.startswith(f"{base_name} (Restored", autoescape=True)),
+    )
     result = await db.execute(query)
-    if not result.scalars().first():
+    existing_names = set(result.scalars().all())
+
+    # Check exact match first
+    if base_name not in existing_names:
       return base_name
 
     # If base exists, try "(Restored)"
-    restored_base = f"{base_name} (Restored)"
-    query = select(Dashboard).where(Dashboard.owner_id == user_id, Dashboard.name == restored_base)
-    result = await db.execute(query)
-    if not result.scalars().first():
+    if restored_base not in existing_names:
       return restored_base
 
     # If that exists, find the highest suffix number
-    # Pattern: "Name (Restored X)"
-    pattern = f"{base_name} (Restored %)%"
-    query = select(Dashboard.name).where(Dashboard.owner_id == user_id, Dashboard.name.like(pattern))
-    result = await db.execute(query)
-    existing_names = result.scalars().all()
-
     max_suffix = 0
     # Match: "Name (Restored 1)"
     regex = re.compile(rf"{re.escape(base_name)} \(Restored (\d+)\)")
@@ -120,80 +165,117 @@ class ProvisioningService:
     Returns:
         Dashboard: The created entity (added to session, not committed).
     """
-    # 1. Create Dashboard Header
+    # 1. Fetch Templates
+    # An AsyncSession cannot run statements concurrently, so instead of overlapping the
+    # SELECT with the dashboard INSERT, read first: the SELECT's autoflush then has nothing
+    # of ours pending, and the dashboard and its widgets go out together in a single flush.
+    # Project only the columns provisioning reads; rows expose them as attributes,
+    # so the heuristics below work on them exactly as on ORM entities.
+    query = select(
+      WidgetTemplate.id,
+      WidgetTemplate.title,
+      WidgetTemplate.category,
+      WidgetTemplate.sql_template,
+      WidgetTemplate.parameters_schema,
+    ).order_by(WidgetTemplate.category, WidgetTemplate.title)
+    result = await db.execute(query)
+    templates: List[Row] = result.all()
+
+    # 2. Create Dashboard Header
     dashboard_id = uuid.uuid4()
     dashboard = Dashboard(id=dashboard_id, name=title, owner_id=user.id)
     db.add(dashboard)
 
-    # 2. Fetch Templates
-    query = select(WidgetTemplate).order_by(WidgetTemplate.category, WidgetTemplate.title)
-    result = await db.execute(query)
-    templates: List[WidgetTemplate] = result.scalars().all()
-
     if not templates:
       logger.warning("No templates found during provisioning.")
       return dashboard  # Return empty dashboard
 
     # 3. Instantiate Widgets
-    for idx, template in enumerate(templates):
-      # Layout Strategy: 2 Column Grid (Width 6 per widget)
-      widgets_per_row = 2
-      col_width = 6
-
-      row_index = idx // widgets_per_row
-      col_index = (idx % widgets_per_row) * col_width
-
-      viz_type = self._determine_visual_type(template)
-      config = self._build_config(template, viz_type)
+    widget_rows: List[Dict[str, Any]] = []
+    for template, (col_index, row_offset) in zip(templates, self._grid_positions(len(templates))):
+      viz_type, processed_sql = self._prepare_template(template)
+      config: Dict[str, Any] = {"query": processed_sql}
 
       # Inject Layout
       config["x"] = col_index
-      config["y"] = row_index * 4
-      config["w"] = col_width
-      config["h"] = 4
-
-      widget = Widget(
-        id=uuid.uuid4(),
-        dashboard_id=dashboard_id,
-        title=template.title,
-        type="SQL",
-        visualization=viz_type,
-        config=config,
+      config["y"] = row_offset
+      config["w"] = self.COL_WIDTH
+      config["h"] = self.ROW_HEIGHT
+
+      widget_rows.append(
+        {
+          "id": uuid.uuid4(),
+          "dashboard_id": dashboard_id,
+          "title": template.title,
+          "type": "SQL",
+          "visualization": viz_type,
+          "config": config,
+        }
       )
-      db.add(widget)
+
+    # The dashboard row must exist before its widgets reference it
+    await db.flush()
+    # One executemany INSERT for every widget, without building ORM instances
+    await db.execute(insert(Widget), widget_rows)
 
     logger.info(f"Provisioned dashboard '{title}' with {len(templates)} widgets.")
     return dashboard
 
-  def _determine_visual_type(self, template: WidgetTemplate) -> str:
+  def _prepare_template(self, template: WidgetTemplate) -> Tuple[str, str]:
     """
-    Heuristic algorithm to guess the best visualization based on the query semantics.
+    Resolves the visualization type and default-filled SQL for a template.
+    Results are memoized per template id, since every user is provisioned from the same registry.
 
     Args:
-        template (WidgetTemplate): The source template.
+        template (WidgetTemplate): The source template (ORM entity or projected row).
 
     Returns:
-        str: The visualization ID (e.g., 'metric', 'bar_chart', 'table').
+        Tuple[str, str]: The visualization ID and the processed SQL query.
+    """
+    source = (template.title, template.sql_template, template.parameters_schema)
+    cached = self._prepared_cache.get(template.id) if template.id is not None else None
+    if cached is not None and cached[0] == source:
+      return cached[1]
+
+    viz_type = self._determine_visual_type(template)
+    prepared = (viz_type, self._build_config(template, viz_type)["query"])
+    if template.id is not None:
+      # Snapshot the schema so in-place edits to the caller's dict still invalidate the entry
+      self._prepared_cache[template.id] = ((source[0], source[1], copy.deepcopy(source[2])), prepared)
+    return prepared
+
+  def _grid_positions(self, count: int) -> List[Tuple[int, int]]:
     """
-    sql_lower = template.sql_template.lower()
-    title_lower = template.title.lower()
+    Computes the (x, y) grid origin for each widget slot, filling rows left to right.
 
-    # 1. Scalar / Single Number -> Metric
-    if "probability" in title_lower or "rate" in title_lower or "growth" in title_lower:
-      if "group by" not in sql_lower:
-        return "metric"
+    Args:
+        count (int): Number of widgets to place.
 
-    # 2. Trends / Time Series -> Chart
-    if "over time" in title_lower or "daily" in title_lower or "monthly" in title_lower:
-      return "bar_chart"
+    Returns:
+        List[Tuple[int, int]]: Positions in slot order.
+    """
+    return [
+      (col * self.COL_WIDTH, row * self.ROW_HEIGHT)
+      for row, col in (divmod(idx, self.WIDGETS_PER_ROW) for idx in range(count))
+    ]
 
-    # 3. Distributions -> Pie
-    if "breakdown" in title_lower or "share" in title_lower:
-      return "pie"
+  def _determine_visual_type(self, template: WidgetTemplate) -> str:
+    """
+    Heuristic algorithm to guess the best visualization based on the query semantics.
 
-    # 4. Comparisons -> Bar Chart
-    if "compare" in title_lower or "versus" in title_lower:
-      return "bar_chart"
+    Args:
+        template (WidgetTemplate): The source template (ORM entity or projected row).
+
+    Returns:
+        str: The visualization ID (e.g., 'metric', 'bar_chart', 'table').
+    """
+    matched = {self._KEYWORD_RULE[m.group(1)] for m in self._TITLE_KEYWORDS_RE.finditer(template.title.lower())}
+
+    for rank in sorted(matched):
+      viz_type, _, scalar_only = self._VIZ_RULES[rank]
+      if scalar_only and "group by" in template.sql_template.lower():
+        continue
+      return viz_type
 
     return "table"
 
@@ -203,7 +285,7 @@ class ProvisioningService:
     Injects default parameter values into the SQL to ensure it executes without user input.
 
     Args:
-        template (WidgetTemplate): The source template.
+        template (WidgetTemplate): The source template (ORM entity or projected row).
         viz_type (str): The determined visualization type.
 
     Returns:
@@ -213,19 +295,15 @@ class ProvisioningService:
     params_schema = template.parameters_schema or {}
     properties = params_schema.get("properties", {})
 
-    # Replace handlebars {{ var }} with default values from schema
-    processed_sql = raw_sql
+    # Resolve each default once; strings must have quotes escaped for SQL
+    defaults: Dict[str, str] = {}
     for key, prop_def in properties.items():
       if "default" in prop_def:
         default_val = prop_def["default"]
-        # Must handle string quotes for SQL
-        if isinstance(default_val, str):
-          clean_val = str(default_val).replace("'", "''")
-          processed_sql = processed_sql.replace(f"{{{{{key}}}}}", str(clean_val))
-          processed_sql = processed_sql.replace(f"{{{{ {key} }}}}", str(clean_val))
-        else:
-          processed_sql = processed_sql.replace(f"{{{{{key}}}}}", str(default_val))
-          processed_sql = processed_sql.replace(f"{{{{ {key} }}}}", str(default_val))
+        defaults[key] = default_val.replace("'", "''") if isinstance(default_val, str) else str(default_val)
+
+    # Replace handlebars {{ var }} with default values in a single pass
+    processed_sql = _HANDLEBAR_RE.sub(lambda m: defaults.get(m.group(1), m.group(0)), raw_sql) if defaults else raw_sql
 
     config = {"query": processed_sql}
     return config
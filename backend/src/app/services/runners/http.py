@@ -6,12 +6,50 @@ data from HTTP endpoints. It utilizes `httpx` for asynchronous non-blocking I/O,
 essential for loading multiple widgets simultaneously on a dashboard.
 """
 
+import asyncio
 import httpx
 import logging
-from typing import Dict, Any, Optional
+import orjson
+from typing import Dict, Any, List, Optional, Sequence
 
 logger = logging.getLogger(__name__)
 
+# Shared connection pool for all HTTP widgets. Dashboards fire many widgets at once,
+# so reusing keep-alive connections saves a TCP/TLS handshake per request, and HTTP/2
+# multiplexes widgets that target the same host over a single connection.
+# httpx advertises (and transparently decodes) brotli and gzip bodies.
+# Timeouts are applied per request from each widget's configuration.
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=100, max_connections=200)
+_client: Optional[httpx.AsyncClient] = None
+
+# Upper bound on HTTP widgets in flight per dashboard refresh, so one large dashboard
+# cannot monopolise the shared pool (or flood the upstream API).
+HTTP_WIDGET_CONCURRENCY = 16
+
+
+def _get_client() -> httpx.AsyncClient:
+  """
+  Returns the shared AsyncClient, creating it on first use (or after shutdown).
+
+  Returns:
+      httpx.AsyncClient: The pooled client.
+  """
+  global _client
+  if _client is None or _client.is_closed:
+    _client = httpx.AsyncClient(http2=True, limits=_HTTP_LIMITS)
+  return _client
+
+
+async def close_http_client() -> None:
+  """
+  Closes the shared AsyncClient and its pooled connections.
+  Called from the application lifespan on shutdown.
+  """
+  global _client
+  if _client is not None:
+    await _client.aclose()
+    _client = None
+
 
 async def run_http_widget(config: Dict[str, Any], forward_auth_token: Optional[str] = None) -> Dict[str, Any]:
   """
@@ -57,21 +95,33 @@ async def run_http_widget(config: Dict[str, Any], forward_auth_token: Optional[s
       headers["Authorization"] = f"Bearer {forward_auth_token}"
 
   try:
-    async with httpx.AsyncClient(timeout=timeout_sec) as client:
-      logger.debug(f"Executing HTTP Widget: {method} {url}")
-
-      response = await client.request(method=method, url=url, headers=headers, params=query_params, json=json_body)
+    logger.debug(f"Executing HTTP Widget: {method} {url}")
+
+    response = await _get_client().request(
+      method=method, url=url, headers=headers, params=query_params, json=json_body, timeout=timeout_sec
+    )
+
+    # Non-2xx responses are reported directly; raise_for_status() would build and
+    # unwind an exception for every failing widget on each refresh.
+    if not response.is_success:
+      error_msg = f"HTTP Error {response.status_code}: {response.reason_phrase}"
+      logger.error(f"HTTP Widget Status Error: {url} - {error_msg}")
+      # Try to return the error body if available
+      try:
+        error_data = orjson.loads(response.content)
+      except orjson.JSONDecodeError:
+        error_data = None
 
-      # Raise exception for 4xx/5xx responses to catch in the block below
-      response.raise_for_status()
+      return {"data": error_data, "status": response.status_code, "error": error_msg}
 
-      # Attempt to parse JSON, fall back to text if not JSON
-      try:
-        data = response.json()
-      except ValueError:
-        data = {"raw_content": response.text}
+    # Attempt to parse JSON, fall back to text if not JSON.
+    # orjson parses the raw bytes directly, skipping httpx's decode-then-json.loads path.
+    try:
+      data = orjson.loads(response.content)
+    except orjson.JSONDecodeError:
+      data = {"raw_content": response.text}
 
-      return {"data": data, "status": response.status_code, "error": None}
+    return {"data": data, "status": response.status_code, "error": None}
 
   except httpx.TimeoutException:
     error_msg = f"Request timed out after {timeout_sec} seconds."
@@ -82,17 +132,6 @@ async def run_http_widget(config: Dict[str, Any], forward_auth_token: Optional[s
       "error": error_msg,
     }
 
-  except httpx.HTTPStatusError as e:
-    error_msg = f"HTTP Error {e.response.status_code}: {e.response.reason_phrase}"
-    logger.error(f"HTTP Widget Status Error: {url} - {error_msg}")
-    # Try to return the error body if available
-    try:
-      error_data = e.response.json()
-    except ValueError:
-      error_data = None
-
-    return {"data": error_data, "status": e.response.status_code, "error": error_msg}
-
   except httpx.RequestError as e:
     error_msg = f"Connection error: {str(e)}"
     logger.error(f"HTTP Widget Connection Error: {url} - {error_msg}")
@@ -102,3 +141,33 @@ async def run_http_widget(config: Dict[str, Any], forward_auth_token: Optional[s
     error_msg = f"Unexpected error: {str(e)}"
     logger.exception(f"HTTP Widget Validation Error: {url}")
     return {"data": None, "status": 500, "error": error_msg}
+
+
+async def run_widgets_parallel(
+  configs: Sequence[Dict[str, Any]],
+  forward_auth_token: Optional[str] = None,
+  max_concurrency: int = HTTP_WIDGET_CONCURRENCY,
+) -> List[Dict[str, Any]]:
+  """
+  Executes several HTTP widgets concurrently over the shared client.
+
+  Requests overlap, so a dashboard waits roughly for its slowest widget rather than the
+  sum of all of them, while a semaphore caps how many are in flight at once.
+
+  Args:
+      configs (Sequence[Dict[str, Any]]): Widget configurations, as accepted by `run_http_widget`.
+      forward_auth_token (Optional[str]): Token forwarded to every request (see `run_http_widget`).
+      max_concurrency (int): Maximum number of simultaneous requests.
+
+  Returns:
+      List[Dict[str, Any]]: One result per config, in input order.
+  """
+  semaphore = asyncio.Semaphore(max_concurrency)
+
+  async def _run(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one widget while holding the semaphore."""
+    async with semaphore:
+      return await run_http_widget(config, forward_auth_token=forward_auth_token)
+
+  # run_http_widget converts every failure into an error result, so gather never raises here
+  return await asyncio.gather(*(_run(config) for config in configs))
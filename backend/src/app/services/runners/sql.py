@@ -6,12 +6,16 @@ Security is primarily enforced by the Database Connection itself (Read-Only Mode
 We perform basic syntax checking but defer execution policy to DuckDB.
 """
 
+import functools
 import logging
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, Iterable, Iterator, List, Sequence, Tuple
 import sqlglot
 
 logger = logging.getLogger(__name__)
 
+# Rows pulled from DuckDB per fetchmany() call when no max_rows limit is set.
+FETCH_BATCH_SIZE = 2000
+
 
 class SQLSecurityError(Exception):
   """
@@ -21,6 +25,31 @@ class SQLSecurityError(Exception):
   pass
 
 
+@functools.lru_cache(maxsize=2048)
+def _parse_statement_count(query: str) -> int:
+  """
+  Parses a query with sqlglot and counts its statements.
+
+  Widget SQL is re-validated on every dashboard refresh, so the parse is memoized per
+  query string. Parse failures are logged once and reported as -1.
+
+  Args:
+      query (str): The raw SQL string.
+
+  Returns:
+      int: Number of parsed statements, or -1 if sqlglot could not parse the query.
+  """
+  try:
+    return len(sqlglot.parse(query, read="duckdb"))
+  except sqlglot.errors.ParseError as e:
+    # If we can't parse it, we probably shouldn't run it, but strictly speaking DuckDB might parse it better.
+    # We log logic errors but generally let it proceed to execution to get accurate DB errors
+    # unless it's fundamentally broken logic.
+    logger.warning(f"SQLParse Warning: {e}")
+    # Note: We allow execution even if sqlglot fails, because sqlglot might not cover 100% of DuckDB syntax.
+    return -1
+
+
 def validate_query_ast(query: str) -> None:
   """
   Parses the SQL query to ensure it is valid SQL structure.
@@ -40,19 +69,28 @@ def validate_query_ast(query: str) -> None:
   if not query or not query.strip():
     raise SQLSecurityError("Empty query.")
 
-  try:
-    # Just parse for validity check.
-    # We do NOT block statement types in the runner anymore.
-    statements = sqlglot.parse(query, read="duckdb")
-    if not statements:
-      raise SQLSecurityError("Empty query.")
-  except sqlglot.errors.ParseError as e:
-    # If we can't parse it, we probably shouldn't run it, but strictly speaking DuckDB might parse it better.
-    # We log logic errors but generally let it proceed to execution to get accurate DB errors
-    # unless it's fundamentally broken logic.
-    logger.warning(f"SQLParse Warning: {e}")
-    # Note: We allow execution even if sqlglot fails, because sqlglot might not cover 100% of DuckDB syntax.
-    pass
+  # Just parse for validity check (memoized per query string).
+  # We do NOT block statement types in the runner anymore.
+  if _parse_statement_count(query) == 0:
+    raise SQLSecurityError("Empty query.")
+
+
+def _iter_row_batches(cursor: Any, batch_size: int = FETCH_BATCH_SIZE) -> Iterator[Sequence[Tuple[Any, ...]]]:
+  """
+  Yields the pending result set in fixed-size chunks.
+
+  Pulling rows with fetchmany() keeps at most one chunk of raw tuples alive while the
+  caller converts them, instead of holding the whole fetchall() list next to the output.
+
+  Args:
+      cursor (Any): A DuckDB cursor with an executed query.
+      batch_size (int): Rows per fetchmany() call.
+
+  Yields:
+      Sequence[Tuple[Any, ...]]: Non-empty batches of rows.
+  """
+  while chunk := cursor.fetchmany(batch_size):
+    yield chunk
 
 
 def run_sql_widget(cursor: Any, config: Dict[str, Any]) -> Dict[str, Any]:
@@ -62,6 +100,9 @@ def run_sql_widget(cursor: Any, config: Dict[str, Any]) -> Dict[str, Any]:
   Args:
       cursor (Any): An active DuckDB standard cursor object.
       config (Dict[str, Any]): The configuration dictionary containing the 'query'.
+          Optional keys: 'params' (list) holds positional bind values for '?' placeholders;
+          'max_rows' (int) caps the result size; 'shape' set to
+          "columns" returns 'data' as one value list per column instead of row dicts.
 
   Returns:
       Dict[str, Any]: Execution result containing 'data', 'columns', or 'error'.
@@ -76,27 +117,40 @@ def run_sql_widget(cursor: Any, config: Dict[str, Any]) -> Dict[str, Any]:
       "error": "Missing SQL query in widget configuration.",
     }
 
-  # 2. Relaxed Validation (Optional Logging)
-  # We permit the query to pass through to the Read-Only connection.
-  try:
-    validate_query_ast(query)
-  except Exception as e:
-    logger.warning(f"AST Parse Warning: {e}")
+  # 2. Relaxed Validation
+  # The Read-Only connection enforces execution policy and DuckDB reports syntax errors
+  # itself, so the runner does not re-parse the query with sqlglot here.
 
   try:
     # 3. Execution
     logger.debug(f"Executing SQL Widget: {query}")
-    cursor.execute(query)
+    params = config.get("params")
+    if params:
+      cursor.execute(query, params)
+    else:
+      cursor.execute(query)
 
     # 4. Fetching Metadata & Data
     if cursor.description:
       columns: List[str] = [desc[0] for desc in cursor.description]
       max_rows = config.get("max_rows")
       if isinstance(max_rows, int) and max_rows > 0:
-        rows = cursor.fetchmany(max_rows)
+        batches: Iterable[Sequence[Tuple[Any, ...]]] = [cursor.fetchmany(max_rows)]
       else:
-        rows = cursor.fetchall()
-      results: List[Dict[str, Any]] = [dict(zip(columns, row)) for row in rows]
+        batches = _iter_row_batches(cursor)
+
+      if config.get("shape") == "columns":
+        # Column-oriented: one value list per column, aligned with 'columns'.
+        # Skips building a dict (and repeating every key in the JSON) per row.
+        column_values: List[List[Any]] = [[] for _ in columns]
+        for chunk in batches:
+          for values, target in zip(zip(*chunk), column_values):
+            target.extend(values)
+        return {"data": column_values, "columns": columns, "error": None}
+
+      results: List[Dict[str, Any]] = []
+      for chunk in batches:
+        results.extend(dict(zip(columns, row)) for row in chunk)
       return {"data": results, "columns": columns, "error": None}
     else:
       # Queries like 'SET x=1' might pass parser if logically allowed but return no rows
@@ -7,10 +7,124 @@ the AI/LLM to generate syntactically correct SQL queries corresponding to the
 actual data structure.
 """
 
+import itertools
+import time
+from operator import itemgetter
+from typing import Callable, Iterator, List, Dict, Any, Optional, Tuple, TypeVar
 import duckdb
-from typing import List, Dict, Any
 from app.database.duckdb import duckdb_manager
 
+T = TypeVar("T")
+
+
+# MONOLITHIC PATTERNS (The "Cheat Sheet" for 8B Models)
+_DOMAIN_LOGIC_DOC = (
+  "\n--- STANDARD SQL RECIPES (ADAPT THESE) ---\n"
+  "RECIPE 1: CAPACITY & OCCUPANCY (Mental Model: Max Historic vs Current)\n"
+  "Use when asked: 'Available beds', 'Capacity', 'Full units'\n"
+  "WITH historic_peaks AS (\n"
+  "    SELECT Location, MAX(daily_census) as capacity \n"
+  "    FROM (SELECT Location, CAST(Midnight_Census_DateTime AS DATE), COUNT(*) as daily_census FROM synthetic_hospital_data GROUP BY 1,2) \n"
+  "    GROUP BY 1\n"
+  "),\n"
+  "current_census AS (\n"
+  "    SELECT Location, COUNT(*) as occupied \n"
+  "    FROM synthetic_hospital_data \n"
+  "    WHERE Midnight_Census_DateTime = (SELECT MAX(Midnight_Census_DateTime) FROM synthetic_hospital_data)\n"
+  "    GROUP BY 1\n"
+  ")\n"
+  "SELECT p.Location, (p.capacity - COALESCE(c.occupied, 0)) as available\n"
+  "FROM historic_peaks p \n"
+  "LEFT JOIN current_census c ON p.Location = c.Location;\n"
+  "\n"
+  "RECIPE 2: BOTTLENECKS & FLOW (Mental Model: Filtered Aggregates)\n"
+  "Use when asked: 'Bottlenecks', 'Throughput', 'Admits vs Discharges'\n"
+  "SELECT \n"
+  "    Clinical_Service, \n"
+  "    SUM(1) FILTER (WHERE Admit_DT IS NOT NULL) as admits,\n"
+  "    SUM(1) FILTER (WHERE Discharge_DT IS NOT NULL) as discharges\n"
+  "FROM synthetic_hospital_data\n"
+  "GROUP BY 1;\n"
+  "\n"
+  "RECIPE 3: TIME WINDOWS & TRENDS (Mental Model: Window Functions)\n"
+  "Use when asked: 'Moving Average', 'Consecutive Days', 'Spikes'\n"
+  "WITH daily AS (\n"
+  "    SELECT CAST(Midnight_Census_DateTime AS DATE) as dt, COUNT(*) as val \n"
+  "    FROM synthetic_hospital_data GROUP BY 1\n"
+  ")\n"
+  "SELECT \n"
+  "    dt, \n"
+  "    val,\n"
+  "    AVG(val) OVER (ORDER BY dt ROWS BETWEEN 6 PRECEDING AND CURRENT ROW) as rolling_7_day\n"
+  "FROM daily;\n"
+  "\n"
+  "--- CRITICAL RULES ---\n"
+  "1. NO HALLUCINATIONS: Do not use table names like 'hospital', 'beds', or 'rooms'. Use ONLY `synthetic_hospital_data`.\n"
+  "2. NO RAW MAX: Do not write `MAX(count)`. Count is a function, not a column. You must aggregate in a CTE first.\n"
+  "3. PREFER MACROS: If a specific statistical macro is available (e.g. PROBABILITY), use it instead of writing raw math.\n"
+)
+
+# Macro Documentation
+_MACROS_DOC = (
+  "\nAVAILABLE DUCKDB MACROS (Use these for statistical logic):\n"
+  "- PROBABILITY(condition) -> float: Returns percentage (0-100) where condition is true.\n"
+  "- IS_OUTLIER(val, mean, sd) -> bool: True if value is > 2 standard deviations from mean.\n"
+  "- IS_BOTTLENECK(adm, dis) -> bool: True if admissions exceed discharges by >20%.\n"
+  "- SAFE_DIV(num, den) -> float: Division handling zero denominator.\n"
+  "- MOVING_AVERAGE(val, sort_col) -> float: 7-day simple moving average.\n"
+  "- HOLIDAY_DIFF(date_col, m, d) -> int: Days elapsed since specific month/day.\n"
+  "- IS_WEEKEND(date_col) -> bool: True if Sat/Sun.\n"
+  "- WEEKEND_LAG(date_col) -> bool: True if Fri/Sat (predicting lag).\n"
+  "- Z_SCORE(val, mu, sigma) -> float: Standard score calculation.\n"
+  "- CORRELATION_MATRIX(x, y) -> float: Pearson correlation.\n"
+  "- CONSECUTIVE_OVERLOAD(v1, v2, v3, cap) -> bool: True if 3 consecutive values > cap.\n"
+  "- SHIFT_CHANGE(dt, start_hr, end_hr) -> bool: True if timestamp hour is within range.\n"
+  "- GENERATE_DATES(start, end) -> TABLE: Date spine for LEFT JOINs.\n"
+)
+
+# Documentation for Optimization UDFs
+_FUNCTIONS_DOC = (
+  "\nAVAILABLE ANALYTIC EXTENSIONS (User Defined Functions):\n"
+  "1. OPTIMIZE_ASSIGNMENTS(demand_json, capacity_json, affinity_json, constraints_json) -> JSON String\n"
+  "   - Description: Solves linear programming optimization for patient placement.\n"
+  "   - Arguments:\n"
+  "       - demand_json (VARCHAR): JSON object mapping Service Name to Patient Count (e.g., '{\"Cardio\": 10}').\n"
+  "       - capacity_json (VARCHAR): JSON object mapping Unit Name to Bed Capacity (e.g., '{\"ICU\": 5}').\n"
+  '       - affinity_json (VARCHAR): JSON object mapping Service->Unit->Score (e.g., \'{"Cardio": {"ICU": 1.0}}\').\n'
+  '       - constraints_json (VARCHAR): JSON list of hard rules (e.g., \'[{"type": "force_flow", "service": "Gen_Peds", "unit": "PCU_A", "min": 5}]\').\n'
+  "   - Output: A JSON String representing a list of assignment objects.\n"
+  "   - Usage Pattern (DuckDB): \n"
+  "     Use `unnest(from_json(OPTIMIZE_ASSIGNMENTS(...), '[\"json\"]'))` to convert the result back into rows.\n"
+)
+
+# Example Patterns
+_EXAMPLES_DOC = (
+  "\nEXAMPLE QUERIES:\n"
+  "1. Calculate Utilization Probability:\n"
+  "   SELECT PROBABILITY(cnt > 20) FROM (SELECT CAST(Midnight_Census_DateTime AS DATE), COUNT(*) as cnt FROM synthetic_hospital_data GROUP BY 1);\n"
+  "\n"
+  "2. Identify Bottlenecks:\n"
+  "   SELECT Clinical_Service FROM synthetic_hospital_data GROUP BY 1 HAVING IS_BOTTLENECK(SUM(1), SUM(1));\n"
+)
+
+# Static prompt sections appended after the table listing; composed once at import.
+_EXTENSIONS_DOC = _DOMAIN_LOGIC_DOC + _MACROS_DOC + _FUNCTIONS_DOC + _EXAMPLES_DOC
+
+# All columns of every table/view in the active schema, in one round-trip.
+# Ordering matches the previous SHOW TABLES + DESCRIBE iteration.
+_SCHEMA_COLUMNS_SQL = (
+  "SELECT table_name, column_name, data_type FROM information_schema.columns "
+  "WHERE table_catalog = current_database() AND table_schema = current_schema() "
+  "ORDER BY table_name, ordinal_position"
+)
+
+# Scalar hash over the same column listing; changes whenever any table, column or type does.
+_SCHEMA_FINGERPRINT_SQL = (
+  "SELECT hash(string_agg(table_name || '.' || column_name || ':' || data_type, ',' "
+  "ORDER BY table_name, ordinal_position)) FROM information_schema.columns "
+  "WHERE table_catalog = current_database() AND table_schema = current_schema()"
+)
+
 
 class SchemaService:
   """
@@ -19,11 +133,25 @@ class SchemaService:
   and JSON (for UI builders) formats.
   """
 
+  # Seconds a cached result is served without re-checking the schema fingerprint
+  SCHEMA_TTL_SECONDS = 30.0
+
   def __init__(self) -> None:
     """
     Initialize the SchemaService with the global DuckDB manager.
     """
     self.manager = duckdb_manager
+    # (schema fingerprint, cached value, monotonic time it was last verified)
+    self._context_cache: Optional[Tuple[Any, str, float]] = None
+    self._json_cache: Optional[Tuple[Any, List[Dict[str, Any]], float]] = None
+
+  def invalidate(self) -> None:
+    """
+    Drops the cached LLM schema context and JSON schema so the next calls rebuild them.
+    Call after DDL (e.g. CSV ingestion) to skip waiting on the fingerprint check.
+    """
+    self._context_cache = None
+    self._json_cache = None
 
   def get_schema_context_string(self) -> str:
     """
@@ -36,154 +164,104 @@ class SchemaService:
     3. UDFs (Python Bridges)
     4. Examples (Gold Standard Patterns)
 
+    The rendered string is cached against a schema fingerprint (see `_cached_build`).
+
     Returns:
         str: The formatted schema context string.
     """
-    conn = self.manager.get_connection()
     try:
-      # 0. Get all tables
-      tables = conn.execute("SHOW TABLES").fetchall()
-      schema_lines: List[str] = []
-
-      if not tables:
-        schema_lines.append("No tables found in the database.")
-      else:
-        for (table_name,) in tables:
-          schema_lines.append(f"Table: {table_name}")
-
-          # 1. Get columns for this table
-          # DESCRIBE returns: column_name, column_type, null, key, default, extra
-          columns = conn.execute(f"DESCRIBE {table_name}").fetchall()
-
-          for col in columns:
-            col_name = col[0]
-            col_type = col[1]
-            schema_lines.append(f"- {col_name} ({col_type})")
-
-          schema_lines.append("")  # Empty line between tables
-
-      # 2. MONOLITHIC PATTERNS (The "Cheat Sheet" for 8B Models)
-      domain_logic = (
-        "\n--- STANDARD SQL RECIPES (ADAPT THESE) ---\n"
-        "RECIPE 1: CAPACITY & OCCUPANCY (Mental Model: Max Historic vs Current)\n"
-        "Use when asked: 'Available beds', 'Capacity', 'Full units'\n"
-        "WITH historic_peaks AS (\n"
-        "    SELECT Location, MAX(daily_census) as capacity \n"
-        "    FROM (SELECT Location, CAST(Midnight_Census_DateTime AS DATE), COUNT(*) as daily_census FROM synthetic_hospital_data GROUP BY 1,2) \n"
-        "    GROUP BY 1\n"
-        "),\n"
-        "current_census AS (\n"
-        "    SELECT Location, COUNT(*) as occupied \n"
-        "    FROM synthetic_hospital_data \n"
-        "    WHERE Midnight_Census_DateTime = (SELECT MAX(Midnight_Census_DateTime) FROM synthetic_hospital_data)\n"
-        "    GROUP BY 1\n"
-        ")\n"
-        "SELECT p.Location, (p.capacity - COALESCE(c.occupied, 0)) as available\n"
-        "FROM historic_peaks p \n"
-        "LEFT JOIN current_census c ON p.Location = c.Location;\n"
-        "\n"
-        "RECIPE 2: BOTTLENECKS & FLOW (Mental Model: Filtered Aggregates)\n"
-        "Use when asked: 'Bottlenecks', 'Throughput', 'Admits vs Discharges'\n"
-        "SELECT \n"
-        "    Clinical_Service, \n"
-        "    SUM(1) FILTER (WHERE Admit_DT IS NOT NULL) as admits,\n"
-        "    SUM(1) FILTER (WHERE Discharge_DT IS NOT NULL) as discharges\n"
-        "FROM synthetic_hospital_data\n"
-        "GROUP BY 1;\n"
-        "\n"
-        "RECIPE 3: TIME WINDOWS & TRENDS (Mental Model: Window Functions)\n"
-        "Use when asked: 'Moving Average', 'Consecutive Days', 'Spikes'\n"
-        "WITH daily AS (\n"
-        "    SELECT CAST(Midnight_Census_DateTime AS DATE) as dt, COUNT(*) as val \n"
-        "    FROM synthetic_hospital_data GROUP BY 1\n"
-        ")\n"
-        "SELECT \n"
-        "    dt, \n"
-        "    val,\n"
-        "    AVG(val) OVER (ORDER BY dt ROWS BETWEEN 6 PRECEDING AND CURRENT ROW) as rolling_7_day\n"
-        "FROM daily;\n"
-        "\n"
-        "--- CRITICAL RULES ---\n"
-        "1. NO HALLUCINATIONS: Do not use table names like 'hospital', 'beds', or 'rooms'. Use ONLY `synthetic_hospital_data`.\n"
-        "2. NO RAW MAX: Do not write `MAX(count)`. Count is a function, not a column. You must aggregate in a CTE first.\n"
-        "3. PREFER MACROS: If a specific statistical macro is available (e.g. PROBABILITY), use it instead of writing raw math.\n"
-      )
-
-      # 4. Macro Documentation
-      macros_doc = (
-        "\nAVAILABLE DUCKDB MACROS (Use these for statistical logic):\n"
-        "- PROBABILITY(condition) -> float: Returns percentage (0-100) where condition is true.\n"
-        "- IS_OUTLIER(val, mean, sd) -> bool: True if value is > 2 standard deviations from mean.\n"
-        "- IS_BOTTLENECK(adm, dis) -> bool: True if admissions exceed discharges by >20%.\n"
-        "- SAFE_DIV(num, den) -> float: Division handling zero denominator.\n"
-        "- MOVING_AVERAGE(val, sort_col) -> float: 7-day simple moving average.\n"
-        "- HOLIDAY_DIFF(date_col, m, d) -> int: Days elapsed since specific month/day.\n"
-        "- IS_WEEKEND(date_col) -> bool: True if Sat/Sun.\n"
-        "- WEEKEND_LAG(date_col) -> bool: True if Fri/Sat (predicting lag).\n"
-        "- Z_SCORE(val, mu, sigma) -> float: Standard score calculation.\n"
-        "- CORRELATION_MATRIX(x, y) -> float: Pearson correlation.\n"
-        "- CONSECUTIVE_OVERLOAD(v1, v2, v3, cap) -> bool: True if 3 consecutive values > cap.\n"
-        "- SHIFT_CHANGE(dt, start_hr, end_hr) -> bool: True if timestamp hour is within range.\n"
-        "- GENERATE_DATES(start, end) -> TABLE: Date spine for LEFT JOINs.\n"
-      )
-
-      # 5. Append Documentation for Optimization UDFs
-      functions_doc = (
-        "\nAVAILABLE ANALYTIC EXTENSIONS (User Defined Functions):\n"
-        "1. OPTIMIZE_ASSIGNMENTS(demand_json, capacity_json, affinity_json, constraints_json) -> JSON String\n"
-        "   - Description: Solves linear programming optimization for patient placement.\n"
-        "   - Arguments:\n"
-        "       - demand_json (VARCHAR): JSON object mapping Service Name to Patient Count (e.g., '{\"Cardio\": 10}').\n"
-        "       - capacity_json (VARCHAR): JSON object mapping Unit Name to Bed Capacity (e.g., '{\"ICU\": 5}').\n"
-        '       - affinity_json (VARCHAR): JSON object mapping Service->Unit->Score (e.g., \'{"Cardio": {"ICU": 1.0}}\').\n'
-        '       - constraints_json (VARCHAR): JSON list of hard rules (e.g., \'[{"type": "force_flow", "service": "Gen_Peds", "unit": "PCU_A", "min": 5}]\').\n'
-        "   - Output: A JSON String representing a list of assignment objects.\n"
-        "   - Usage Pattern (DuckDB): \n"
-        "     Use `unnest(from_json(OPTIMIZE_ASSIGNMENTS(...), '[\"json\"]'))` to convert the result back into rows.\n"
-      )
-
-      # 6. Example Patterns
-      examples_doc = (
-        "\nEXAMPLE QUERIES:\n"
-        "1. Calculate Utilization Probability:\n"
-        "   SELECT PROBABILITY(cnt > 20) FROM (SELECT CAST(Midnight_Census_DateTime AS DATE), COUNT(*) as cnt FROM synthetic_hospital_data GROUP BY 1);\n"
-        "\n"
-        "2. Identify Bottlenecks:\n"
-        "   SELECT Clinical_Service FROM synthetic_hospital_data GROUP BY 1 HAVING IS_BOTTLENECK(SUM(1), SUM(1));\n"
-      )
-
-      return "\n".join(schema_lines) + domain_logic + macros_doc + functions_doc + examples_doc
-
+      return self._cached_build("_context_cache", self._render_context)
     except Exception as e:
       return f"Error retrieving schema: {str(e)}"
-    finally:
-      conn.close()
 
   def get_schema_json(self) -> List[Dict[str, Any]]:
     """
     Returns structured JSON representation of the database schema.
     Useful for the Frontend SQL Builder UI to display available columns.
+    Cached against the schema fingerprint like the LLM context.
 
     Returns:
         List[Dict[str, Any]]: List of table objects containing name and columns.
     """
-    conn = self.manager.get_connection()
-    try:
-      tables_list: List[Dict[str, Any]] = []
-      tables = conn.execute("SHOW TABLES").fetchall()
+    return self._cached_build("_json_cache", self._build_json)
+
+  def _cached_build(self, cache_attr: str, build: Callable[[duckdb.DuckDBPyConnection], T]) -> T:
+    """
+    Returns a cached schema-derived value, rebuilding it only when the schema changed.
+
+    Within `SCHEMA_TTL_SECONDS` of the last check the value is returned without touching
+    DuckDB; after that, a single scalar fingerprint query confirms the schema is unchanged.
 
-      for (table_name,) in tables:
-        cols_data: List[Dict[str, str]] = []
-        columns = conn.execute(f"DESCRIBE {table_name}").fetchall()
+    Args:
+        cache_attr (str): Name of the instance attribute holding the cache tuple.
+        build (Callable[[duckdb.DuckDBPyConnection], T]): Builds the value from an open connection.
 
-        for col in columns:
-          cols_data.append({"name": col[0], "type": col[1]})
+    Returns:
+        T: The cached or freshly built value.
+    """
+    cached = getattr(self, cache_attr)
+    now = time.monotonic()
+    if cached is not None and now - cached[2] < self.SCHEMA_TTL_SECONDS:
+      return cached[1]
 
-        tables_list.append({"table_name": table_name, "columns": cols_data})
-      return tables_list
+    conn = self.manager.get_connection()
+    try:
+      fingerprint = conn.execute(_SCHEMA_FINGERPRINT_SQL).fetchone()[0]
+      value = cached[1] if cached is not None and cached[0] == fingerprint else build(conn)
+      setattr(self, cache_attr, (fingerprint, value, now))
+      return value
     finally:
       conn.close()
 
+  def _render_context(self, conn: duckdb.DuckDBPyConnection) -> str:
+    """
+    Renders the LLM schema context from the live catalog.
+
+    Args:
+        conn (duckdb.DuckDBPyConnection): An open DuckDB connection.
+
+    Returns:
+        str: Table/column listing followed by the static recipes, macros, UDFs and examples.
+    """
+    # 1. Tables and Columns: one block per table, separated by an empty line
+    table_blocks = [
+      f"Table: {table_name}\n" + "".join(f"- {col_name} ({col_type})\n" for col_name, col_type in columns)
+      for table_name, columns in self._iter_tables(conn)
+    ]
+    schema_text = "\n".join(table_blocks) if table_blocks else "No tables found in the database."
+
+    # 2-4. Static Recipes, Macros, UDFs and Examples
+    return schema_text + _EXTENSIONS_DOC
+
+  def _build_json(self, conn: duckdb.DuckDBPyConnection) -> List[Dict[str, Any]]:
+    """
+    Builds the structured schema listing from the live catalog.
+
+    Args:
+        conn (duckdb.DuckDBPyConnection): An open DuckDB connection.
+
+    Returns:
+        List[Dict[str, Any]]: List of table objects containing name and columns.
+    """
+    return [
+      {"table_name": table_name, "columns": [{"name": col_name, "type": col_type} for col_name, col_type in columns]}
+      for table_name, columns in self._iter_tables(conn)
+    ]
+
+  def _iter_tables(self, conn: duckdb.DuckDBPyConnection) -> Iterator[Tuple[str, List[Tuple[str, str]]]]:
+    """
+    Fetches every column of the active schema in a single query and groups it by table.
+
+    Args:
+        conn (duckdb.DuckDBPyConnection): An open DuckDB connection.
+
+    Yields:
+        Tuple[str, List[Tuple[str, str]]]: Table name and its (column name, column type) pairs, in ordinal order.
+    """
+    rows = conn.execute(_SCHEMA_COLUMNS_SQL).fetchall()
+    for table_name, table_rows in itertools.groupby(rows, key=itemgetter(0)):
+      yield table_name, [(col_name, col_type) for _, col_name, col_type in table_rows]
+
 
 # Singleton instance
 schema_service = SchemaService()
@@ -4,18 +4,21 @@ Simulation Orchestration Service.
 Integrates the Data Layer (DuckDB) with the Optimization Engine (MPAX).
 Unlike standard widget execution, this service performs a multi-step process:
 1. Executes raw SQL to fetch live clinical demand.
-2. Transforms tabular SQL results into the JSON structure required by the Solver.
+2. Transforms tabular SQL results into the demand map required by the Solver.
 3. Injects user-defined capacity/constraint parameters.
 4. Executes the Solver (which includes virtual Overflow logic).
 5. Calculates Deltas to show the user exactly where patients moved.
 """
 
-import json
 import logging
-from typing import List, Dict, Any, Tuple
+from collections import defaultdict
+from typing import List, Dict, Any, DefaultDict, Tuple, Union
+
+import numpy as np
+import orjson
 
 from app.database.duckdb import duckdb_manager
-from app.services.mpax_bridge import mpax_bridge
+from app.services.mpax_bridge import AssignmentColumns, mpax_bridge
 from app.schemas.simulation import (
   ScenarioRunRequest,
   ScenarioResult,
@@ -47,29 +50,30 @@ class SimulationService:
     logger.info("Starting Simulation Scenario Run")
 
     # 1. Fetch Demand Data from DuckDB
-    # Returns the JSON for the solver AND a baseline map for diffing
-    demand_json, current_state = self._fetch_demand_payload(request.demand_source_sql)
-
-    # 2. Serialize Parameters for Bridge
-    capacity_json = json.dumps(request.capacity_parameters)
-    constraints_json = json.dumps([c.model_dump() for c in request.constraints])
-    affinity_json = json.dumps(request.affinity_overrides)
-
-    # 3. Run Optimization
-    # This calls the JAX/MPAX solver via the bridge
-    raw_result = mpax_bridge.solve_unit_assignment(
-      demand_json=demand_json,
-      capacity_json=capacity_json,
-      affinity_json=affinity_json,
-      constraints_json=constraints_json,
-    )
-
-    # 4. Parse Result & Calculate Delta
-    parsed_assignments = self._parse_and_diff_result(raw_result, current_state)
+    # Returns the demand totals for the solver AND a baseline map for diffing
+    demand_totals, current_state = self._fetch_demand_payload(request.demand_source_sql)
+
+    # 2. Run Optimization
+    # This calls the JAX/MPAX solver via the bridge. The columnar entry point takes the
+    # parameters as Python objects and hands the solution back as arrays, so nothing is
+    # JSON-encoded only to be parsed straight back in the same process.
+    try:
+      columns = mpax_bridge.solve_unit_assignment_columns(
+        demand_json=demand_totals,
+        capacity_json=request.capacity_parameters,
+        affinity_json=request.affinity_overrides,
+        constraints_json=[constraint.model_dump() for constraint in request.constraints],
+      )
+    except Exception as e:
+      logger.error(f"Optimization Failure: {e}", exc_info=True)
+      raise ValueError("Solver returned invalid data.")
+
+    # 3. Calculate Delta
+    parsed_assignments = self._parse_and_diff_result(columns, current_state)
 
     return ScenarioResult(assignments=parsed_assignments, status="success")
 
-  def _fetch_demand_payload(self, query: str) -> Tuple[str, Dict[Tuple[str, str], float]]:
+  def _fetch_demand_payload(self, query: str) -> Tuple[Dict[str, float], Dict[Tuple[str, str], float]]:
     """
     Executes the SQL query and prepares data for both the Solver and the Diff engine.
 
@@ -77,29 +81,59 @@ class SimulationService:
     1. 2 Columns: (Service, Count) -> Baseline assumes 0 distribution.
     2. 3 Columns: (Service, Unit, Count) -> Baseline built from this distribution.
 
+    The query's detail rows are summed per key inside DuckDB (GROUP BY on the
+    positional columns), so only one row per Service / (Service, Unit) reaches Python.
+    Keys come back in order of first appearance in the query's rows.
+
     Args:
         query (str): The SQL query string to run against DuckDB.
 
     Returns:
         Tuple containing:
-        - str: JSON string for solver: `{"Service": TotalCount}`
+        - dict: Demand totals for solver: `{"Service": TotalCount}`
         - dict: Baseline Map: `{(Service, Unit): Count}`
+
+    Raises:
+        ValueError: If the query fails, has no result set, returns fewer than two columns
+            or returns no rows.
     """
     try:
       conn = duckdb_manager.get_readonly_connection()
-      cursor = conn.execute(query)
-      rows = cursor.fetchall()
-      conn.close()
+      try:
+        # Binding the query as a relation exposes its width without running it;
+        # statements that produce no result set (e.g. SET) yield no relation.
+        demand = conn.sql(query)
+        if demand is None:
+          raise ValueError("Demand query produced no result set.")
+        width = len(demand.columns)
+        if width < 2:
+          raise ValueError(f"Demand query must return (Service, Count) or (Service, Unit, Count); got {width} column(s).")
+
+        keys, count = ("#1, #2", "#3") if width >= 3 else ("#1", "#2")
+        # Hash aggregation returns groups in arbitrary order; numbering the rows first lets the
+        # result follow each key's first appearance in the query, keeping the baseline ordered.
+        rows = (
+          demand.project(f"{keys}, {count}, row_number() OVER () AS first_seen")
+          .aggregate(f"{keys}, SUM(CAST({count} AS DOUBLE)), MIN(first_seen) AS first_seen", keys)
+          .order("first_seen")
+          .project(f"{keys}, {count}")
+          .fetchall()
+        )
+      finally:
+        conn.close()
 
-      demand_totals: Dict[str, float] = {}
-      current_state: Dict[Tuple[str, str], float] = {}
+      if not rows:
+        raise ValueError("Demand query returned no rows.")
+
+      demand_totals: DefaultDict[str, float] = defaultdict(float)
+      current_state: DefaultDict[Tuple[str, str], float] = defaultdict(float)
 
       for row in rows:
         if len(row) == 2:
           # Format: Service, Count
           service = str(row[0])
           count = float(row[1])
-          demand_totals[service] = demand_totals.get(service, 0.0) + count
+          demand_totals[service] += count
           # We don't know the unit, so current_state remains empty for this row
 
         elif len(row) >= 3:
@@ -109,23 +143,24 @@ class SimulationService:
           count = float(row[2])
 
           # Aggregate for solver
-          demand_totals[service] = demand_totals.get(service, 0.0) + count
+          demand_totals[service] += count
 
           # Store specific location for diffing
           key = (service, unit)
-          current_state[key] = current_state.get(key, 0.0) + count
+          current_state[key] += count
 
-      return json.dumps(demand_totals), current_state
+      # Hand back plain dicts so later lookups cannot insert missing keys
+      return dict(demand_totals), dict(current_state)
 
     except Exception as e:
       logger.error(f"Error fetching simulation demand: {e}")
       raise ValueError(f"Failed to execute demand query: {str(e)}")
 
   def _parse_and_diff_result(
-    self, raw_json: str, current_state: Dict[Tuple[str, str], float]
+    self, result: Union[AssignmentColumns, str], current_state: Dict[Tuple[str, str], float]
   ) -> List[SimulationAssignment]:
     """
-    Converts MPAX JSON into Pydantic models and injects Delta values.
+    Converts MPAX output into Pydantic models and injects Delta values.
 
     Logic:
     - Iterates over Solver assignments (New State).
@@ -133,57 +168,54 @@ class SimulationService:
     - Adds implicit "Negative Delta" rows for patients moved completely OUT of a unit.
 
     Args:
-        raw_json (str): JSON string from solver.
+        result (Union[AssignmentColumns, str]): Columnar solver output, or the JSON string
+            produced by `solve_unit_assignment`.
         current_state (Dict): Map of `(Service, Unit) -> OriginalCount`.
 
     Returns:
         List[SimulationAssignment]: List of allocation results with change metrics.
     """
     try:
-      data = json.loads(raw_json)
-      if isinstance(data, dict) and "error" in data:
-        raise ValueError(data["error"])
+      columns = self._columns_from_json(result) if isinstance(result, str) else result
 
       result_list = []
-
-      # Process solver outputs
       processed_keys = set()
 
-      for item in data:
-        service = item.get("Service")
-        unit = item.get("Unit")
-        new_count = float(item.get("Patient_Count", 0))
-
+      # One pass per solver row: key lookup, float subtraction, model_construct (values are
+      # already typed, so per-field validation is skipped); .tolist() yields plain floats
+      for service, unit, new_count in zip(columns.services, columns.units, columns.patient_counts.tolist()):
         key = (service, unit)
         processed_keys.add(key)
 
         original = current_state.get(key, 0.0)
-        delta = new_count - original
-
         result_list.append(
-          SimulationAssignment(
+          SimulationAssignment.model_construct(
             Service=service,
             Unit=unit,
             Patient_Count=new_count,
             Original_Count=original,
-            Delta=delta,
+            Delta=new_count - original,
           )
         )
 
       # Detect "Evictions":
       # If a unit/service pair existed in Current State but is NOT in Solver Output,
       # it means the count went to 0 (solver filtered it). We must document this removal.
-      for (svc, unit), old_count in current_state.items():
-        if (svc, unit) not in processed_keys and old_count > 0.1:
-          result_list.append(
-            SimulationAssignment(
-              Service=svc,
-              Unit=unit,
-              Patient_Count=0.0,
-              Original_Count=old_count,
-              Delta=-1.0 * old_count,
+      # The set difference runs in C; the ordered walk below only happens when something was evicted,
+      # and keeps baseline order so the response is stable across processes.
+      evicted = current_state.keys() - processed_keys
+      if evicted:
+        for (svc, unit), old_count in current_state.items():
+          if old_count > 0.1 and (svc, unit) in evicted:
+            result_list.append(
+              SimulationAssignment.model_construct(
+                Service=svc,
+                Unit=unit,
+                Patient_Count=0.0,
+                Original_Count=old_count,
+                Delta=-old_count,
+              )
             )
-          )
 
       return result_list
 
@@ -191,6 +223,38 @@ class SimulationService:
       logger.error(f"Error parsing simulation result: {e}")
       raise ValueError("Solver returned invalid data.")
 
+  def _columns_from_json(self, raw_json: str) -> AssignmentColumns:
+    """
+    Converts the JSON form of the solver output into columns.
+
+    Args:
+        raw_json (str): JSON string from `solve_unit_assignment`.
+
+    Returns:
+        AssignmentColumns: The same assignments, column by column.
+
+    Raises:
+        ValueError: If the payload is a solver error or an assignment lacks Service/Unit.
+    """
+    data = orjson.loads(raw_json)
+    if isinstance(data, dict) and "error" in data:
+      raise ValueError(data["error"])
+
+    services: List[str] = []
+    units: List[str] = []
+    counts: List[float] = []
+    for item in data:
+      service = item.get("Service")
+      unit = item.get("Unit")
+      # The only fields construction would otherwise have validated; counts are coerced below
+      if not isinstance(service, str) or not isinstance(unit, str):
+        raise ValueError(f"Malformed solver assignment: {item!r}")
+      services.append(service)
+      units.append(unit)
+      counts.append(float(item.get("Patient_Count", 0)))
+
+    return AssignmentColumns(services, units, np.asarray(counts, dtype=np.float64))
+
 
 # Singleton Instance
 simulation_service = SimulationService()
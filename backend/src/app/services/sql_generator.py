@@ -15,8 +15,11 @@ allowing for scientific benchmarking of different engineering techniques.
 
 import re
 import logging
-from typing import Dict, Any, List
+import uuid
+from typing import Dict, Any, List, Tuple, Type
+from sqlalchemy import insert
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
 from app.services.llm_client import llm_client, ArenaResponse
 from app.services.schema import schema_service
@@ -34,6 +37,31 @@ from app.services.prompt_engineering.few_shot_rag import FewShotRAGStrategy
 
 logger = logging.getLogger(__name__)
 
+# Strategy tag -> implementation; unknown tags fall back to zero-shot
+_STRATEGY_CLASSES: Dict[str, Type[PromptStrategy]] = {
+  "zero-shot": ZeroShotStrategy,
+  "cot-macro": MacroCoTStrategy,
+  "rag-few-shot": FewShotRAGStrategy,
+}
+
+# Markdown code fence around LLM SQL output, e.g. ```sql ... ```
+_SQL_FENCE_RE = re.compile(r"```(?:sql)?(.*?)```", re.DOTALL)
+
+# Dashboard-wide filter placeholders bound by process_global_filters.
+# String literals are matched whole so placeholders inside them ('{{global_start_date}}',
+# '%{{global_service}}%') bind the completed literal, along with any type prefix
+# (DATE '...'), which DuckDB cannot apply to a parameter; quoted identifiers and
+# comments are matched only to be passed through untouched.
+_GLOBAL_PLACEHOLDER_RE = re.compile(
+  r"(?:\b(?P<type>(?i:date|timestamp|time|interval))\s+)?(?P<literal>'(?:[^']|'')*')"
+  r"|(?P<verbatim>\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/)"
+  r"|\{\{(?P<name>global_service|global_date_range|global_start_date|global_end_date)\}\}",
+  re.DOTALL,
+)
+
+# Value placeholders that may appear inside a string literal
+_LITERAL_PLACEHOLDER_RE = re.compile(r"\{\{(global_service|global_start_date|global_end_date)\}\}")
+
 
 class SQLGeneratorService:
   """
@@ -44,15 +72,18 @@ class SQLGeneratorService:
   def __init__(self) -> None:
     """
     Initialize the generator with the Arena client and Schema service.
-    Strategies are instantiated lazily or on-demand to allow stateful configuration.
+    Strategies are instantiated lazily, once per tag, and reused across experiments.
     """
     self.llm = llm_client
     self.schema_svc = schema_service
+    self._strategies: Dict[str, PromptStrategy] = {}
 
   def _get_strategy_implementation(self, strategy_tag: str) -> PromptStrategy:
     """
     Factory method to resolve the strategy string identifier to a concrete class.
 
+    Strategies hold no per-request state, so each is built on first use and cached.
+
     Args:
         strategy_tag (str): The identifier (e.g., "zero-shot", "cot-macro", "rag-few-shot").
 
@@ -61,13 +92,14 @@ class SQLGeneratorService:
         Defaults to ZeroShotStrategy if tag is unrecognized.
     """
     tag = strategy_tag.lower() if strategy_tag else "zero-shot"
+    if tag not in _STRATEGY_CLASSES:
+      # Default fallback
+      tag = "zero-shot"
 
-    if tag == "cot-macro":
-      return MacroCoTStrategy()
-    elif tag == "rag-few-shot":
-      return FewShotRAGStrategy()
-    # Default fallback
-    return ZeroShotStrategy()
+    strategy = self._strategies.get(tag)
+    if strategy is None:
+      strategy = self._strategies[tag] = _STRATEGY_CLASSES[tag]()
+    return strategy
 
   def _clean_sql_response(self, raw_response: str) -> str:
     """
@@ -81,50 +113,74 @@ class SQLGeneratorService:
         str: The clean SQL query string.
     """
     cleaned = raw_response.strip()
-    pattern = r"```(?:sql)?(.*?)```"
-    match = re.search(pattern, cleaned, re.DOTALL)
+    match = _SQL_FENCE_RE.search(cleaned)
     if match:
       cleaned = match.group(1).strip()
     return cleaned
 
-  def process_global_filters(self, sql: str, global_params: Dict[str, Any]) -> str:
+  def process_global_filters(self, sql: str, global_params: Dict[str, Any]) -> Tuple[str, List[Any]]:
     """
-    Injects global dashboard filter values into SQL placeholders.
+    Binds global dashboard filter values into SQL placeholders.
     Allows a single query to be reused across different departments/dates.
 
+    User selections are never spliced into the SQL text: each placeholder becomes a
+    `?` bind parameter, which closes the injection hole and keeps the statement text
+    identical across selections. A string literal holding placeholders is bound as a
+    whole, so `'%{{global_service}}%'` becomes `?` with the value `'%Cardiology%'` and
+    `DATE '{{global_start_date}}'` becomes `CAST(? AS DATE)`.
+
     Args:
         sql (str): The SQL template containing {{handlebars}}.
         global_params (Dict): User selection (e.g., { "dept": "Cardiology" }).
 
     Returns:
-        str: The executable SQL with values injected.
+        Tuple[str, List[Any]]: The executable SQL and its positional parameters, in order.
     """
-    processed_sql = sql
-    service_val = global_params.get("dept")
-
-    if "{{global_service}}" in processed_sql:
-      injection = f"AND Clinical_Service = '{service_val}'" if service_val else ""
-      processed_sql = processed_sql.replace("{{global_service}}", injection)
+    if "{{" not in sql:
+      return sql, []
 
+    service_val = global_params.get("dept")
     start_date = global_params.get("start_date")
     end_date = global_params.get("end_date")
-
-    if "{{global_date_range}}" in processed_sql:
-      if start_date and end_date:
-        injection = f"AND Midnight_Census_DateTime BETWEEN '{start_date}' AND '{end_date}'"
-      else:
-        injection = ""
-      processed_sql = processed_sql.replace("{{global_date_range}}", injection)
-
-    if "{{global_start_date}}" in processed_sql:
-      val = start_date if start_date else "2023-01-01"
-      processed_sql = processed_sql.replace("{{global_start_date}}", val)
-
-    if "{{global_end_date}}" in processed_sql:
-      val = end_date if end_date else "2023-12-31"
-      processed_sql = processed_sql.replace("{{global_end_date}}", val)
-
-    return processed_sql
+    params: List[Any] = []
+
+    def _value(name: str) -> Any:
+      if name == "global_service":
+        return service_val or ""
+      if name == "global_start_date":
+        return start_date if start_date else "2023-01-01"
+      return end_date if end_date else "2023-12-31"
+
+    def _bind(match: re.Match) -> str:
+      literal = match.group("literal")
+      if literal is not None:
+        if "{{" not in literal:
+          return match.group(0)
+        # The whole literal becomes one parameter, e.g. '%{{global_service}}%' -> ? bound to '%Cardiology%'
+        text, count = _LITERAL_PLACEHOLDER_RE.subn(lambda m: str(_value(m.group(1))), literal[1:-1].replace("''", "'"))
+        if not count:
+          return match.group(0)
+        params.append(text)
+        type_name = match.group("type")
+        return f"CAST(? AS {type_name.upper()})" if type_name else "?"
+      name = match.group("name")
+      if name is None:
+        return match.group(0)
+      if name == "global_service":
+        if not service_val:
+          return ""
+        params.append(service_val)
+        return "AND Clinical_Service = ?"
+      if name == "global_date_range":
+        if not (start_date and end_date):
+          return ""
+        params.extend((start_date, end_date))
+        return "AND Midnight_Census_DateTime BETWEEN ? AND ?"
+      params.append(_value(name))
+      return "?"
+
+    # One left-to-right scan, so parameters are collected in placeholder order
+    return _GLOBAL_PLACEHOLDER_RE.sub(_bind, sql), params
 
   async def run_arena_experiment(
     self,
@@ -159,7 +215,8 @@ class SQLGeneratorService:
     actual_strategy_name = strategy_impl.get_strategy_name()
 
     # 2. Context Retrieval
-    schema_context = self.schema_svc.get_schema_context_string()
+    # Schema lookup may hit DuckDB, so it runs in a worker thread, off the event loop
+    schema_context = await run_in_threadpool(self.schema_svc.get_schema_context_string)
 
     # 3. Message Construction (Polymorphic call)
     messages = strategy_impl.build_messages(user_query, schema_context)
@@ -183,24 +240,31 @@ class SQLGeneratorService:
     await db.flush()  # Generate ID
 
     # Create Candidates
+    # One executemany INSERT for the whole swarm; the selectin refresh below loads them back
+    candidate_rows: List[Dict[str, Any]] = []
     for res in results:
       is_success = res.error is None and len(res.content) > 0
       final_sql = self._clean_sql_response(res.content) if is_success else ""
       sql_hash = sql_fingerprint(final_sql) if final_sql else None
       error_msg = res.error if res.error else ("Empty Response" if not is_success else None)
 
-      candidate = ModelCandidate(
-        experiment_id=experiment.id,
-        model_identifier=res.model_identifier,
-        model_tag=res.provider_name,
-        generated_sql=final_sql,
-        sql_hash=sql_hash,
-        latency_ms=res.latency_ms,
-        is_selected=False,
-        execution_success=None,
-        error_message=error_msg,
+      candidate_rows.append(
+        {
+          "id": uuid.uuid4(),
+          "experiment_id": experiment.id,
+          "model_identifier": res.model_identifier,
+          "model_tag": res.provider_name,
+          "generated_sql": final_sql,
+          "sql_hash": sql_hash,
+          "latency_ms": res.latency_ms,
+          "is_selected": False,
+          "execution_success": None,
+          "error_message": error_msg,
+        }
       )
-      db.add(candidate)
+
+    if candidate_rows:
+      await db.execute(insert(ModelCandidate), candidate_rows)
 
     await db.commit()
     await db.refresh(experiment)
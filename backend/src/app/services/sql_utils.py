@@ -5,6 +5,7 @@ Provides a stable fingerprint for generated SQL so we can identify
 identical queries across different LLMs for analytics and UI grouping.
 """
 
+import functools
 import hashlib
 import re
 from typing import Optional
@@ -14,6 +15,35 @@ import sqlglot
 
 _DEF_DIALECT = "duckdb"
 
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Below this length (after comment removal and whitespace collapsing) the rough fallback
+# normalization is used directly; parsing tiny queries costs more than it adds to grouping.
+_SQLGLOT_MIN_LENGTH = 200
+
+# Quoted text is matched first so comment markers inside it are left alone. Doubled quotes are
+# escapes; an unterminated quote or comment runs to the end of the input.
+_COMMENT_RE = re.compile(
+  r"(?P<literal>'(?:''|[^'])*(?:'|\Z)"
+  r'|"(?:""|[^"])*(?:"|\Z)'
+  r"|`(?:``|[^`])*(?:`|\Z)"
+  r"|\[[^\]]*(?:\]|\Z))"
+  r"|(?P<line>--[^\n]*\n?)"
+  r"|(?P<block>/\*.*?(?:\*/|\Z))",
+  re.DOTALL,
+)
+
+
+def _strip_comment_match(match: "re.Match[str]") -> str:
+  """
+  Substitution callback for `_COMMENT_RE`: keep quoted text, blank out comments.
+  """
+  if match.lastgroup == "literal":
+    return match.group(0)
+  if match.lastgroup == "line" and match.group(0).endswith("\n"):
+    return "\n"
+  return " "
+
 
 def _strip_sql_comments(sql: str) -> str:
   """
@@ -21,112 +51,42 @@ def _strip_sql_comments(sql: str) -> str:
   """
   if not sql:
     return ""
-
-  out = []
-  i = 0
-  n = len(sql)
-  in_single = False
-  in_double = False
-  in_backtick = False
-  in_bracket = False
-
-  while i < n:
-    ch = sql[i]
-    nxt = sql[i + 1] if i + 1 < n else ""
-
-    if not (in_single or in_double or in_backtick or in_bracket):
-      if ch == "-" and nxt == "-":
-        # Line comment: skip until newline
-        i += 2
-        while i < n and sql[i] != "\n":
-          i += 1
-        out.append("\n" if i < n and sql[i] == "\n" else " ")
-        i += 1
-        continue
-      if ch == "/" and nxt == "*":
-        # Block comment: skip until */
-        i += 2
-        while i < n - 1:
-          if sql[i] == "*" and sql[i + 1] == "/":
-            i += 2
-            break
-          i += 1
-        out.append(" ")
-        continue
-
-    if ch == "'" and not (in_double or in_backtick or in_bracket):
-      if in_single and nxt == "'":
-        out.append("''")
-        i += 2
-        continue
-      in_single = not in_single
-      out.append(ch)
-      i += 1
-      continue
-
-    if ch == '"' and not (in_single or in_backtick or in_bracket):
-      if in_double and nxt == '"':
-        out.append('""')
-        i += 2
-        continue
-      in_double = not in_double
-      out.append(ch)
-      i += 1
-      continue
-
-    if ch == "`" and not (in_single or in_double or in_bracket):
-      if in_backtick and nxt == "`":
-        out.append("``")
-        i += 2
-        continue
-      in_backtick = not in_backtick
-      out.append(ch)
-      i += 1
-      continue
-
-    if ch == "[" and not (in_single or in_double or in_backtick):
-      in_bracket = True
-      out.append(ch)
-      i += 1
-      continue
-
-    if ch == "]" and in_bracket:
-      in_bracket = False
-      out.append(ch)
-      i += 1
-      continue
-
-    out.append(ch)
-    i += 1
-
-  return "".join(out)
+  return _COMMENT_RE.sub(_strip_comment_match, sql)
 
 
+@functools.lru_cache(maxsize=2048)
 def normalize_sql(sql: str, dialect: str = _DEF_DIALECT) -> str:
   """
   Normalize SQL into a canonical string for comparison.
 
-  Tries to parse and re-emit SQL via sqlglot. Falls back to
-  whitespace normalization if parsing fails.
+  Tries to parse and re-emit SQL via sqlglot. Short queries, and any
+  that fail to parse, use whitespace normalization instead. Results are
+  memoized per (sql, dialect), since arena candidates often repeat the same SQL.
   """
   cleaned = (sql or "").strip().rstrip(";")
   cleaned = _strip_sql_comments(cleaned)
   if not cleaned:
     return ""
 
+  # Fallback: collapse whitespace and lowercase for rough equivalence.
+  # The length check runs on the collapsed text so reformatting a query cannot change its path.
+  collapsed = _WHITESPACE_RE.sub(" ", cleaned).strip().lower()
+  if len(collapsed) < _SQLGLOT_MIN_LENGTH:
+    return collapsed
+
   try:
     parsed = sqlglot.parse_one(cleaned, read=dialect)
     return parsed.sql(dialect=dialect, pretty=False)
   except Exception:
-    # Fallback: collapse whitespace and lowercase for rough equivalence.
-    return re.sub(r"\s+", " ", cleaned).strip().lower()
+    return collapsed
 
 
+@functools.lru_cache(maxsize=2048)
 def sql_fingerprint(sql: str, dialect: str = _DEF_DIALECT) -> Optional[str]:
   """
   Return a stable hash for the normalized SQL.
   """
-  normalized = normalize_sql(sql, dialect=dialect)
+  normalized = normalize_sql(sql, dialect)
   if not normalized:
     return None
   return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
@@ -6,12 +6,15 @@ automatically at application startup. It reads the `initial_templates.json` file
 performs an idempotent upsert (insert or update) for each template.
 """
 
-import json
 import os
 import logging
-from typing import List, Dict, Any
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import orjson
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
 from app.database.postgres import AsyncSessionLocal
 from app.models.template import WidgetTemplate
@@ -39,8 +42,9 @@ class TemplateSeeder:
       return
 
     try:
-      with open(DATA_FILE, "r", encoding="utf-8") as f:
-        templates_data: List[Dict[str, Any]] = json.load(f)
+      # Read off the event loop so startup does not stall in-flight requests
+      raw = await run_in_threadpool(Path(DATA_FILE).read_bytes)
+      templates_data: List[Dict[str, Any]] = orjson.loads(raw)
 
       async with AsyncSessionLocal() as db:
         await TemplateSeeder._process_batch(db, templates_data)
@@ -48,7 +52,7 @@ class TemplateSeeder:
 
       logger.info(f"✅ Template Seeding Complete: {len(templates_data)} items processed.")
 
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
       logger.error(f"❌ Invalid JSON in Content Pack: {e}")
     except Exception as e:
       logger.exception(f"❌ Unexpected seeding error: {e}")
@@ -58,28 +62,47 @@ class TemplateSeeder:
     """
     Iterates through the data list and upserts each record.
 
+    Existing templates are loaded with a single `title IN (...)` query up front,
+    so the per-item upserts issue no SELECTs of their own.
+
     Args:
         db (AsyncSession): Database session.
         data_list (List[Dict]): The parsed JSON objects.
     """
+    if not data_list:
+      return
+
+    titles = {item["title"] for item in data_list}
+    result = await db.execute(select(WidgetTemplate).where(WidgetTemplate.title.in_(titles)))
+    existing_by_title: Dict[str, WidgetTemplate] = {}
+    for template in result.scalars().all():
+      existing_by_title.setdefault(template.title, template)
+
     for item in data_list:
-      await TemplateSeeder._upsert_template(db, item)
+      await TemplateSeeder._upsert_template(db, item, existing_by_title)
 
   @staticmethod
-  async def _upsert_template(db: AsyncSession, data: Dict[str, Any]) -> None:
+  async def _upsert_template(
+    db: AsyncSession, data: Dict[str, Any], existing_by_title: Optional[Dict[str, WidgetTemplate]] = None
+  ) -> None:
     """
     Insert a new template or Update an existing one based on the unique 'title'.
 
     Args:
         db (AsyncSession): Active database session.
         data (Dict[str, Any]): Dictionary containing template fields.
+        existing_by_title (Optional[Dict[str, WidgetTemplate]]): Prefetched templates keyed by title.
+            When given, it replaces the per-title lookup and records newly added templates.
     """
     title = data["title"]
 
-    # Check for existence by Title
-    query = select(WidgetTemplate).where(WidgetTemplate.title == title)
-    result = await db.execute(query)
-    existing = result.scalars().first()
+    if existing_by_title is None:
+      # Check for existence by Title
+      query = select(WidgetTemplate).where(WidgetTemplate.title == title)
+      result = await db.execute(query)
+      existing = result.scalars().first()
+    else:
+      existing = existing_by_title.get(title)
 
     if existing:
       # Update existing record (migration strategy: newest JSON always wins)
@@ -97,3 +120,6 @@ class TemplateSeeder:
         parameters_schema=data.get("parameters_schema", {}),
       )
       db.add(new_template)
+      if existing_by_title is not None:
+        # A repeated title later in the same batch updates this row instead of adding another
+        existing_by_title[title] = new_template
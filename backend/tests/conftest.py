@@ -4,14 +4,15 @@ import tempfile
 from typing import AsyncGenerator, Any, Optional
 
 import pytest
-import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
-from sqlalchemy import create_engine
+from passlib.context import CryptContext
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Session, sessionmaker
 
+from app.core import security
 from app.core.config import settings
 from app.database.postgres import Base, get_db
 
@@ -26,11 +27,58 @@ engine = create_engine(f"sqlite:///{TEST_DB_PATH}", future=True)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
 
 
+# pysqlite only emits BEGIN lazily before DML, so a SAVEPOINT could otherwise open (and its
+# RELEASE commit) a transaction of its own. Let SQLAlchemy control BEGIN so per-test
+# savepoints really nest inside the outer transaction that is rolled back on teardown.
+@event.listens_for(engine, "connect")
+def _disable_pysqlite_transactions(dbapi_connection: Any, _record: Any) -> None:
+  dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine, "begin")
+def _emit_begin(conn: Any) -> None:
+  conn.exec_driver_sql("BEGIN")
+
+
+# Same schemes as production, at the minimum work factors: hashes are real (and verifiable
+# by the production context) but cost microseconds instead of ~0.2s per call.
+FAST_PWD_CONTEXT = CryptContext(
+  schemes=["argon2", "bcrypt"],
+  deprecated="auto",
+  argon2__time_cost=1,
+  argon2__memory_cost=8,
+  argon2__parallelism=1,
+  bcrypt__rounds=4,
+)
+
+
+@pytest.fixture(autouse=True)
+def fast_password_hashing(monkeypatch: pytest.MonkeyPatch) -> None:
+  """Swap the password context for the cheap test context in every test."""
+  monkeypatch.setattr(security, "pwd_context", FAST_PWD_CONTEXT)
+
+
 @compiles(JSONB, "sqlite")
 def _compile_jsonb_sqlite(_type, _compiler, **_kw) -> str:
   return "JSON"
 
 
+class NestedTransactionShim:
+  """
+  Async context manager wrapper around a synchronous SAVEPOINT transaction.
+  Mirrors `async with AsyncSession.begin_nested():`.
+  """
+
+  def __init__(self, transaction: Any) -> None:
+    self._transaction = transaction
+
+  async def __aenter__(self) -> "NestedTransactionShim":
+    return self
+
+  async def __aexit__(self, exc_type: Any, exc: Any, tb: Any) -> Any:
+    return self._transaction.__exit__(exc_type, exc, tb)
+
+
 class AsyncSessionShim:
   """
   Minimal async wrapper around a synchronous SQLAlchemy Session.
@@ -62,6 +110,9 @@ class AsyncSessionShim:
   async def flush(self) -> None:
     self._session.flush()
 
+  def begin_nested(self) -> NestedTransactionShim:
+    return NestedTransactionShim(self._session.begin_nested())
+
   async def refresh(self, instance: Any, attribute_names: Optional[list[str]] = None) -> None:
     self._session.refresh(instance, attribute_names=attribute_names)
 
@@ -75,13 +126,12 @@ class AsyncSessionShim:
     self._session.close()
 
 
-@pytest_asyncio.fixture(loop_scope="function")
-async def init_db():
+@pytest.fixture(scope="session")
+def init_db():
   """
-  Initialize the database schema for the test.
-  Drops existing tables to ensure a clean slate, then creates all tables.
-
-  Using pytest_asyncio.fixture explicitly resolves warnings in strict mode.
+  Initialize the database schema once for the test session.
+  Drops existing tables to ensure a clean slate, then creates all tables;
+  per-test isolation comes from the rolled-back transaction in `db_session`.
   """
   Base.metadata.drop_all(bind=engine)
   Base.metadata.create_all(bind=engine)
@@ -95,21 +145,34 @@ async def init_db():
 async def db_session(init_db) -> AsyncGenerator[AsyncSession, None]:
   """
   Dependency override for the database session.
-  Yields a session for the test and rolls back the transaction after,
-  keeping tests isolated.
+  Yields a session bound to a connection-level transaction. Commits inside the
+  test only release SAVEPOINTs, and the outer transaction is rolled back after,
+  keeping tests isolated without recreating tables.
   """
-  session = SessionLocal()
+  connection = engine.connect()
+  transaction = connection.begin()
+  session = SessionLocal(bind=connection, join_transaction_mode="create_savepoint")
   # We return our shim, typed as AsyncSession for static analysis but executing synchronously
   async_session = AsyncSessionShim(session)  # type: ignore
 
   yield async_session
 
-  await async_session.rollback()
   await async_session.close()
+  transaction.rollback()
+  connection.close()
+
+
+@pytest.fixture(scope="session")
+def asgi_transport() -> ASGITransport:
+  """
+  ASGITransport shared by every test client.
+  It only holds a reference to the app (closing it is a no-op), so one instance serves the whole session.
+  """
+  return ASGITransport(app=app)
 
 
 @pytest.fixture
-async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
+async def client(db_session: AsyncSession, asgi_transport: ASGITransport) -> AsyncGenerator[AsyncClient, None]:
   """
   HttpX AsyncClient fixture with the DB dependency overridden.
   Uses ASGITransport to test the app directly without binding a network port.
@@ -120,7 +183,7 @@ async def client(db_session: AsyncSession) -> AsyncGenerator[AsyncClient, None]:
 
   app.dependency_overrides[get_db] = override_get_db
 
-  async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+  async with AsyncClient(transport=asgi_transport, base_url="http://test") as ac:
     yield ac
 
   app.dependency_overrides = {}
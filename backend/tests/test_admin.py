@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -7,28 +9,28 @@ from app.models.user import User
 
 @pytest.mark.asyncio
 async def test_admin_endpoints(client: AsyncClient, db_session: AsyncSession):
-  # 1. Register a normal user
+  # 1. Register a normal user and an admin user. Requests that write share the single
+  # overridden session, which must not be used concurrently, so they go one at a time.
   await client.post("/api/v1/auth/register", json={"email": "normal@example.com", "password": "pass"})
-  res = await client.post("/api/v1/auth/login", data={"username": "normal@example.com", "password": "pass"})
-  normal_token = res.json()["access_token"]
-  normal_headers = {"Authorization": f"Bearer {normal_token}"}
-
-  # 2. Register an admin user and manually set is_admin=True in DB
   await client.post("/api/v1/auth/register", json={"email": "admin@example.com", "password": "pass"})
+
+  # 2. Manually set is_admin=True in DB for the admin user
   stmt = update(User).where(User.email == "admin@example.com").values(is_admin=True)
   await db_session.execute(stmt)
   await db_session.commit()
 
-  res = await client.post("/api/v1/auth/login", data={"username": "admin@example.com", "password": "pass"})
-  admin_token = res.json()["access_token"]
-  admin_headers = {"Authorization": f"Bearer {admin_token}"}
-
-  # Test unauthorized access
-  res = await client.get("/api/v1/admin/settings", headers=normal_headers)
-  assert res.status_code == 403
-
-  res = await client.put("/api/v1/admin/settings", headers=normal_headers, json={"api_keys": {}, "visible_models": []})
-  assert res.status_code == 403
+  normal_res = await client.post("/api/v1/auth/login", data={"username": "normal@example.com", "password": "pass"})
+  admin_res = await client.post("/api/v1/auth/login", data={"username": "admin@example.com", "password": "pass"})
+  normal_headers = {"Authorization": f"Bearer {normal_res.json()['access_token']}"}
+  admin_headers = {"Authorization": f"Bearer {admin_res.json()['access_token']}"}
+
+  # Test unauthorized access (both rejected before any write, so they can overlap)
+  get_res, put_res = await asyncio.gather(
+    client.get("/api/v1/admin/settings", headers=normal_headers),
+    client.put("/api/v1/admin/settings", headers=normal_headers, json={"api_keys": {}, "visible_models": []}),
+  )
+  assert get_res.status_code == 403
+  assert put_res.status_code == 403
 
   # Test authorized access (get initial)
   res = await client.get("/api/v1/admin/settings", headers=admin_headers)
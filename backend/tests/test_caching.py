@@ -140,3 +140,14 @@ def test_cache_handles_unserializable_values(cache_svc):
 
   cache_svc.set(key, value)
   assert cache_svc.get(key) is value
+
+
+def test_sql_key_includes_bound_params(cache_svc):
+  """The same parameterized query with different filter values must not share a cache entry."""
+  query = "SELECT * FROM t WHERE s = ?"
+
+  k1 = cache_svc.generate_key("SQL", {"query": query, "params": ["Cardiology"]})
+  k2 = cache_svc.generate_key("SQL", {"query": query, "params": ["Neurology"]})
+
+  assert k1 != k2
+  assert cache_svc.generate_key("SQL", {"query": query}) != k1
@@ -171,6 +171,54 @@ async def test_reorder_endpoint(client: AsyncClient) -> None:
   assert widgets[w2["id"]]["config"]["group"] == "A"
 
 
+@pytest.mark.asyncio
+async def test_clone_restored_dashboard_twice(client: AsyncClient, db_session) -> None:
+  """
+  Cloning a restored dashboard repeatedly yields user-chosen names outside the restored-name index,
+  so both clones succeed under the same name.
+  """
+  email = f"clone_restored_{uuid.uuid4()}@example.com"
+  pwd = "pw"
+  await client.post("/api/v1/auth/register", json={"email": email, "password": pwd})
+  login = await client.post("/api/v1/auth/login", data={"username": email, "password": pwd})
+  headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+  restored = (await client.post("/api/v1/dashboards/restore-defaults", headers=headers)).json()
+  assert restored["name"] == "Hospital Command Center (Restored)"
+
+  first = await client.post(f"/api/v1/dashboards/{restored['id']}/clone", headers=headers)
+  second = await client.post(f"/api/v1/dashboards/{restored['id']}/clone", headers=headers)
+  assert first.status_code == 200
+  assert second.status_code == 200
+  assert first.json()["name"] == second.json()["name"] == "Copy of Hospital Command Center (Restored)"
+  assert first.json()["id"] != second.json()["id"]
+
+
+@pytest.mark.asyncio
+async def test_restored_name_conflicts_return_409(client: AsyncClient, db_session) -> None:
+  """Creating or renaming into an existing restored name is a client conflict, not a server error."""
+  email = f"conflict_{uuid.uuid4()}@example.com"
+  pwd = "pw"
+  await client.post("/api/v1/auth/register", json={"email": email, "password": pwd})
+  login = await client.post("/api/v1/auth/login", data={"username": email, "password": pwd})
+  headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+  restored = (await client.post("/api/v1/dashboards/restore-defaults", headers=headers)).json()
+  name = restored["name"]
+
+  create_res = await client.post("/api/v1/dashboards/", json={"name": name}, headers=headers)
+  assert create_res.status_code == 409
+  assert name in create_res.json()["detail"]
+
+  other = (await client.post("/api/v1/dashboards/", json={"name": "Other"}, headers=headers)).json()
+  rename_res = await client.put(f"/api/v1/dashboards/{other['id']}", json={"name": name}, headers=headers)
+  assert rename_res.status_code == 409
+
+  # The failed writes were rolled back; the session still serves requests
+  list_res = await client.get("/api/v1/dashboards/", headers=headers)
+  assert sorted(d["name"] for d in list_res.json()) == sorted(["Hospital Command Center", name, "Other"])
+
+
 @pytest.mark.asyncio
 async def test_clone_dashboard_endpoint(client: AsyncClient, db_session) -> None:
   """
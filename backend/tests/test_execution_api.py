@@ -73,7 +73,7 @@ async def test_refresh_dashboard_success(mock_dashboard_data) -> None:
     # 3. Mock Runners and DuckDB
     # We want to verify these are called correctly
     with (
-      patch("app.api.routers.execution.run_http_widget", new_callable=AsyncMock) as mock_run_http,
+      patch("app.services.runners.http.run_http_widget", new_callable=AsyncMock) as mock_run_http,
       patch("app.api.routers.execution.run_sql_widget") as mock_run_sql,
       patch("app.api.routers.execution.duckdb_manager") as mock_duck_mgr,
     ):
@@ -166,7 +166,7 @@ async def test_refresh_dashboard_unknown_widget_type(mock_dashboard_data) -> Non
   with (
     patch("app.api.routers.execution.get_db") as mock_db_patch,
     patch("app.api.routers.execution.duckdb_manager"),
-    patch("app.api.routers.execution.run_http_widget", new_callable=AsyncMock),
+    patch("app.services.runners.http.run_http_widget", new_callable=AsyncMock),
     patch("app.api.routers.execution.run_sql_widget"),
   ):
     # Setup DB return
@@ -73,8 +73,10 @@ async def test_refresh_dashboard_injects_global_params() -> None:
     args, _ = mock_runner.call_args
     config_passed = args[1]
 
-    expected_fragment = "AND Clinical_Service = 'Cardiology'"
-    assert expected_fragment in config_passed["query"]
+    # The selection is bound as a parameter rather than spliced into the SQL
+    assert "AND Clinical_Service = ?" in config_passed["query"]
     assert "{{global_service}}" not in config_passed["query"]
+    assert "Cardiology" not in config_passed["query"]
+    assert config_passed["params"] == ["Cardiology"]
 
   app.dependency_overrides = {}
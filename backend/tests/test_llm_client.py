@@ -218,3 +218,53 @@ async def test_arena_wraps_unhandled_coroutine_errors(mock_swarm_settings):
 
       assert len(results) == 2
       assert all("Critical Client Error" in res.error for res in results)
+
+
+@pytest.mark.asyncio
+async def test_arena_stream_yields_each_result(mock_swarm_settings):
+  """stream_arena_competition yields one response per combatant and wraps crashes."""
+  with patch("app.services.llm_client.AnyLLM.create") as mock_create:
+    mock_create.side_effect = [MagicMock(), MagicMock()]
+
+    arena = LLMArenaClient()
+
+    async def _single(combatant, *_args):
+      if combatant["name"] == "Model B":
+        raise RuntimeError("boom")
+      return ArenaResponse(
+        provider_name=combatant["name"], model_identifier=combatant["id"], content="SQL A", latency_ms=1
+      )
+
+    with patch.object(arena, "_generate_single", side_effect=_single):
+      results = [res async for res in arena.stream_arena_competition([{"role": "user", "content": "hi"}])]
+
+    assert len(results) == 2
+    by_name = {r.provider_name: r for r in results}
+    assert by_name["Model A"].content == "SQL A"
+    assert "Critical Client Error" in by_name["Model B"].error
+
+
+@pytest.mark.asyncio
+async def test_anthropic_system_prompt_marked_for_caching():
+  """Anthropic combatants get a cache_control breakpoint on the system prompt; others get plain strings."""
+  conf = [
+    {"provider": "anthropic", "model": "claude", "name": "Claude", "api_key": "k1"},
+    {"provider": "openai", "model": "m1", "name": "Model A", "api_key": "k2"},
+  ]
+  messages = [{"role": "system", "content": "Rules + schema"}, {"role": "user", "content": "Question"}]
+  clients = {"anthropic": MagicMock(), "openai": MagicMock()}
+
+  with (
+    patch.object(Settings, "LLM_SWARM", new_callable=PropertyMock, return_value=conf),
+    patch("app.services.llm_client.AnyLLM.create", side_effect=lambda provider, **_kw: clients[provider]),
+  ):
+    arena = LLMArenaClient()
+    await arena.generate_arena_competition(messages)
+
+  sent_anthropic = clients["anthropic"].completion.call_args.kwargs["messages"]
+  assert sent_anthropic[0] == {
+    "role": "system",
+    "content": [{"type": "text", "text": "Rules + schema", "cache_control": {"type": "ephemeral"}}],
+  }
+  assert sent_anthropic[1] == messages[1]
+  assert clients["openai"].completion.call_args.kwargs["messages"] == messages
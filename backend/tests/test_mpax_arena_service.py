@@ -1,7 +1,10 @@
+import asyncio
+
 import pytest
 from unittest.mock import patch, MagicMock, AsyncMock
-from app.services.mpax_arena_service import MpaxArenaService
+from app.services.mpax_arena_service import MpaxArenaService, _extract_json_obj
 from app.schemas.mpax_arena import MpaxArenaRequest
+from app.schemas.simulation import ScenarioResult, SimulationAssignment
 from app.models.user import User
 
 
@@ -61,26 +64,76 @@ async def test_run_translator_mode(service, mock_db, mock_user):
       assert len(res.candidates) == 1
 
 
+def _stream_of(responses):
+  """Build a stand-in for llm_client.stream_arena_competition yielding fixed responses."""
+
+  async def _stream(*_args, **_kwargs):
+    for res in responses:
+      yield res
+
+  return _stream
+
+
 @pytest.mark.asyncio
 async def test_run_constraints_mode(service, mock_db, mock_user):
   req = MpaxArenaRequest(prompt="Test", mode="constraints")
 
-  with patch("app.services.mpax_arena_service.llm_client.generate_arena_competition", new_callable=AsyncMock) as mock_llm:
-    mock_llm.return_value = [
-      MagicMock(provider_name="m1", content='{"ICU": 20}'),
-      MagicMock(provider_name="m2", content="} bad json {"),
-      MagicMock(provider_name="m3", content="{ bad }"),
-      MagicMock(provider_name="m4", content="no brackets here"),
-    ]
+  responses = [
+    MagicMock(provider_name="m1", content='{"ICU": 20}'),
+    MagicMock(provider_name="m2", content="} bad json {"),
+    MagicMock(provider_name="m3", content="{ bad }"),
+    MagicMock(provider_name="m4", content="no brackets here"),
+  ]
+  with patch("app.services.mpax_arena_service.llm_client.stream_arena_competition", new=_stream_of(responses)):
     with patch("app.services.mpax_arena_service.simulation_service.run_scenario") as mock_sim:
-      mock_sim.return_value.model_dump.return_value = {"status": "ok"}
-      # test failure branch for m2
-      mock_sim.side_effect = [MagicMock(), Exception("Sim fail"), MagicMock(), MagicMock()]
+      ok_res = MagicMock()
+      ok_res.model_dump.return_value = {"status": "ok"}
+
+      # Only the parsable proposal solves; the fallback capacity fails
+      def _run(sim_req):
+        if sim_req.capacity_parameters == {"ICU": 20.0}:
+          return ok_res
+        raise Exception("Sim fail")
+
+      mock_sim.side_effect = _run
 
       res = await service.run_mpax_arena(req, mock_db, mock_user)
       assert res.mode == "constraints"
       assert len(res.candidates) == 4
-      assert res.candidates[1].mpax_result["status"] == "error"
+      by_model = {c.model_name: c for c in res.candidates}
+      assert by_model["m1"].mpax_result["status"] == "ok"
+      assert by_model["m2"].mpax_result["status"] == "error"
+      assert by_model["m4"].mpax_result["message"] == "Sim fail"
+
+
+@pytest.mark.asyncio
+async def test_run_constraints_mode_cancels_solves_when_stream_fails(service, mock_db, mock_user):
+  """A stream that raises after its first result must not leave the started solve running."""
+  req = MpaxArenaRequest(prompt="Test", mode="constraints")
+  started = asyncio.Event()
+  cancelled = []
+
+  async def _stream(*_args, **_kwargs):
+    yield MagicMock(provider_name="m1", content='{"ICU": 20}')
+    await started.wait()
+    raise RuntimeError("provider stream broke")
+
+  async def _slow_solve(*_args, **_kwargs):
+    started.set()
+    try:
+      await asyncio.Event().wait()
+    except asyncio.CancelledError:
+      cancelled.append(True)
+      raise
+
+  with (
+    patch("app.services.mpax_arena_service.llm_client.stream_arena_competition", new=_stream),
+    patch("app.services.mpax_arena_service.run_in_threadpool", new=_slow_solve),
+  ):
+    with pytest.raises(RuntimeError, match="provider stream broke"):
+      await service.run_mpax_arena(req, mock_db, mock_user)
+
+  assert cancelled == [True]
 
 
 @pytest.mark.asyncio
@@ -119,7 +172,7 @@ async def test_run_critic_mode(service, mock_db, mock_user):
     ]
     with patch("app.services.mpax_arena_service.simulation_service.run_scenario") as mock_sim:
       good_res = MagicMock()
-      good_res.assignments = [MagicMock(Unit="ICU", Patient_Count=5), MagicMock(Unit="Overflow", Patient_Count=2)]
+      good_res.overflow_count = 2
       good_res.model_dump.return_value = {"status": "ok"}
       mock_sim.side_effect = [good_res, Exception("Sim fail"), good_res, good_res]
 
@@ -130,6 +183,23 @@ async def test_run_critic_mode(service, mock_db, mock_user):
       assert res.candidates[1].mpax_score == 0
 
 
+@pytest.mark.asyncio
+async def test_ground_truth_solve_is_memoized(service, mock_db, mock_user):
+  req = MpaxArenaRequest(prompt="Test", mode="translator")
+
+  with patch("app.services.mpax_arena_service.simulation_service.run_scenario") as mock_sim:
+    mock_sim.return_value.model_dump.return_value = {"status": "ok"}
+    mock_sim.return_value.model_dump_json.return_value = "{}"
+    with patch(
+      "app.services.mpax_arena_service.llm_client.generate_arena_competition", new_callable=AsyncMock
+    ) as mock_llm:
+      mock_llm.return_value = [MagicMock(provider_name="m1", content="Answer")]
+
+      await service.run_mpax_arena(req, mock_db, mock_user)
+      await service.run_mpax_arena(req, mock_db, mock_user)
+      assert mock_sim.call_count == 1
+
+
 def test_get_demand_data_empty(service):
   assert service._get_demand_data("") == []
 
@@ -148,3 +218,34 @@ def test_get_demand_data_valid(service):
 def test_extract_sql(service):
   assert service._extract_sql("```sql\n SELECT 1 \n```") == "SELECT 1"
   assert service._extract_sql("SELECT 1") == None
+
+
+def test_extract_json_obj_balanced_scan():
+  assert _extract_json_obj('Use {"ICU": {"min": 2}} then done') == {"ICU": {"min": 2}}
+  assert _extract_json_obj('{"note": "a } inside", "ICU": 3}') == {"note": "a } inside", "ICU": 3}
+  assert _extract_json_obj('Policy {"ICU": 1} revised to {"ICU": 20}', last=True) == {"ICU": 20}
+  assert _extract_json_obj('Policy {"ICU": 1} revised to {"ICU": 20}') == {"ICU": 1}
+  assert _extract_json_obj("} bad json {") is None
+  assert _extract_json_obj("{ bad }") is None
+  assert _extract_json_obj("no brackets here") is None
+
+
+def test_extract_json_obj_skips_stray_braces_in_prose():
+  """An unbalanced or non-JSON brace before the real object is treated as prose."""
+  assert _extract_json_obj('Capacities {see table below: {"ICU": 5}') == {"ICU": 5}
+  assert _extract_json_obj('Use {ICU, MedSurg} sizing: {"ICU": 5, "MedSurg": 20}') == {"ICU": 5, "MedSurg": 20}
+  assert _extract_json_obj('Draft {"ICU": 1} then {unclosed final {"ICU": 9}', last=True) == {"ICU": 9}
+  assert _extract_json_obj('Final {"ICU": 9} and a stray {note}', last=True) == {"ICU": 9}
+
+
+def test_scenario_result_overflow_count():
+  result = ScenarioResult(
+    status="success",
+    assignments=[
+      SimulationAssignment(Service="A", Unit="ICU", Patient_Count=5),
+      SimulationAssignment(Service="A", Unit="Overflow", Patient_Count=2),
+      SimulationAssignment(Service="B", Unit="Overflow", Patient_Count=1.5),
+    ],
+  )
+  assert result.overflow_count == 3.5
+  assert "overflow_count" not in result.model_dump()
@@ -10,6 +10,7 @@ Verifies the Linear Programming formulation logic, specifically focusing on:
 
 import json
 import pytest
+from mpax.utils import TerminationStatus
 import app.services.mpax_bridge as mpax_module
 from app.services.mpax_bridge import mpax_bridge
 
@@ -149,6 +150,7 @@ def test_overflow_only_when_no_capacity_units(monkeypatch) -> None:
   class _DummyResult:
     def __init__(self, sol):
       self.primal_solution = sol
+      self.termination_status = TerminationStatus.OPTIMAL
 
   class _DummySolver:
     def __init__(self, sol):
@@ -181,6 +183,7 @@ def test_hard_constraint_max_enforced(monkeypatch) -> None:
   class _DummyResult:
     def __init__(self, sol):
       self.primal_solution = sol
+      self.termination_status = TerminationStatus.OPTIMAL
 
   class _DummySolver:
     def __init__(self, sol):
@@ -197,3 +200,96 @@ def test_hard_constraint_max_enforced(monkeypatch) -> None:
 
   allocation = {item["Unit"]: item["Patient_Count"] for item in data}
   assert allocation.get("Unit1", 0.0) <= 2.01
+
+
+def test_fp64_fallback_when_fp32_does_not_converge(monkeypatch) -> None:
+  """
+  A non-optimal fp32 solve should be retried once in fp64.
+  """
+  demand = json.dumps({"ServiceA": 5.0})
+  capacity = json.dumps({"Unit1": 10.0})
+  affinity = json.dumps({"ServiceA": {"Unit1": 1.0}})
+
+  statuses = [TerminationStatus.ITERATION_LIMIT, TerminationStatus.OPTIMAL]
+  dtypes = []
+
+  class _DummyResult:
+    def __init__(self, sol, status):
+      self.primal_solution = sol
+      self.termination_status = status
+
+  class _DummySolver:
+    def optimize(self, lp):
+      dtypes.append(lp.objective_vector.dtype)
+      return _DummyResult([5.0, 0.0], statuses[len(dtypes) - 1])
+
+  monkeypatch.setattr(mpax_module, "r2HPDHG", lambda **_kwargs: _DummySolver())
+
+  data = json.loads(mpax_bridge.solve_unit_assignment(demand, capacity, affinity))
+
+  assert [str(d) for d in dtypes] == ["float32", "float64"]
+  assert data == [{"Service": "ServiceA", "Unit": "Unit1", "Patient_Count": 5.0}]
+
+
+def test_columns_match_json_output(monkeypatch) -> None:
+  """
+  The columnar entry point returns the same assignments as the JSON UDF, and raises instead of encoding errors.
+  """
+  demand = json.dumps({"ServiceA": 5.0, "ServiceB": 2.0})
+  capacity = json.dumps({"Unit1": 10.0})
+  affinity = json.dumps({})
+
+  class _DummyResult:
+    primal_solution = [5.0, 0.0, 1.5, 0.5]
+    termination_status = TerminationStatus.OPTIMAL
+
+  class _DummySolver:
+    def optimize(self, _lp):
+      return _DummyResult()
+
+  monkeypatch.setattr(mpax_module, "r2HPDHG", lambda **_kwargs: _DummySolver())
+
+  columns = mpax_bridge.solve_unit_assignment_columns(demand, capacity, affinity)
+
+  assert columns.services == ["ServiceA", "ServiceB", "ServiceB"]
+  assert columns.units == ["Unit1", "Unit1", "Overflow"]
+  assert columns.patient_counts.tolist() == [5.0, 1.5, 0.5]
+  assert json.loads(mpax_bridge.solve_unit_assignment(demand, capacity, affinity)) == [
+    {"Service": s, "Unit": u, "Patient_Count": c}
+    for s, u, c in zip(columns.services, columns.units, columns.patient_counts.tolist())
+  ]
+
+  with pytest.raises(ValueError):
+    mpax_bridge.solve_unit_assignment_columns("{bad_json...", "{}", "{}")
+
+
+def test_columns_accept_decoded_inputs(monkeypatch) -> None:
+  """
+  Dict/list inputs are used directly and solve exactly like their JSON encodings.
+  """
+  demand = {"ServiceA": 5.0}
+  capacity = {"Unit1": 10.0, "Unit2": 10.0}
+  affinity = {"ServiceA": {"Unit1": 1.0}}
+  constraints = [{"type": "force_flow", "service": "ServiceA", "unit": "Unit2", "min": 2.0}]
+  bounds = []
+
+  class _DummyResult:
+    primal_solution = [3.0, 2.0, 0.0]
+    termination_status = TerminationStatus.OPTIMAL
+
+  class _DummySolver:
+    def optimize(self, lp):
+      bounds.append(lp.variable_lower_bound.tolist())
+      return _DummyResult()
+
+  monkeypatch.setattr(mpax_module, "r2HPDHG", lambda **_kwargs: _DummySolver())
+
+  from_objects = mpax_bridge.solve_unit_assignment_columns(demand, capacity, affinity, constraints)
+  from_json = mpax_bridge.solve_unit_assignment_columns(
+    json.dumps(demand), json.dumps(capacity), json.dumps(affinity), json.dumps(constraints)
+  )
+
+  assert bounds[0] == bounds[1] == [0.0, 2.0, 0.0]
+  assert from_objects.services == from_json.services == ["ServiceA", "ServiceA"]
+  assert from_objects.units == from_json.units == ["Unit1", "Unit2"]
+  assert from_objects.patient_counts.tolist() == from_json.patient_counts.tolist() == [3.0, 2.0]
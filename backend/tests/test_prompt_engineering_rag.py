@@ -8,7 +8,7 @@ Verifies:
 """
 
 import pytest
-from typing import List, Dict, Any
+from typing import Any, Dict, Generator, List
 from unittest.mock import mock_open, patch
 import builtins
 import app.services.prompt_engineering.few_shot_rag as rag_module
@@ -31,6 +31,16 @@ MOCK_TEMPLATES: List[Dict[str, Any]] = [
 ]
 
 
+@pytest.fixture(autouse=True)
+def clear_registry_cache() -> Generator[None, None, None]:
+  """Reset the module-level template caches so disk-loading tests stay isolated."""
+  rag_module._load_template_registry.cache_clear()
+  rag_module._default_retriever.cache_clear()
+  yield
+  rag_module._load_template_registry.cache_clear()
+  rag_module._default_retriever.cache_clear()
+
+
 @pytest.fixture
 def mock_retriever() -> TemplateRetriever:
   """Fixture to provide a retriever loaded with mock templates."""
@@ -45,6 +55,12 @@ def test_tokenizer_logic(mock_retriever: TemplateRetriever) -> None:
   assert tokens == expected
 
 
+def test_tokenizer_non_ascii_matches_regex_semantics(mock_retriever: TemplateRetriever) -> None:
+  """Non-ASCII input drops the same characters as the ASCII fast path."""
+  assert mock_retriever._tokenize("Café occupancy—ICU's rate") == {"caf", "occupancyicus", "rate"}
+  assert mock_retriever._tokenize("ICU's rate") == {"icus", "rate"}
+
+
 def test_jaccard_similarity_calculation(mock_retriever: TemplateRetriever) -> None:
   """Verify calculation of Jaccard index."""
   set_a = {"a", "b", "c"}
@@ -58,7 +74,35 @@ def test_retriever_finds_relevant_matches(mock_retriever: TemplateRetriever) ->
   query = "bed availability"
   results = mock_retriever.find_relevant_examples(query, limit=1)
   assert len(results) == 1
-  assert results[0]["sql"] == "SELECT probability..."
+  assert results[0].sql == "SELECT probability..."
+
+
+def test_retriever_inverted_index(mock_retriever: TemplateRetriever) -> None:
+  """Postings map each token to the templates containing it; unrelated queries score nothing."""
+  assert mock_retriever._postings["congestion"] == [1]
+  assert mock_retriever._postings["availability"] == [0]
+  assert mock_retriever.find_relevant_examples("alien invasion stats") == []
+
+
+def test_retriever_top_k_keeps_library_order_on_ties() -> None:
+  """Equal scores are returned in template order, truncated to the limit."""
+  templates = [{"title": f"Census {i}", "sql_template": f"SELECT {i}"} for i in range(5)]
+  retriever = TemplateRetriever(templates_source=templates)
+  results = retriever.find_relevant_examples("census", limit=3)
+  assert [r.sql for r in results] == ["SELECT 0", "SELECT 1", "SELECT 2"]
+
+
+def test_retriever_prunes_candidates_by_size_bound() -> None:
+  """Once the top-k is full, templates whose size ratio cannot beat it are never scored."""
+  templates = [
+    {"title": "census", "sql_template": "SELECT exact"},
+    {"title": "census trend weekly icu", "sql_template": "SELECT wide"},
+  ]
+  retriever = TemplateRetriever(templates_source=templates)
+  with patch.object(retriever, "_calculate_jaccard_similarity", wraps=retriever._calculate_jaccard_similarity) as spy:
+    results = retriever.find_relevant_examples("census", limit=1)
+  assert [r.sql for r in results] == ["SELECT exact"]
+  assert spy.call_count == 1
 
 
 def test_strategy_build_messages_with_examples(mock_retriever: TemplateRetriever) -> None:
@@ -81,6 +125,9 @@ def test_strategy_build_messages_with_examples(mock_retriever: TemplateRetriever
   assert "Identify flow congestion" in user_content
   # Should contain the generic instruction
   assert "Here are valid SQL examples" in user_content
+  # The schema belongs to the system prefix, not the per-question message
+  assert schema not in user_content
+  assert messages[0]["content"].endswith(f"Database Schema:\n{schema}")
 
 
 def test_strategy_fallback_no_matches() -> None:
@@ -104,8 +151,7 @@ def test_retriever_loads_empty_when_file_missing(monkeypatch) -> None:
 def test_retriever_loads_empty_on_json_error(monkeypatch) -> None:
   """JSON errors should be swallowed and return empty list."""
   monkeypatch.setattr(rag_module.os.path, "exists", lambda *_: True)
-  monkeypatch.setattr(builtins, "open", mock_open(read_data="[]"))
-  monkeypatch.setattr(rag_module.json, "load", lambda *_args, **_kwargs: (_ for _ in ()).throw(ValueError("bad")))
+  monkeypatch.setattr(builtins, "open", mock_open(read_data=b"[not json"))
 
   retriever = TemplateRetriever()
   assert retriever.templates == []
@@ -115,3 +161,13 @@ def test_jaccard_similarity_empty_tokens(mock_retriever: TemplateRetriever) -> N
   """Empty token sets should return 0.0."""
   score = mock_retriever._calculate_jaccard_similarity(set(), {"a"})
   assert score == 0.0
+
+
+def test_registry_loaded_once_and_default_retriever_shared(monkeypatch) -> None:
+  """Disk is read once; default strategies share one retriever."""
+  calls = []
+  monkeypatch.setattr(rag_module.os.path, "exists", lambda *_: calls.append(1) or False)
+  TemplateRetriever()
+  TemplateRetriever()
+  assert len(calls) == 1
+  assert FewShotRAGStrategy().retriever is FewShotRAGStrategy().retriever
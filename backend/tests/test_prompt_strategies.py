@@ -11,6 +11,7 @@ from datetime import datetime, timezone
 from unittest.mock import MagicMock, AsyncMock, patch
 from app.services.sql_generator import SQLGeneratorService
 from app.services.llm_client import ArenaResponse
+from app.services.prompt_engineering.few_shot_rag import FewShotExample
 from app.models.user import User
 
 
@@ -80,7 +81,7 @@ async def test_run_arena_uses_rag_messages(
 ) -> None:
   """Verify 'rag-few-shot' strategy prompt construction."""
   with patch("app.services.prompt_engineering.few_shot_rag.TemplateRetriever.find_relevant_examples") as mock_find:
-    mock_find.return_value = [{"question": "How many beds?", "sql": "SELECT count(*) FROM beds"}]
+    mock_find.return_value = [FewShotExample("How many beds?", "SELECT count(*) FROM beds")]
 
     await orchestrator.run_arena_experiment("Count beds", mock_db_session, mock_user, strategy="rag-few-shot")
 
@@ -16,7 +16,8 @@ def test_strategy_identification() -> None:
 def test_macro_injection_in_system_prompt() -> None:
   """Verify system prompt contains documentation."""
   strategy = MacroCoTStrategy()
-  sys_prompt = strategy._compose_system_instruction()
+  messages = strategy.build_messages("Analyze bottleneck", "Schema...")
+  sys_prompt = next(m["content"] for m in messages if m["role"] == "system")
 
   assert "PROBABILITY" in sys_prompt
   assert "IS_BOTTLENECK" in sys_prompt
@@ -36,3 +37,15 @@ def test_cot_trigger_phrase() -> None:
   # The implementation uses: "Let's think step by step"
   # We verify exact phrase or lower case match
   assert "Let's think step by step" in user_msg
+
+
+def test_schema_is_in_system_message() -> None:
+  """
+  The schema is part of the stable system prefix; the user message carries only the question.
+  """
+  strategy = MacroCoTStrategy()
+  messages = strategy.build_messages("Analyze bottleneck", "CREATE TABLE beds (id INT);")
+
+  assert messages[0]["content"].startswith(strategy.SYSTEM_INSTRUCTION)
+  assert messages[0]["content"].endswith("Schema Context:\nCREATE TABLE beds (id INT);")
+  assert "CREATE TABLE" not in messages[1]["content"]
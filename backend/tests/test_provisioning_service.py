@@ -11,11 +11,12 @@ import uuid
 import pytest
 from unittest.mock import MagicMock, AsyncMock
 from sqlalchemy import select, func
+from sqlalchemy.exc import IntegrityError
 
 # Import provisioning service
 from app.services.provisioning import ProvisioningService
 from app.models.user import User
-from app.models.dashboard import Dashboard, Widget
+from app.models.dashboard import DEFAULT_DASHBOARD_NAME, Dashboard, Widget
 from app.models.template import WidgetTemplate
 
 # Mock Data
@@ -88,6 +89,14 @@ def test_provisioning_heuristic_logic():
   t5 = WidgetTemplate(title="Compare ICU vs PCU", sql_template="SELECT * FROM t GROUP BY unit")
   assert svc._determine_visual_type(t5) == "bar_chart"
 
+  # Case 6: Grouped rate falls through to the next matching rule
+  t6 = WidgetTemplate(title="Readmission Rate Over Time", sql_template="SELECT d, r FROM t GROUP BY d")
+  assert svc._determine_visual_type(t6) == "bar_chart"
+
+  # Case 7: Rule priority, not keyword position in the title, decides
+  t7 = WidgetTemplate(title="Compare Daily Admission Rate", sql_template="SELECT r FROM t")
+  assert svc._determine_visual_type(t7) == "metric"
+
 
 def test_config_builder_injects_defaults():
   """
@@ -124,18 +133,64 @@ def test_config_builder_injects_numeric_defaults():
   assert "limit = 5" in config["query"]
 
 
+def test_config_builder_single_pass_substitution():
+  """Spaced and unspaced placeholders are filled; unknown ones and injected braces are left alone."""
+  svc = ProvisioningService()
+
+  t = WidgetTemplate(
+    title="Mixed",
+    sql_template="SELECT '{{ unit }}', '{{unit}}', {{  days}}, '{{missing}}'",
+    parameters_schema={
+      "properties": {
+        "unit": {"type": "string", "default": "O'Neil {{days}}"},
+        "days": {"type": "integer", "default": 7},
+      }
+    },
+  )
+
+  config = svc._build_config(t, "table")
+
+  assert config["query"] == "SELECT 'O''Neil {{days}}', 'O''Neil {{days}}', 7, '{{missing}}'"
+
+
+def test_prepare_template_memoizes_per_template_id(monkeypatch):
+  """Repeat provisioning reuses prepared SQL; an edited template is recomputed."""
+  svc = ProvisioningService()
+  t = WidgetTemplate(
+    id=uuid.uuid4(),
+    title="Admission Rate",
+    sql_template="SELECT {{days}}",
+    parameters_schema={"properties": {"days": {"type": "integer", "default": 7}}},
+  )
+  spy = MagicMock(wraps=svc._build_config)
+  monkeypatch.setattr(svc, "_build_config", spy)
+
+  assert svc._prepare_template(t) == ("metric", "SELECT 7")
+  assert svc._prepare_template(t) == ("metric", "SELECT 7")
+  assert spy.call_count == 1
+
+  t.sql_template = "SELECT {{days}} + 1"
+  assert svc._prepare_template(t) == ("metric", "SELECT 7 + 1")
+  assert spy.call_count == 2
+
+
+def _names_result(names):
+  """Build a mocked single-query result listing existing dashboard names."""
+  result = MagicMock()
+  result.scalars.return_value.all.return_value = names
+  return result
+
+
 @pytest.mark.asyncio
 async def test_get_safe_dashboard_name_base_available():
   """If the base name is free, it should be returned as-is."""
   svc = ProvisioningService()
   db = MagicMock()
-
-  result = MagicMock()
-  result.scalars.return_value.first.return_value = None
-  db.execute = AsyncMock(return_value=result)
+  db.execute = AsyncMock(return_value=_names_result([]))
 
   name = await svc._get_safe_dashboard_name(db, MOCK_USER_ID, svc.DEFAULT_DASHBOARD_NAME)
   assert name == svc.DEFAULT_DASHBOARD_NAME
+  db.execute.assert_awaited_once()
 
 
 @pytest.mark.asyncio
@@ -143,17 +198,11 @@ async def test_get_safe_dashboard_name_restored_fallback():
   """If base exists, use (Restored) when available."""
   svc = ProvisioningService()
   db = MagicMock()
-
-  res_base = MagicMock()
-  res_base.scalars.return_value.first.return_value = object()
-
-  res_restored = MagicMock()
-  res_restored.scalars.return_value.first.return_value = None
-
-  db.execute = AsyncMock(side_effect=[res_base, res_restored])
+  db.execute = AsyncMock(return_value=_names_result([svc.DEFAULT_DASHBOARD_NAME]))
 
   name = await svc._get_safe_dashboard_name(db, MOCK_USER_ID, svc.DEFAULT_DASHBOARD_NAME)
   assert name == f"{svc.DEFAULT_DASHBOARD_NAME} (Restored)"
+  db.execute.assert_awaited_once()
 
 
 @pytest.mark.asyncio
@@ -161,23 +210,41 @@ async def test_get_safe_dashboard_name_increments_suffix():
   """If restored names exist, increment the highest suffix."""
   svc = ProvisioningService()
   db = MagicMock()
+  db.execute = AsyncMock(
+    return_value=_names_result(
+      [
+        svc.DEFAULT_DASHBOARD_NAME,
+        f"{svc.DEFAULT_DASHBOARD_NAME} (Restored)",
+        f"{svc.DEFAULT_DASHBOARD_NAME} (Restored 2)",
+        f"{svc.DEFAULT_DASHBOARD_NAME} (Restored 7)",
+      ]
+    )
+  )
 
-  res_base = MagicMock()
-  res_base.scalars.return_value.first.return_value = object()
-
-  res_restored = MagicMock()
-  res_restored.scalars.return_value.first.return_value = object()
+  name = await svc._get_safe_dashboard_name(db, MOCK_USER_ID, svc.DEFAULT_DASHBOARD_NAME)
+  assert name == f"{svc.DEFAULT_DASHBOARD_NAME} (Restored 8)"
+  db.execute.assert_awaited_once()
 
-  res_existing = MagicMock()
-  res_existing.scalars.return_value.all.return_value = [
-    f"{svc.DEFAULT_DASHBOARD_NAME} (Restored 2)",
-    f"{svc.DEFAULT_DASHBOARD_NAME} (Restored 7)",
-  ]
 
-  db.execute = AsyncMock(side_effect=[res_base, res_restored, res_existing])
+@pytest.mark.asyncio
+async def test_get_safe_dashboard_name_single_query_against_db(db_session):
+  """The combined name query runs on a real session and ignores other owners and lookalike names."""
+  owner = User(id=uuid.uuid4(), email="restore@test.com", hashed_password="pw", is_active=True)
+  other = User(id=uuid.uuid4(), email="other@test.com", hashed_password="pw", is_active=True)
+  db_session.add_all([owner, other])
+  base = "Ops 100%_Board"
+  for dash_owner, name in [
+    (owner, base),
+    (owner, f"{base} (Restored)"),
+    (owner, f"{base} (Restored 3)"),
+    (owner, "Ops 100x Board (Restored 9)"),
+    (other, f"{base} (Restored 5)"),
+  ]:
+    db_session.add(Dashboard(id=uuid.uuid4(), name=name, owner_id=dash_owner.id))
+  await db_session.flush()
 
-  name = await svc._get_safe_dashboard_name(db, MOCK_USER_ID, svc.DEFAULT_DASHBOARD_NAME)
-  assert name == f"{svc.DEFAULT_DASHBOARD_NAME} (Restored 8)"
+  name = await ProvisioningService()._get_safe_dashboard_name(db_session, owner.id, base)
+  assert name == f"{base} (Restored 4)"
 
 
 @pytest.mark.asyncio
@@ -188,7 +255,7 @@ async def test_create_dashboard_from_templates_handles_empty_templates():
   db.add = MagicMock()
 
   result = MagicMock()
-  result.scalars.return_value.all.return_value = []
+  result.all.return_value = []
   db.execute = AsyncMock(return_value=result)
 
   user = MagicMock()
@@ -199,6 +266,33 @@ async def test_create_dashboard_from_templates_handles_empty_templates():
   assert dashboard.name == "Empty Dash"
 
 
+@pytest.mark.asyncio
+async def test_create_dashboard_from_templates_inserts_widgets_in_one_batch():
+  """Widgets are written with a single bulk INSERT, in template order, after the dashboard is flushed."""
+  svc = ProvisioningService()
+  db = MagicMock()
+  db.flush = AsyncMock()
+  templates = [WidgetTemplate(title=f"Widget {i}", sql_template="SELECT 1", category="Ops") for i in range(3)]
+
+  result = MagicMock()
+  result.all.return_value = templates
+  db.execute = AsyncMock(return_value=result)
+
+  user = MagicMock()
+  user.id = MOCK_USER_ID
+
+  dashboard = await svc._create_dashboard_from_templates(db, user, "Batch Dash")
+
+  db.add.assert_called_once_with(dashboard)
+  db.flush.assert_awaited_once()
+  assert db.execute.await_count == 2  # template SELECT + widget INSERT
+  stmt, rows = db.execute.await_args_list[1].args
+  assert stmt.is_insert and stmt.table.name == "widgets"
+  assert [r["title"] for r in rows] == [t.title for t in templates]
+  assert all(r["dashboard_id"] == dashboard.id for r in rows)
+  assert [(r["config"]["x"], r["config"]["y"]) for r in rows] == [(0, 0), (6, 0), (0, 4)]
+
+
 @pytest.mark.asyncio
 async def test_restore_defaults_calls_helpers(monkeypatch):
   """restore_defaults should orchestrate name resolution and dashboard creation."""
@@ -212,3 +306,43 @@ async def test_restore_defaults_calls_helpers(monkeypatch):
 
   result = await svc.restore_defaults(db, user)
   assert result is not None
+
+
+@pytest.mark.asyncio
+async def test_restored_dashboard_names_are_unique_per_owner(db_session):
+  """The partial unique index rejects duplicate restored names but allows repeated user-chosen names."""
+  user = User(id=uuid.uuid4(), email="dupes@test.com", hashed_password="pw", is_active=True)
+  db_session.add(user)
+  db_session.add_all([Dashboard(id=uuid.uuid4(), name="My Board", owner_id=user.id) for _ in range(2)])
+  # Names that merely contain "(Restored" are user-chosen (e.g. clones of a restored board)
+  for name in ["My Board (Restored 1)", f"Copy of {DEFAULT_DASHBOARD_NAME} (Restored)"]:
+    db_session.add_all([Dashboard(id=uuid.uuid4(), name=name, owner_id=user.id) for _ in range(2)])
+  await db_session.flush()
+
+  db_session.add(Dashboard(id=uuid.uuid4(), name=f"{DEFAULT_DASHBOARD_NAME} (Restored 1)", owner_id=user.id))
+  await db_session.flush()
+  db_session.add(Dashboard(id=uuid.uuid4(), name=f"{DEFAULT_DASHBOARD_NAME} (Restored 1)", owner_id=user.id))
+  with pytest.raises(IntegrityError):
+    await db_session.flush()
+
+
+@pytest.mark.asyncio
+async def test_restore_defaults_retries_when_name_claimed_concurrently(db_session, monkeypatch):
+  """A name taken between the probe and the insert is retried with a fresh suffix inside a savepoint."""
+  svc = ProvisioningService()
+  user = User(id=uuid.uuid4(), email="race@test.com", hashed_password="pw", is_active=True)
+  db_session.add(user)
+  taken = f"{svc.DEFAULT_DASHBOARD_NAME} (Restored)"
+  db_session.add(Dashboard(id=uuid.uuid4(), name=taken, owner_id=user.id))
+  await db_session.flush()
+
+  # First probe returns the stale answer a concurrent restore would have seen
+  probe = AsyncMock(side_effect=[taken, f"{svc.DEFAULT_DASHBOARD_NAME} (Restored 1)"])
+  monkeypatch.setattr(svc, "_get_safe_dashboard_name", probe)
+
+  dashboard = await svc.restore_defaults(db_session, user)
+
+  assert dashboard.name == f"{svc.DEFAULT_DASHBOARD_NAME} (Restored 1)"
+  assert probe.await_count == 2
+  result = await db_session.execute(select(Dashboard.name).where(Dashboard.owner_id == user.id))
+  assert sorted(result.scalars().all()) == sorted([taken, dashboard.name])
@@ -203,3 +203,65 @@ async def test_run_http_widget_status_error_with_text_body() -> None:
 
     assert result["status"] == 500
     assert result["data"] is None
+
+
+@pytest.mark.asyncio
+async def test_run_http_widget_reuses_pooled_client() -> None:
+  """Widgets share one pooled client; closing it makes the next call open a fresh one."""
+  from app.services.runners import http as http_runner
+
+  target_url = "https://api.example.com/pooled"
+
+  with respx.mock:
+    route = respx.get(target_url).mock(return_value=Response(200, json={"ok": True}))
+
+    await run_http_widget({"url": target_url})
+    first_client = http_runner._client
+    await run_http_widget({"url": target_url})
+    assert http_runner._client is first_client
+    assert route.call_count == 2
+
+    await http_runner.close_http_client()
+    assert first_client.is_closed
+    await run_http_widget({"url": target_url})
+    assert http_runner._client is not first_client
+
+  await http_runner.close_http_client()
+
+
+@pytest.mark.asyncio
+async def test_run_widgets_parallel_preserves_order_and_caps_concurrency(monkeypatch) -> None:
+  """Results come back in input order and no more than max_concurrency requests overlap."""
+  import asyncio
+  from app.services.runners import http as http_runner
+
+  in_flight = 0
+  peak = 0
+
+  async def _fake_run(config, forward_auth_token=None):
+    nonlocal in_flight, peak
+    in_flight += 1
+    peak = max(peak, in_flight)
+    await asyncio.sleep(0)
+    in_flight -= 1
+    return {"data": config["url"], "token": forward_auth_token}
+
+  monkeypatch.setattr(http_runner, "run_http_widget", _fake_run)
+
+  configs = [{"url": f"https://api.example.com/{i}"} for i in range(10)]
+  results = await http_runner.run_widgets_parallel(configs, forward_auth_token="tok", max_concurrency=3)
+
+  assert [r["data"] for r in results] == [c["url"] for c in configs]
+  assert all(r["token"] == "tok" for r in results)
+  assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_shared_client_negotiates_compression() -> None:
+  """The pooled client should advertise brotli alongside gzip."""
+  from app.services.runners import http as http_runner
+
+  encodings = http_runner._get_client().headers["accept-encoding"]
+  assert "br" in encodings and "gzip" in encodings
+
+  await http_runner.close_http_client()
@@ -14,7 +14,7 @@ def test_run_sql_widget_success() -> None:
   """
   mock_cursor = MagicMock()
   mock_cursor.description = [("id", "string"), ("value", "int")]
-  mock_cursor.fetchall.return_value = [("row1", 100), ("row2", 200)]
+  mock_cursor.fetchmany.side_effect = [[("row1", 100), ("row2", 200)], []]
 
   config = {"query": "SELECT * FROM table"}
 
@@ -67,7 +67,7 @@ def test_run_sql_widget_allows_complex_selects() -> None:
   """
   mock_cursor = MagicMock()
   mock_cursor.description = [("cnt", "int")]
-  mock_cursor.fetchall.return_value = [(10,)]
+  mock_cursor.fetchmany.side_effect = [[(10,)], []]
 
   valid_query = """ 
     WITH data AS (SELECT * FROM t) 
@@ -122,20 +122,21 @@ def test_run_sql_widget_no_result_set() -> None:
   assert result["columns"] == []
 
 
-def test_run_sql_widget_continues_on_validation_warning(monkeypatch) -> None:
-  """Validation errors should not prevent execution."""
+def test_run_sql_widget_skips_sqlglot_parse(monkeypatch) -> None:
+  """Execution should not re-parse the query; DuckDB reports syntax errors itself."""
   mock_cursor = MagicMock()
   mock_cursor.description = [("id", "int")]
-  mock_cursor.fetchall.return_value = [(1,)]
+  mock_cursor.fetchmany.side_effect = [[(1,)], []]
 
   def _boom(_query: str) -> None:
-    raise sql_runner.SQLSecurityError("bad")
+    raise AssertionError("validate_query_ast should not run on the widget hot path")
 
   monkeypatch.setattr(sql_runner, "validate_query_ast", _boom)
 
   result = run_sql_widget(mock_cursor, {"query": "SELECT 1"})
 
   assert result["error"] is None
+  assert result["data"] == [{"id": 1}]
 
 
 def test_run_sql_widget_respects_max_rows() -> None:
@@ -148,3 +149,52 @@ def test_run_sql_widget_respects_max_rows() -> None:
 
   mock_cursor.fetchmany.assert_called_once_with(1)
   assert result["data"] == [{"id": 1}]
+
+
+def test_run_sql_widget_streams_in_batches() -> None:
+  """Unbounded results should be pulled in fetchmany batches until exhausted."""
+  mock_cursor = MagicMock()
+  mock_cursor.description = [("id", "int")]
+  mock_cursor.fetchmany.side_effect = [[(1,), (2,)], [(3,)], []]
+
+  result = run_sql_widget(mock_cursor, {"query": "SELECT id FROM t"})
+
+  assert result["data"] == [{"id": 1}, {"id": 2}, {"id": 3}]
+  assert mock_cursor.fetchmany.call_count == 3
+  mock_cursor.fetchmany.assert_called_with(sql_runner.FETCH_BATCH_SIZE)
+  mock_cursor.fetchall.assert_not_called()
+
+
+def test_run_sql_widget_columnar_shape() -> None:
+  """shape='columns' should return one value list per column, across batches."""
+  mock_cursor = MagicMock()
+  mock_cursor.description = [("id", "int"), ("unit", "str")]
+  mock_cursor.fetchmany.side_effect = [[(1, "ICU"), (2, "ER")], [(3, "ICU")], []]
+
+  result = run_sql_widget(mock_cursor, {"query": "SELECT id, unit FROM t", "shape": "columns"})
+
+  assert result["error"] is None
+  assert result["columns"] == ["id", "unit"]
+  assert result["data"] == [[1, 2, 3], ["ICU", "ER", "ICU"]]
+
+
+def test_run_sql_widget_columnar_shape_empty_result() -> None:
+  """An empty columnar result still has one (empty) list per column."""
+  mock_cursor = MagicMock()
+  mock_cursor.description = [("id", "int"), ("unit", "str")]
+  mock_cursor.fetchmany.return_value = []
+
+  result = run_sql_widget(mock_cursor, {"query": "SELECT id, unit FROM t", "shape": "columns", "max_rows": 5})
+
+  assert result["data"] == [[], []]
+
+
+def test_run_sql_widget_binds_params() -> None:
+  """Bound filter values are passed to DuckDB alongside the query."""
+  mock_cursor = MagicMock()
+  mock_cursor.description = [("id", "int")]
+  mock_cursor.fetchmany.side_effect = [[(1,)], []]
+
+  run_sql_widget(mock_cursor, {"query": "SELECT id FROM t WHERE s = ?", "params": ["ICU"]})
+
+  mock_cursor.execute.assert_called_once_with("SELECT id FROM t WHERE s = ?", ["ICU"])
@@ -7,7 +7,7 @@ relying on the Database Engine's read-only settings for actual protection.
 
 import pytest
 import sqlglot
-from app.services.runners.sql import validate_query_ast, SQLSecurityError
+from app.services.runners.sql import _parse_statement_count, validate_query_ast, SQLSecurityError
 
 # --- Validator Unit Tests (Permissive) ---
 
@@ -78,6 +78,25 @@ def test_ast_parse_error_is_logged_but_not_blocking():
 def test_ast_empty_parse_result_raises(monkeypatch):
   """If sqlglot returns no statements, treat it as empty."""
   monkeypatch.setattr(sqlglot, "parse", lambda *_args, **_kwargs: [])
+  _parse_statement_count.cache_clear()
 
   with pytest.raises(SQLSecurityError):
     validate_query_ast("SELECT 1")
+
+
+def test_ast_parse_is_memoized(monkeypatch):
+  """Repeated validation of the same query should parse only once."""
+  calls = []
+
+  def _parse(query, **_kwargs):
+    calls.append(query)
+    return ["stmt"]
+
+  monkeypatch.setattr(sqlglot, "parse", _parse)
+  _parse_statement_count.cache_clear()
+
+  validate_query_ast("SELECT 42")
+  validate_query_ast("SELECT 42")
+
+  assert calls == ["SELECT 42"]
+  _parse_statement_count.cache_clear()
@@ -2,6 +2,7 @@
 Tests for schema service error handling.
 """
 
+from app.services import schema as schema_module
 from app.services.schema import SchemaService
 
 
@@ -24,6 +25,9 @@ class _EmptySchemaConn:
       def fetchall(self_inner):
         return []
 
+      def fetchone(self_inner):
+        return (None,)
+
     return _Result()
 
   def close(self):
@@ -38,6 +42,8 @@ class _EmptySchemaManager:
 class _SchemaConn:
   def __init__(self):
     self.closed = False
+    self.queries = []
+    self.fingerprint = 1
 
   def execute(self, query: str):
     class _Result:
@@ -47,9 +53,13 @@ class _SchemaConn:
       def fetchall(self_inner):
         return list(self_inner._rows)
 
-    if query.strip().upper().startswith("SHOW TABLES"):
-      return _Result([("patients",)])
-    return _Result([("id", "INTEGER"), ("name", "VARCHAR")])
+      def fetchone(self_inner):
+        return self_inner._rows[0]
+
+    self.queries.append(query)
+    if "hash(" in query:
+      return _Result([(self.fingerprint,)])
+    return _Result([("admissions", "unit", "VARCHAR"), ("patients", "id", "INTEGER"), ("patients", "name", "VARCHAR")])
 
   def close(self):
     self.closed = True
@@ -90,6 +100,78 @@ def test_schema_json_returns_table_metadata() -> None:
   result = svc.get_schema_json()
 
   assert result == [
-    {"table_name": "patients", "columns": [{"name": "id", "type": "INTEGER"}, {"name": "name", "type": "VARCHAR"}]}
+    {"table_name": "admissions", "columns": [{"name": "unit", "type": "VARCHAR"}]},
+    {"table_name": "patients", "columns": [{"name": "id", "type": "INTEGER"}, {"name": "name", "type": "VARCHAR"}]},
   ]
   assert manager.conn.closed is True
+
+
+def test_schema_context_uses_single_query() -> None:
+  """Schema context should group one batched column query into per-table blocks."""
+  svc = SchemaService()
+  manager = _SchemaManager()
+  svc.manager = manager
+
+  result = svc.get_schema_context_string()
+
+  assert result.startswith("Table: admissions\n- unit (VARCHAR)\n\nTable: patients\n- id (INTEGER)\n- name (VARCHAR)\n")
+  assert "AVAILABLE DUCKDB MACROS" in result
+  # One fingerprint probe plus one column listing
+  assert len(manager.conn.queries) == 2
+
+
+def test_schema_context_cached_until_fingerprint_changes() -> None:
+  """Repeat calls reuse the rendered context until the schema fingerprint moves or the cache is invalidated."""
+  svc = SchemaService()
+  svc.SCHEMA_TTL_SECONDS = 0.0  # Always re-check the fingerprint
+  manager = _SchemaManager()
+  svc.manager = manager
+
+  first = svc.get_schema_context_string()
+  assert svc.get_schema_context_string() is first
+  assert len(manager.conn.queries) == 3
+
+  manager.conn.fingerprint = 2
+  assert svc.get_schema_context_string() == first
+  assert len(manager.conn.queries) == 5
+
+  svc.invalidate()
+  svc.get_schema_context_string()
+  assert len(manager.conn.queries) == 7
+
+
+def test_schema_context_skips_fingerprint_within_ttl(monkeypatch) -> None:
+  """Within the TTL the cached context is served without opening a connection."""
+  clock = [100.0]
+  monkeypatch.setattr(schema_module.time, "monotonic", lambda: clock[0])
+
+  svc = SchemaService()
+  manager = _SchemaManager()
+  svc.manager = manager
+
+  first = svc.get_schema_context_string()
+  assert len(manager.conn.queries) == 2
+
+  clock[0] += svc.SCHEMA_TTL_SECONDS - 1
+  assert svc.get_schema_context_string() is first
+  assert len(manager.conn.queries) == 2
+
+  # Once expired, only the fingerprint is re-checked
+  clock[0] += 2
+  assert svc.get_schema_context_string() is first
+  assert len(manager.conn.queries) == 3
+
+
+def test_schema_json_cached_until_invalidated() -> None:
+  """The JSON schema shares the fingerprint cache and is dropped by invalidate()."""
+  svc = SchemaService()
+  manager = _SchemaManager()
+  svc.manager = manager
+
+  first = svc.get_schema_json()
+  assert svc.get_schema_json() is first
+  assert len(manager.conn.queries) == 2
+
+  svc.invalidate()
+  assert svc.get_schema_json() == first
+  assert len(manager.conn.queries) == 4
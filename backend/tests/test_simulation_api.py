@@ -6,12 +6,13 @@ fetches data from DuckDB (handling 2 or 3 column formats),
 and returns parsed assignments with Delta values.
 """
 
-import json
+import numpy as np
 import pytest
 from unittest.mock import MagicMock, patch
 from httpx import AsyncClient, ASGITransport
 from app.main import app
 from app.api.deps import get_current_user  # Import dependency
+from app.services.mpax_bridge import AssignmentColumns
 
 SIMULATION_URL = "/api/v1/simulation"
 
@@ -29,18 +30,20 @@ async def test_run_simulation_with_delta_success() -> None:
   # 2. Mock Connections and Services
   with (
     patch("app.services.simulation_service.duckdb_manager.get_readonly_connection") as mock_conn_getter,
-    patch("app.services.simulation_service.mpax_bridge.solve_unit_assignment") as mock_solver,
+    patch("app.services.simulation_service.mpax_bridge.solve_unit_assignment_columns") as mock_solver,
   ):
     # Mock DuckDB: Return current state
     # Cardio is currently in 'ER' (5 pts).
     mock_conn = MagicMock()
-    mock_conn.execute.return_value.fetchall.return_value = [("Cardio", "ER", 5.0)]
+    demand = mock_conn.sql.return_value
+    demand.columns = ["svc", "unit", "cnt"]
+    grouped = demand.project.return_value.aggregate.return_value.order.return_value
+    grouped.project.return_value.fetchall.return_value = [("Cardio", "ER", 5.0)]
     mock_conn_getter.return_value = mock_conn
 
     # Mock Solver: Moves patients to 'ICU'
-    # Solver output format: [{"Service": "Cardio", "Unit": "ICU", "Patient_Count": 5.0}]
     # Note: Solver won't return 'ER' because count is 0 there now.
-    mock_solver.return_value = json.dumps([{"Service": "Cardio", "Unit": "ICU", "Patient_Count": 5.0}])
+    mock_solver.return_value = AssignmentColumns(["Cardio"], ["ICU"], np.array([5.0]))
 
     # 3. Payload
     payload = {
@@ -89,15 +92,18 @@ async def test_run_simulation_legacy_2col_sql() -> None:
 
   with (
     patch("app.services.simulation_service.duckdb_manager.get_readonly_connection") as mock_conn_getter,
-    patch("app.services.simulation_service.mpax_bridge.solve_unit_assignment") as mock_solver,
+    patch("app.services.simulation_service.mpax_bridge.solve_unit_assignment_columns") as mock_solver,
   ):
     # Mock DuckDB: 2 Columns
     mock_conn = MagicMock()
-    mock_conn.execute.return_value.fetchall.return_value = [("Neuro", 10.0)]
+    demand = mock_conn.sql.return_value
+    demand.columns = ["svc", "cnt"]
+    grouped = demand.project.return_value.aggregate.return_value.order.return_value
+    grouped.project.return_value.fetchall.return_value = [("Neuro", 10.0)]
     mock_conn_getter.return_value = mock_conn
 
     # Solver
-    mock_solver.return_value = json.dumps([{"Service": "Neuro", "Unit": "Ward_A", "Patient_Count": 10.0}])
+    mock_solver.return_value = AssignmentColumns(["Neuro"], ["Ward_A"], np.array([10.0]))
 
     payload = {
       "demand_source_sql": "SELECT svc, cnt FROM table",
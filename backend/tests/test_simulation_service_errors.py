@@ -2,10 +2,13 @@
 Tests for simulation service error handling paths.
 """
 
+import duckdb
+import numpy as np
 import pytest
 
 from app.services.simulation_service import SimulationService
 from app.services import simulation_service as simulation_module
+from app.services.mpax_bridge import AssignmentColumns
 
 
 def test_fetch_demand_payload_raises_on_db_error(monkeypatch) -> None:
@@ -35,3 +38,151 @@ def test_parse_and_diff_result_handles_invalid_json() -> None:
 
   with pytest.raises(ValueError):
     svc._parse_and_diff_result("{not-json", {})
+
+
+def test_fetch_demand_payload_aggregates_in_duckdb(monkeypatch) -> None:
+  """Detail rows are summed per key by DuckDB before reaching the solver payload."""
+  conn = duckdb.connect()
+  conn.execute(
+    "CREATE TABLE census AS SELECT * FROM (VALUES "
+    "('Cardio', 'ER', 2), ('Cardio', 'ER', 3), ('Cardio', 'ICU', 1), ('Neuro', 'ER', 4)) v(svc, unit, cnt)"
+  )
+  monkeypatch.setattr(simulation_module.duckdb_manager, "get_readonly_connection", lambda: conn)
+  svc = SimulationService()
+
+  demand_totals, current_state = svc._fetch_demand_payload("SELECT svc, unit, cnt FROM census;")
+
+  assert demand_totals == {"Cardio": 6.0, "Neuro": 4.0}
+  assert current_state == {("Cardio", "ER"): 5.0, ("Cardio", "ICU"): 1.0, ("Neuro", "ER"): 4.0}
+
+
+def test_fetch_demand_payload_keeps_first_seen_order(monkeypatch) -> None:
+  """Keys follow their first appearance in the query, not the order a parallel hash aggregate emits them."""
+  conn = duckdb.connect()
+  conn.execute("SET threads = 4")
+  # Several row groups, with the late keys appearing only in the final rows, in descending order
+  n = 400_000
+  conn.execute(
+    f"CREATE TABLE census AS SELECT 'S' || (CASE WHEN i < {n - 20} THEN i % 3 ELSE {n} - i + 3 END) AS svc, "
+    f"'ER' AS unit, 1 AS cnt FROM range({n}) r(i)"
+  )
+  expected = list(dict.fromkeys(row[0] for row in conn.execute("SELECT svc FROM census").fetchall()))
+  hashed = [row[0] for row in conn.sql("SELECT svc, unit, cnt FROM census").aggregate("#1, SUM(#3)", "#1").fetchall()]
+  assert hashed != expected  # Guards the premise: plain GROUP BY reorders these keys
+  # Each fetch closes its connection, so hand out cursors on the shared database
+  monkeypatch.setattr(simulation_module.duckdb_manager, "get_readonly_connection", conn.cursor)
+  svc = SimulationService()
+
+  demand_totals, current_state = svc._fetch_demand_payload("SELECT svc, unit, cnt FROM census")
+  two_col_totals, _ = svc._fetch_demand_payload("SELECT svc, cnt FROM census")
+
+  assert list(demand_totals) == expected
+  assert [service for service, _unit in current_state] == expected
+  assert list(two_col_totals) == expected
+
+
+def test_fetch_demand_payload_two_columns(monkeypatch) -> None:
+  """Two-column queries total per service and leave the baseline empty."""
+  monkeypatch.setattr(simulation_module.duckdb_manager, "get_readonly_connection", duckdb.connect)
+  svc = SimulationService()
+
+  demand_totals, current_state = svc._fetch_demand_payload(
+    "SELECT * FROM (VALUES ('Neuro', 4), ('Neuro', '6'), ('Ortho', 1)) v(svc, cnt)"
+  )
+  assert demand_totals == {"Neuro": 10.0, "Ortho": 1.0}
+  assert current_state == {}
+
+
+@pytest.mark.parametrize(
+  ("query", "reason"),
+  [
+    ("SET threads = 1", "no result set"),
+    ("SELECT 'Neuro' AS svc", "got 1 column"),
+    ("SELECT 'Neuro' AS svc, 4 AS cnt WHERE false", "no rows"),
+    ("SELECT svc, cnt FROM missing_table", "missing_table"),
+  ],
+)
+def test_fetch_demand_payload_rejects_unusable_queries(monkeypatch, query, reason) -> None:
+  """Queries that cannot yield demand fail loudly instead of solving an empty scenario."""
+  monkeypatch.setattr(simulation_module.duckdb_manager, "get_readonly_connection", duckdb.connect)
+
+  with pytest.raises(ValueError, match="Failed to execute demand query") as exc_info:
+    SimulationService()._fetch_demand_payload(query)
+  assert reason in str(exc_info.value)
+
+
+def test_run_scenario_passes_parameters_to_bridge_as_objects(monkeypatch) -> None:
+  """Parameters reach the solver as Python objects; constraints as their model_dump() dicts."""
+  from app.schemas.simulation import ScenarioConstraint, ScenarioRunRequest
+
+  svc = SimulationService()
+  monkeypatch.setattr(svc, "_fetch_demand_payload", lambda _query: ({}, {}))
+  captured = {}
+
+  def _solve(**kwargs):
+    captured.update(kwargs)
+    return AssignmentColumns([], [], np.empty(0))
+
+  monkeypatch.setattr(simulation_module.mpax_bridge, "solve_unit_assignment_columns", _solve)
+  constraints = [
+    ScenarioConstraint(type="force_flow", service="Peds", unit="Nursery", min=5),
+    ScenarioConstraint(type="cap", service="ICU", unit="ICU", max=2.5),
+  ]
+
+  svc.run_scenario(ScenarioRunRequest(demand_source_sql="SELECT 1", capacity_parameters={}, constraints=constraints))
+
+  assert captured["constraints_json"] == [c.model_dump() for c in constraints]
+  assert captured["demand_json"] == {}
+  assert captured["capacity_json"] == {}
+
+
+def test_parse_and_diff_result_rejects_malformed_assignment() -> None:
+  """Assignments missing Service/Unit should still be rejected without model validation."""
+  svc = SimulationService()
+
+  with pytest.raises(ValueError):
+    svc._parse_and_diff_result('[{"Service": "Cardio", "Patient_Count": 2}]', {})
+
+
+def test_parse_and_diff_result_builds_deltas_and_evictions() -> None:
+  """Solver rows carry deltas against the baseline; vanished baseline rows become evictions."""
+  svc = SimulationService()
+  current_state = {("Cardio", "ER"): 5.0, ("Cardio", "ICU"): 1.0, ("Neuro", "ER"): 0.05}
+
+  result = svc._parse_and_diff_result('[{"Service": "Cardio", "Unit": "ICU", "Patient_Count": 6}]', current_state)
+
+  assert [(a.Service, a.Unit, a.Patient_Count, a.Original_Count, a.Delta) for a in result] == [
+    ("Cardio", "ICU", 6.0, 1.0, 5.0),
+    ("Cardio", "ER", 0.0, 5.0, -5.0),
+  ]
+
+
+def test_parse_and_diff_result_accepts_columns() -> None:
+  """Columnar solver output diffs the same way as its JSON form."""
+  svc = SimulationService()
+  current_state = {("Cardio", "ER"): 5.0, ("Cardio", "ICU"): 1.0}
+  columns = AssignmentColumns(["Cardio", "Neuro"], ["ICU", "ER"], np.array([6.0, 2.5]))
+
+  result = svc._parse_and_diff_result(columns, current_state)
+
+  assert [(a.Service, a.Unit, a.Patient_Count, a.Original_Count, a.Delta) for a in result] == [
+    ("Cardio", "ICU", 6.0, 1.0, 5.0),
+    ("Neuro", "ER", 2.5, 0.0, 2.5),
+    ("Cardio", "ER", 0.0, 5.0, -5.0),
+  ]
+
+
+def test_run_scenario_wraps_solver_failure(monkeypatch) -> None:
+  """Exceptions raised by the columnar solver surface as a clean ValueError."""
+  from app.schemas.simulation import ScenarioRunRequest
+
+  svc = SimulationService()
+  monkeypatch.setattr(svc, "_fetch_demand_payload", lambda _query: ({}, {}))
+
+  def _solve(**_kwargs):
+    raise RuntimeError("solver exploded")
+
+  monkeypatch.setattr(simulation_module.mpax_bridge, "solve_unit_assignment_columns", _solve)
+
+  with pytest.raises(ValueError, match="Solver returned invalid data"):
+    svc.run_scenario(ScenarioRunRequest(demand_source_sql="SELECT 1", capacity_parameters={}))
@@ -66,7 +66,10 @@ async def test_generation_flow_mocked():
       instance.created_at = datetime.now(timezone.utc)
 
     if hasattr(instance, "candidates"):
-      cands = [obj for obj in added_objects if isinstance(obj, ModelCandidate)]
+      # Candidates are bulk-inserted as row dicts: execute(insert(ModelCandidate), rows)
+      cands = [
+        ModelCandidate(**row) for call in mock_db.execute.await_args_list if len(call.args) > 1 for row in call.args[1]
+      ]
       instance.candidates = cands
 
   mock_db.refresh = AsyncMock(side_effect=mock_refresh)
@@ -87,5 +90,5 @@ async def test_generation_flow_mocked():
     user_content = messages[1]["content"]
 
     # Fix: ZeroShotStrategy uses "Here is the database schema", not "Database Schema"
-    assert "Here is the database schema" in user_content
+    assert "Here is the database schema" in messages[0]["content"]
     assert "Question: How many visits?" in user_content
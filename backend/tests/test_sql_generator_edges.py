@@ -6,9 +6,10 @@ import uuid
 from datetime import datetime, timezone
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import duckdb
 import pytest
 
-from app.services.sql_generator import sql_generator
+from app.services.sql_generator import SQLGeneratorService, sql_generator
 from app.models.feedback import ModelCandidate
 
 
@@ -26,17 +27,25 @@ def _make_db():
       if getattr(obj, "id", None) is None:
         obj.id = uuid.uuid4()
 
+  inserted = []
+
+  async def _execute(_stmt, rows=None):
+    # Candidates arrive as a bulk insert(ModelCandidate) with one dict per row
+    inserted.extend(ModelCandidate(**row) for row in rows or [])
+    return MagicMock()
+
   async def _refresh(obj, attribute_names=None):
     if getattr(obj, "id", None) is None:
       obj.id = uuid.uuid4()
     if getattr(obj, "created_at", None) is None:
       obj.created_at = datetime.now(timezone.utc)
     if hasattr(obj, "candidates"):
-      obj.candidates = [o for o in added if isinstance(o, ModelCandidate)]
+      obj.candidates = list(inserted)
 
   db.flush = AsyncMock(side_effect=_assign_ids)
   db.commit = AsyncMock(side_effect=_assign_ids)
   db.refresh = AsyncMock(side_effect=_refresh)
+  db.execute = AsyncMock(side_effect=_execute)
 
   return db
 
@@ -48,6 +57,16 @@ def test_strategy_factory_resolves_known_tags() -> None:
   assert sql_generator._get_strategy_implementation("unknown").get_strategy_name() == "zero-shot"
 
 
+def test_strategy_factory_reuses_instances() -> None:
+  """Each strategy is built once per service; unknown tags share the zero-shot instance."""
+  svc = SQLGeneratorService()
+
+  rag = svc._get_strategy_implementation("rag-few-shot")
+
+  assert svc._get_strategy_implementation("RAG-Few-Shot") is rag
+  assert svc._get_strategy_implementation("unknown") is svc._get_strategy_implementation("zero-shot")
+
+
 def test_process_global_filters_injects_values() -> None:
   """Global filters should replace template tokens with user selections."""
   sql = (
@@ -57,19 +76,65 @@ def test_process_global_filters_injects_values() -> None:
     "AND end <= '{{global_end_date}}'"
   )
 
-  result = sql_generator.process_global_filters(
+  result, params = sql_generator.process_global_filters(
     sql,
     {"dept": "Cardiology", "start_date": "2024-01-01", "end_date": "2024-02-01"},
   )
 
-  assert "Clinical_Service = 'Cardiology'" in result
-  assert "BETWEEN '2024-01-01' AND '2024-02-01'" in result
-  assert "2024-01-01" in result
-  assert "2024-02-01" in result
+  assert result == (
+    "SELECT * FROM t WHERE 1=1 AND Clinical_Service = ? "
+    "AND 1=1 AND Midnight_Census_DateTime BETWEEN ? AND ? "
+    "AND start >= ? "
+    "AND end <= ?"
+  )
+  assert params == ["Cardiology", "2024-01-01", "2024-02-01", "2024-01-01", "2024-02-01"]
 
   # Missing date range should clear the placeholder.
-  result_no_range = sql_generator.process_global_filters(sql, {"dept": "Cardiology"})
+  result_no_range, params_no_range = sql_generator.process_global_filters(sql, {"dept": "Cardiology"})
   assert "{{global_date_range}}" not in result_no_range
+  assert params_no_range == ["Cardiology", "2023-01-01", "2023-12-31"]
+
+
+def test_process_global_filters_single_pass() -> None:
+  """Each placeholder is bound exactly once, in order; values never enter the SQL text."""
+  sql = "SELECT '{{other}}' FROM t WHERE d >= '{{global_start_date}}' {{global_service}} {{global_service}}"
+
+  result, params = sql_generator.process_global_filters(sql, {"dept": "x' OR '1'='1"})
+
+  assert result == "SELECT '{{other}}' FROM t WHERE d >= ? AND Clinical_Service = ? AND Clinical_Service = ?"
+  assert params == ["2023-01-01", "x' OR '1'='1", "x' OR '1'='1"]
+  assert sql_generator.process_global_filters("SELECT 1", {"dept": "x"}) == ("SELECT 1", [])
+
+
+def test_process_global_filters_quoted_literals_bind_whole_literal() -> None:
+  """Placeholders inside string literals bind the completed literal, and the result runs in DuckDB."""
+  sql = (
+    "SELECT svc FROM (VALUES ('Cardiology', DATE '2024-01-15'), ('Neuro', DATE '2024-03-01')) t(svc, day) "
+    "WHERE day >= date '{{global_start_date}}' AND day <= '{{global_end_date}}' "
+    "AND svc LIKE '%{{global_service}}%' AND svc <> 'It''s {{global_service}}'"
+  )
+
+  result, params = sql_generator.process_global_filters(
+    sql, {"dept": "ardio", "start_date": "2024-01-01", "end_date": "2024-02-01"}
+  )
+
+  assert result.endswith("WHERE day >= CAST(? AS DATE) AND day <= ? AND svc LIKE ? AND svc <> ?")
+  assert params == ["2024-01-01", "2024-02-01", "%ardio%", "It's ardio"]
+  assert duckdb.connect().execute(result, params).fetchall() == [("Cardiology",)]
+
+  # With no service selected the LIKE pattern matches every service
+  _, params_all = sql_generator.process_global_filters("SELECT 1 WHERE 'x' LIKE '%{{global_service}}%'", {})
+  assert params_all == ["%%"]
+
+
+def test_process_global_filters_skips_identifiers_and_comments() -> None:
+  """Quoted identifiers and comments pass through unchanged, even when they contain quotes or placeholders."""
+  sql = "SELECT \"it's\" FROM t -- don't {{global_service}}\nWHERE d >= '{{global_start_date}}' /* {{global_end_date}} */"
+
+  result, params = sql_generator.process_global_filters(sql, {})
+
+  assert result == "SELECT \"it's\" FROM t -- don't {{global_service}}\nWHERE d >= ? /* {{global_end_date}} */"
+  assert params == ["2023-01-01"]
 
 
 @pytest.mark.asyncio
@@ -90,3 +155,24 @@ async def test_run_arena_experiment_dry_run() -> None:
 
   assert result.candidates
   assert "SELECT 1" in result.candidates[0].generated_sql
+
+
+@pytest.mark.asyncio
+async def test_run_arena_experiment_bulk_inserts_candidates(db_session) -> None:
+  """Bulk-inserted candidates are persisted and loaded back onto the experiment."""
+  from sqlalchemy import select
+  from app.models.user import User
+
+  user = User(id=uuid.uuid4(), email="arena@test.com", hashed_password="pw", is_active=True)
+  db_session.add(user)
+  await db_session.flush()
+
+  with patch("app.services.sql_generator.schema_service.get_schema_context_string", return_value="schema"):
+    result = await sql_generator.run_arena_experiment("How many visits?", db_session, user, dry_run=True)
+
+  assert len(result.candidates) == 1
+  assert "SELECT 1" in result.candidates[0].generated_sql
+  rows = (await db_session.execute(select(ModelCandidate))).scalars().all()
+  assert len(rows) == 1
+  assert rows[0].experiment_id == result.id
+  assert rows[0].sql_hash is not None
@@ -36,17 +36,37 @@ def test_strip_sql_comments_handles_escaped_quotes() -> None:
   assert "ba``z" in stripped
 
 
+def test_strip_sql_comments_line_and_unterminated_comments() -> None:
+  """Line comments keep their newline; unterminated quotes and comments run to the end."""
+  assert sql_utils._strip_sql_comments("SELECT 1 -- one\nFROM t -- tail") == "SELECT 1 \nFROM t  "
+  assert sql_utils._strip_sql_comments("SELECT 1 /* open comment") == "SELECT 1  "
+  assert sql_utils._strip_sql_comments("SELECT 'open -- quote") == "SELECT 'open -- quote"
+
+
+LONG_SQL = "SELECT " + ", ".join(f"col_{i}" for i in range(40)) + " FROM wide_table"
+
+
 def test_normalize_sql_uses_sqlglot() -> None:
-  """Valid SQL should normalize via sqlglot."""
-  normalized = sql_utils.normalize_sql("select 1;")
-  assert normalized.upper().startswith("SELECT 1")
+  """Valid SQL above the length threshold should normalize via sqlglot."""
+  normalized = sql_utils.normalize_sql(LONG_SQL.lower() + ";")
+  assert normalized == LONG_SQL
+
+
+def test_normalize_sql_short_query_skips_sqlglot() -> None:
+  """Short queries use whitespace normalization, however they are laid out."""
+  sql_utils.normalize_sql.cache_clear()
+  with patch("app.services.sql_utils.sqlglot.parse_one") as parse_one:
+    assert sql_utils.normalize_sql("select 1;") == "select 1"
+    assert sql_utils.normalize_sql("SELECT a\nFROM   t") == sql_utils.normalize_sql("select a from t")
+  parse_one.assert_not_called()
 
 
 def test_normalize_sql_fallback_on_parse_error() -> None:
   """Fallback normalization should lowercase and collapse whitespace."""
+  sql_utils.normalize_sql.cache_clear()
   with patch("app.services.sql_utils.sqlglot.parse_one", side_effect=Exception("boom")):
-    normalized = sql_utils.normalize_sql("SELECT  *  FROM  t  -- comment")
-  assert normalized == "select * from t"
+    normalized = sql_utils.normalize_sql(LONG_SQL.replace(" ", "  ") + "  -- comment")
+  assert normalized == LONG_SQL.lower()
 
 
 def test_sql_fingerprint_returns_hash() -> None:
@@ -59,3 +79,18 @@ def test_sql_fingerprint_returns_hash() -> None:
 def test_sql_fingerprint_empty_returns_none() -> None:
   """Empty SQL should return None."""
   assert sql_utils.sql_fingerprint("   ") is None
+
+
+def test_sql_fingerprint_is_memoized() -> None:
+  """Repeated SQL should be parsed by sqlglot only once."""
+  sql_utils.normalize_sql.cache_clear()
+  sql_utils.sql_fingerprint.cache_clear()
+  sql = LONG_SQL
+
+  with patch("app.services.sql_utils.sqlglot.parse_one", wraps=sql_utils.sqlglot.parse_one) as spy:
+    first = sql_utils.sql_fingerprint(sql)
+    assert sql_utils.sql_fingerprint(sql) == first
+    # sql_fingerprint populates the normalize_sql entry for the same (sql, dialect)
+    assert sql_utils.normalize_sql(sql, "duckdb")
+
+  assert spy.call_count == 1
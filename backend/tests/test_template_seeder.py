@@ -6,6 +6,7 @@ import json
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
+from sqlalchemy import select
 
 from app.services import template_seeder
 from app.services.template_seeder import TemplateSeeder
@@ -80,7 +81,7 @@ async def test_seed_defaults_handles_unexpected_exception(monkeypatch, tmp_path)
   def _boom(*_args, **_kwargs):
     raise RuntimeError("boom")
 
-  monkeypatch.setattr(template_seeder.json, "load", _boom)
+  monkeypatch.setattr(template_seeder.orjson, "loads", _boom)
 
   await TemplateSeeder.seed_defaults()
 
@@ -89,6 +90,7 @@ async def test_seed_defaults_handles_unexpected_exception(monkeypatch, tmp_path)
 async def test_process_batch_calls_upsert(monkeypatch) -> None:
   """Batch processing should invoke upsert for each item."""
   session = MagicMock()
+  session.execute = AsyncMock(return_value=MagicMock())
   items = [
     {"title": "One", "sql_template": "SELECT 1", "category": "A"},
     {"title": "Two", "sql_template": "SELECT 2", "category": "B"},
@@ -142,3 +144,31 @@ async def test_upsert_template_inserts_new() -> None:
   await TemplateSeeder._upsert_template(session, data)
 
   session.add.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_process_batch_prefetches_existing_titles(db_session) -> None:
+  """One lookup serves the whole batch; existing rows update, new and repeated titles insert once."""
+  db_session.add(WidgetTemplate(title="Old", description="old", sql_template="SELECT 0", category="A"))
+  await db_session.commit()
+
+  items = [
+    {"title": "Old", "description": "new", "sql_template": "SELECT 1", "category": "B"},
+    {"title": "New", "sql_template": "SELECT 2", "category": "C"},
+    {"title": "New", "sql_template": "SELECT 3", "category": "C"},
+  ]
+  execute = db_session.execute
+  calls = []
+
+  async def _counting_execute(*args, **kwargs):
+    calls.append(args)
+    return await execute(*args, **kwargs)
+
+  db_session.execute = _counting_execute
+  await TemplateSeeder._process_batch(db_session, items)
+  db_session.execute = execute
+  await db_session.commit()
+
+  rows = (await db_session.execute(select(WidgetTemplate).order_by(WidgetTemplate.title))).scalars().all()
+  assert len(calls) == 1
+  assert [(r.title, r.sql_template, r.category) for r in rows] == [("New", "SELECT 3", "C"), ("Old", "SELECT 1", "B")]